@@ -1,32 +1,136 @@
 from django.contrib import admin
-from .models import Course, Lecture, Comment, Test
+from django.utils import timezone
+from . import search
+from .admin_tools import AutocompleteFilter, ScalableAdminMixin
+from .cloning import clone_course
+from .models import (
+    Course, Lecture, Comment, Test, QuizAttempt, QuizAnswer, QuestionStats, LectureQuizStats, CourseProgress, LeaderboardEntry,
+    OutgoingEmail,
+)
+
+# Поиск в списках админки через полнотекстовый индекс вместо LIKE '%...%'
+class FullTextSearchMixin:
+    search_kind = None  # Тип объектов в индексе (см. courses/search.py)
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term or not search.is_available():
+            return super().get_search_results(request, queryset, search_term)
+        if not search.build_match(search_term):
+            return queryset.none(), False
+        return queryset.filter(pk__in=search.matching_ids(self.search_kind, search_term)), False
 
 # Админка для модели Course
-class CourseAdmin(admin.ModelAdmin):
+class CourseAdmin(FullTextSearchMixin, admin.ModelAdmin):
     list_display = ('title', 'author', 'created_at')  # Поля, которые будут отображаться в списке
     prepopulated_fields = {'slug': ('title',)}  # Автоматическое заполнение поля slug на основе title
     search_fields = ('title', 'author__username')  # Поля, по которым будет происходить поиск
+    search_kind = 'course'
+    list_select_related = ('author',)
+    autocomplete_fields = ('author',)
+    actions = ['clone', 'clone_with_comments']
+
+    @admin.action(description="Копировать курсы с лекциями и тестами")
+    def clone(self, request, queryset, include_comments=False):
+        for course in queryset:
+            clone_course(course, include_comments=include_comments)
+        self.message_user(request, f"Скопировано курсов: {len(queryset)}")
+
+    @admin.action(description="Копировать курсы с лекциями, тестами и комментариями")
+    def clone_with_comments(self, request, queryset):
+        self.clone(request, queryset, include_comments=True)
 
 # Админка для модели Lecture
-class LectureAdmin(admin.ModelAdmin):
+class LectureAdmin(ScalableAdminMixin, FullTextSearchMixin, admin.ModelAdmin):
     list_display = ('title', 'course', 'created_at', 'order')  # Поля для отображения в списке
-    list_filter = ('course', 'created_at')  # Фильтры по полям
+    list_filter = (('course', AutocompleteFilter), 'created_at')  # Фильтры по полям
+    list_select_related = ('course',)
+    autocomplete_fields = ('course',)
+    ordering = ('course', 'order')  # Индекс lecture_course_order_idx; стабильные страницы автодополнения
     search_fields = ('title', 'course__title')  # Поля для поиска
+    search_kind = 'lecture'
 
 # Админка для модели Comment
-class CommentAdmin(admin.ModelAdmin):
+class CommentAdmin(ScalableAdminMixin, FullTextSearchMixin, admin.ModelAdmin):
     list_display = ('author', 'lecture', 'created_at')  # Поля для отображения в списке
-    list_filter = ('lecture', 'author')  # Фильтры по лекции и автору
+    list_filter = (('lecture', AutocompleteFilter), ('author', AutocompleteFilter))  # Фильтры по лекции и автору
+    list_select_related = ('author', 'lecture__course')  # Lecture.__str__ обращается к курсу
+    autocomplete_fields = ('lecture', 'author')
     search_fields = ('author__username', 'lecture__title', 'text')  # Поля для поиска
+    search_kind = 'comment'
 
 # Админка для модели Test
-class TestAdmin(admin.ModelAdmin):
+class TestAdmin(ScalableAdminMixin, FullTextSearchMixin, admin.ModelAdmin):
     list_display = ('lecture', 'question')  # Поля для отображения в списке
-    list_filter = ('lecture',)  # Фильтр по лекции
+    list_filter = (('lecture', AutocompleteFilter),)  # Фильтр по лекции
+    list_select_related = ('lecture__course',)
+    autocomplete_fields = ('lecture',)
     search_fields = ('question', 'lecture__title')  # Поля для поиска
+    search_kind = 'test'
 
 # Регистрация моделей и соответствующих классов админки
 admin.site.register(Course, CourseAdmin)
 admin.site.register(Lecture, LectureAdmin)
 admin.site.register(Comment, CommentAdmin)
 admin.site.register(Test, TestAdmin)
+
+# Админка для попыток прохождения тестов
+class QuizAnswerInline(admin.TabularInline):
+    model = QuizAnswer
+    extra = 0
+    raw_id_fields = ('test',)  # Без выпадающего списка всех вопросов
+
+class QuizAttemptAdmin(admin.ModelAdmin):
+    list_display = ('user', 'lecture', 'score', 'total', 'created_at')  # Поля для отображения в списке
+    list_select_related = ('user', 'lecture__course')  # Без отдельного запроса на каждую строку
+    raw_id_fields = ('user', 'lecture')
+    inlines = [QuizAnswerInline]
+
+admin.site.register(QuizAttempt, QuizAttemptAdmin)
+
+# Админка для статистики тестов
+class QuestionStatsAdmin(admin.ModelAdmin):
+    list_display = ('test', 'attempts', 'correct', 'accuracy')  # Поля для отображения в списке
+    list_select_related = ('test__lecture__course',)
+    readonly_fields = ('test', 'attempts', 'correct')  # Статистика обновляется только автоматически
+
+class LectureQuizStatsAdmin(admin.ModelAdmin):
+    list_display = ('lecture', 'attempts', 'total_score', 'total_questions', 'accuracy')  # Поля для отображения в списке
+    list_select_related = ('lecture__course',)
+    readonly_fields = ('lecture', 'attempts', 'total_score', 'total_questions')
+
+admin.site.register(QuestionStats, QuestionStatsAdmin)
+admin.site.register(LectureQuizStats, LectureQuizStatsAdmin)
+
+# Админка для прогресса по курсам
+class CourseProgressAdmin(admin.ModelAdmin):
+    list_display = ('user', 'course', 'completed_count', 'updated_at')  # Поля для отображения в списке
+    list_select_related = ('user', 'course')
+    raw_id_fields = ('user', 'course')
+    readonly_fields = ('completed', 'completed_count')  # Отметки ставит сам пользователь
+
+admin.site.register(CourseProgress, CourseProgressAdmin)
+
+# Админка для рейтинга курсов (только просмотр: очки меняет проверка попыток и rebuild_leaderboard)
+class LeaderboardEntryAdmin(admin.ModelAdmin):
+    list_display = ('course', 'user', 'score', 'updated_at')
+    list_select_related = ('user', 'course')
+    raw_id_fields = ('user', 'course')
+    readonly_fields = ('score',)
+    ordering = ('course', '-score')
+
+admin.site.register(LeaderboardEntry, LeaderboardEntryAdmin)
+
+# Админка для очереди писем
+class OutgoingEmailAdmin(admin.ModelAdmin):
+    list_display = ('subject', 'to', 'status', 'attempts', 'next_attempt_at', 'sent_at')
+    list_filter = ('status',)
+    readonly_fields = ('created_at', 'sent_at', 'last_error')
+    actions = ['retry']
+
+    @admin.action(description="Повторить отправку")
+    def retry(self, request, queryset):
+        queryset.exclude(status=OutgoingEmail.SENT).update(
+            status=OutgoingEmail.PENDING, attempts=0, next_attempt_at=timezone.now(),
+        )
+
+admin.site.register(OutgoingEmail, OutgoingEmailAdmin)
@@ -0,0 +1,102 @@
+from django import forms
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.core.paginator import Paginator
+from django.db import DatabaseError, connections
+from django.utils.functional import cached_property
+
+# Начиная с этого числа строк в таблице список в админке показывает оценку
+# количества из статистики базы вместо точного COUNT(*)
+ESTIMATE_THRESHOLD = getattr(settings, 'COURSES_ADMIN_ESTIMATE_THRESHOLD', 100000)
+
+
+def estimated_count(model, using='default'):
+    """
+    Приблизительное количество строк таблицы из статистики базы данных или None.
+    Для SQLite статистика появляется после ANALYZE.
+    """
+    table = model._meta.db_table
+    connection = connections[using]
+    if connection.vendor == 'postgresql':
+        sql, params = "SELECT reltuples::bigint FROM pg_class WHERE relname = %s", [table]
+    elif connection.vendor == 'mysql':
+        sql, params = "SELECT table_rows FROM information_schema.tables WHERE table_schema = DATABASE() AND table_name = %s", [table]
+    elif connection.vendor == 'sqlite':
+        sql, params = "SELECT MAX(CAST(stat AS INTEGER)) FROM sqlite_stat1 WHERE tbl = %s", [table]
+    else:
+        return None
+    with connection.cursor() as cursor:
+        try:
+            cursor.execute(sql, params)
+        except DatabaseError:
+            # Например, нет таблицы sqlite_stat1, пока не выполнялся ANALYZE
+            return None
+        row = cursor.fetchone()
+    if not row or row[0] is None or row[0] < 0:
+        return None
+    return int(row[0])
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Пагинатор списка админки: для большой таблицы без фильтров берёт оценку
+    количества из статистики базы, а точный COUNT(*) выполняет только для
+    небольших таблиц и отфильтрованных списков.
+    """
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimated_count(queryset.model, queryset.db)
+            if estimate is not None and estimate >= ESTIMATE_THRESHOLD:
+                return estimate
+        return super().count
+
+
+class AutocompleteFilter(admin.RelatedFieldListFilter):
+    """
+    Фильтр по внешнему ключу с полем автодополнения вместо списка всех связанных объектов.
+    Варианты ищет стандартный autocomplete_view админки, поэтому у админки связанной
+    модели должны быть заданы search_fields.
+    """
+    template = 'admin/courses/autocomplete_filter.html'
+
+    def __init__(self, field, request, params, model, model_admin, field_path):
+        self.model_admin = model_admin
+        super().__init__(field, request, params, model, model_admin, field_path)
+
+    def field_choices(self, field, request, model_admin):
+        # Связанные объекты не загружаются: выбранный подставит виджет
+        return []
+
+    def has_output(self):
+        return True
+
+    def rendered_widget(self):
+        widget = AutocompleteSelect(self.field, self.model_admin.admin_site, attrs={
+            'class': 'autocomplete-filter',
+            'data-filter-parameter': self.lookup_kwarg,
+        })
+        form_field = forms.ModelChoiceField(
+            queryset=self.field.remote_field.model._default_manager.all(), widget=widget, required=False,
+        )
+        value = self.lookup_val[-1] if self.lookup_val else None
+        return form_field.widget.render(self.lookup_kwarg, value)
+
+
+class ScalableAdminMixin:
+    """
+    Настройки списков админки для больших таблиц: оценка количества строк
+    без второго COUNT(*) по всей таблице и скрипты для AutocompleteFilter.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    @property
+    def media(self):
+        return (
+            super().media
+            + AutocompleteSelect(None, self.admin_site).media
+            + forms.Media(js=['courses/admin/autocomplete_filter.js'])
+        )
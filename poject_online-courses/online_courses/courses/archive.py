@@ -0,0 +1,302 @@
+import json
+import zlib
+from datetime import timedelta
+from types import SimpleNamespace
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q, Sum
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import search
+from .counters import adjust
+from .models import Comment, CommentArchiveChunk, Lecture
+from .pagination import CursorPaginator
+
+# Архив комментариев: комментарии старше ARCHIVE_AFTER_DAYS дней переносятся из Comment
+# в блоки CommentArchiveChunk по CHUNK_SIZE штук, самые старые первыми. Поэтому
+# архивные комментарии лекции всегда старше оставшихся в Comment, и пагинация
+# просто продолжает листать архив, когда комментарии в основной таблице закончились.
+# Lecture.comment_count учитывает и архивные комментарии; в полнотекстовый поиск они не входят.
+ARCHIVE_AFTER_DAYS = getattr(settings, 'COURSES_COMMENT_ARCHIVE_DAYS', 365)
+CHUNK_SIZE = getattr(settings, 'COURSES_COMMENT_ARCHIVE_CHUNK', 500)
+
+# Курсор архивного комментария: листать от него назад нужно сначала по архиву
+ARCHIVE_CURSOR_PREFIX = 'a.'
+
+
+class ArchivedComment:
+    """
+    Комментарий из архива. Только для чтения; атрибуты те же, что нужны шаблонам
+    и выгрузке от Comment.
+    """
+    archived = True
+
+    def __init__(self, lecture_id, row):
+        self.id = self.pk = row[0]
+        self.lecture_id = lecture_id
+        self.author_id = row[1]
+        self.author = SimpleNamespace(pk=row[1], id=row[1], username=row[2])
+        self.text = row[3]
+        self.created_at = parse_datetime(row[4])
+        self.updated_at = parse_datetime(row[5])
+
+    def __repr__(self):
+        return f"<ArchivedComment {self.id}>"
+
+    @property
+    def key(self):
+        return self.created_at, self.id
+
+
+def _isoformat(value):
+    # В отличие от DjangoJSONEncoder сохраняет микросекунды: они входят в ключ пагинации
+    return value.isoformat()
+
+
+def _pack(rows):
+    return zlib.compress(json.dumps(rows, ensure_ascii=False, default=_isoformat).encode(), 9)
+
+
+def _unpack(chunk):
+    """
+    Комментарии блока от старых к новым.
+    """
+    return [ArchivedComment(chunk.lecture_id, row) for row in json.loads(zlib.decompress(bytes(chunk.data)))]
+
+
+def _chunk_fields(rows):
+    return {
+        'first_created_at': rows[0][4], 'first_id': rows[0][0],
+        'last_created_at': rows[-1][4], 'last_id': rows[-1][0],
+        'comment_count': len(rows), 'data': _pack(rows),
+    }
+
+
+def _delete_rows(model, ids):
+    """
+    Удаляет строки model с указанными id одним запросом, без сигналов и каскада.
+    """
+    ops = connection.ops
+    table, pk = ops.quote_name(model._meta.db_table), ops.quote_name(model._meta.pk.column)
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {table} WHERE {pk} IN ({", ".join(["%s"] * len(ids))})', ids)
+
+
+def archive_lecture(lecture_id, cutoff, batch_size=CHUNK_SIZE):
+    """
+    Переносит в архив одну пачку самых старых комментариев лекции, созданных до cutoff.
+    Возвращает количество перенесённых комментариев (0 - переносить больше нечего).
+    """
+    with transaction.atomic():
+        rows = [
+            list(row) for row in Comment.objects.filter(lecture_id=lecture_id, created_at__lt=cutoff)
+            .order_by('created_at', 'id')
+            .values_list('id', 'author_id', 'author__username', 'text', 'created_at', 'updated_at')[:batch_size]
+        ]
+        if not rows:
+            return 0
+        chunk = CommentArchiveChunk.objects.create(lecture_id=lecture_id, **_chunk_fields(rows))
+        chunk.authors.add(*{row[1] for row in rows})
+        ids = [row[0] for row in rows]
+        # Намеренно без сигналов post_delete: комментарии не исчезают, а переезжают в архив,
+        # поэтому comment_count и updated_at лекции меняться не должны. QuerySet.delete()
+        # загрузил бы пачку и отправил сигнал для каждой строки (пересчёт счётчика и индекса
+        # на каждый комментарий), поэтому пачка удаляется одним DELETE ... WHERE id IN.
+        # У Comment нет зависимых моделей, так что каскад здесь не нужен.
+        _delete_rows(Comment, ids)
+        # Архивные комментарии в поиске не участвуют (об этом сказано на странице поиска)
+        search.remove_objects('comment', ids)
+    return len(rows)
+
+
+def archive_comments(days=ARCHIVE_AFTER_DAYS, batch_size=CHUNK_SIZE, max_batches=None):
+    """
+    Переносит в архив комментарии старше days дней пачками по batch_size,
+    каждая пачка - отдельная транзакция. max_batches ограничивает объём
+    работы за один запуск. Возвращает (комментариев, пачек).
+    """
+    cutoff = timezone.now() - timedelta(days=days)
+    archived = batches = 0
+    lecture_ids = Lecture.objects.filter(comment_count__gt=0).order_by('id').values_list('id', flat=True)
+    for lecture_id in lecture_ids.iterator():
+        while max_batches is None or batches < max_batches:
+            moved = archive_lecture(lecture_id, cutoff, batch_size)
+            if not moved:
+                break
+            archived += moved
+            batches += 1
+        if max_batches is not None and batches >= max_batches:
+            break
+    return archived, batches
+
+
+def archived_count(lecture_id):
+    """
+    Количество архивных комментариев лекции (суммируются счётчики блоков).
+    """
+    return CommentArchiveChunk.objects.filter(lecture_id=lecture_id).aggregate(total=Sum('comment_count'))['total'] or 0
+
+
+def _after_key(key):
+    return Q(last_created_at__gt=key[0]) | Q(last_created_at=key[0], last_id__gt=key[1])
+
+
+def _before_key(key):
+    return Q(first_created_at__lt=key[0]) | Q(first_created_at=key[0], first_id__lt=key[1])
+
+
+def older_comments(lecture_id, key, limit):
+    """
+    До limit архивных комментариев старше ключа key = (created_at, id), от новых к старым.
+    При key=None - самые новые комментарии архива.
+    """
+    chunks = CommentArchiveChunk.objects.filter(lecture_id=lecture_id)
+    if key is not None:
+        chunks = chunks.filter(_before_key(key))
+    result = []
+    for chunk in chunks.order_by('-last_created_at', '-last_id').iterator(chunk_size=2):
+        for comment in reversed(_unpack(chunk)):
+            if key is None or comment.key < key:
+                result.append(comment)
+                if len(result) >= limit:
+                    return result
+    return result
+
+
+def newer_comments(lecture_id, key, limit):
+    """
+    До limit архивных комментариев новее ключа key, от старых к новым.
+    """
+    chunks = CommentArchiveChunk.objects.filter(lecture_id=lecture_id).filter(_after_key(key))
+    result = []
+    for chunk in chunks.order_by('last_created_at', 'last_id').iterator(chunk_size=2):
+        for comment in _unpack(chunk):
+            if comment.key > key:
+                result.append(comment)
+                if len(result) >= limit:
+                    return result
+    return result
+
+
+def comment_slice(lecture_id, offset, limit):
+    """
+    limit архивных комментариев, начиная с offset-го от самого нового.
+    Блоки до нужного пропускаются по их счётчикам, без распаковки.
+    """
+    result = []
+    chunks = CommentArchiveChunk.objects.filter(lecture_id=lecture_id).defer('data').order_by('-last_created_at', '-last_id')
+    for chunk in chunks.iterator(chunk_size=50):
+        if offset >= chunk.comment_count:
+            offset -= chunk.comment_count
+            continue
+        comments = _unpack(chunk)[::-1]
+        result.extend(comments[offset:offset + limit - len(result)])
+        offset = 0
+        if len(result) >= limit:
+            break
+    return result
+
+
+def course_comments(course):
+    """
+    Генератор архивных комментариев всех лекций курса, по блокам от старых к новым.
+    """
+    chunks = CommentArchiveChunk.objects.filter(lecture__course=course).order_by('first_created_at', 'first_id')
+    for chunk in chunks.iterator(chunk_size=10):
+        yield from _unpack(chunk)
+
+
+def forget_author(user):
+    """
+    Удаляет из архива комментарии пользователя, как это делает каскадное удаление в Comment,
+    и уменьшает счётчики комментариев их лекций.
+    """
+    for chunk in CommentArchiveChunk.objects.filter(authors=user):
+        comments = json.loads(zlib.decompress(bytes(chunk.data)))
+        rows = [row for row in comments if row[1] != user.pk]
+        if rows:
+            for field, value in _chunk_fields(rows).items():
+                setattr(chunk, field, value)
+            chunk.save()
+        else:
+            chunk.delete()
+        adjust(Lecture, chunk.lecture_id, 'comment_count', len(rows) - len(comments), updated_at=timezone.now())
+
+
+class ArchiveCursorPaginator(CursorPaginator):
+    """
+    Курсорный пагинатор комментариев лекции, который после самого старого
+    комментария в Comment продолжает листать архив.
+
+    Пока страница целиком помещается в Comment, архив не читается. Курсоры
+    архивных комментариев помечены префиксом: от них вперёд читается только архив,
+    назад - сначала архив, затем Comment.
+    """
+    def __init__(self, lecture, object_list, per_page):
+        super().__init__(object_list, per_page, ordering=('-created_at', '-id'))
+        self.lecture_id = lecture.pk
+        self.comment_count = lecture.comment_count
+
+    def encode_cursor(self, obj, reverse=False):
+        cursor = super().encode_cursor(obj, reverse)
+        return ARCHIVE_CURSOR_PREFIX + cursor if getattr(obj, 'archived', False) else cursor
+
+    def page(self, cursor=None):
+        in_archive = bool(cursor) and cursor.startswith(ARCHIVE_CURSOR_PREFIX)
+        if not in_archive:
+            queryset, reverse = self._page_query(cursor)
+            rows = list(queryset)
+            # На первой странице архив не нужен, если в ней уже все комментарии лекции
+            if not reverse and len(rows) <= self.per_page and (cursor or len(rows) < self.comment_count):
+                if rows:
+                    key = rows[-1].created_at, rows[-1].id
+                else:
+                    key = tuple(self.decode_cursor(cursor)[0]) if cursor else None
+                rows += older_comments(self.lecture_id, key, self.per_page + 1 - len(rows))
+            return self._finish_page(rows, reverse)
+
+        values, reverse = self.decode_cursor(cursor[len(ARCHIVE_CURSOR_PREFIX):])
+        key = tuple(values)
+        if not reverse:
+            return self._finish_page(older_comments(self.lecture_id, key, self.per_page + 1), reverse)
+        rows = newer_comments(self.lecture_id, key, self.per_page + 1)
+        if len(rows) <= self.per_page:
+            oldest = self.object_list.order_by(*self._reversed_ordering())
+            rows += list(oldest[:self.per_page + 1 - len(rows)])
+        return self._finish_page(rows, reverse)
+
+    async def apage(self, cursor=None):
+        # Блоки архива распаковываются синхронным кодом, поэтому страница собирается в потоке
+        return await sync_to_async(self.page)(cursor)
+
+
+class ArchivedCommentList:
+    """
+    Список комментариев лекции от новых к старым для обычного Paginator:
+    сначала комментарии из Comment, за ними архив.
+    Количество берётся из хранимого Lecture.comment_count.
+    """
+    def __init__(self, lecture, object_list):
+        self.lecture = lecture
+        self.object_list = object_list.order_by('-created_at', '-id')
+
+    def count(self):
+        return self.lecture.comment_count
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            raise TypeError("Поддерживаются только срезы")
+        start, stop = index.start or 0, index.stop
+        rows = list(self.object_list[start:stop])
+        if len(rows) == stop - start:
+            return rows
+        # Комментарии в Comment закончились: rows - их хвост, остальное берём из архива
+        hot_count = start + len(rows) if rows else self.lecture.comment_count - archived_count(self.lecture.pk)
+        offset = start + len(rows) - hot_count
+        return rows + comment_slice(self.lecture.pk, max(offset, 0), stop - start - len(rows))
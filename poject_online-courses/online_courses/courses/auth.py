@@ -0,0 +1,47 @@
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import caches
+from django.core.exceptions import PermissionDenied
+
+# Кэш пользователей, загружаемых для каждого запроса с сессией.
+# Запись удаляется при любом сохранении или удалении пользователя (см. signals.py),
+# TTL лишь ограничивает срок жизни после изменений в обход save(), например update().
+USER_CACHE_ALIAS = getattr(settings, 'COURSES_USER_CACHE_ALIAS', 'default')
+USER_CACHE_TIMEOUT = getattr(settings, 'COURSES_USER_CACHE_TIMEOUT', 60 * 15)
+
+
+def _key(user_id):
+    return f'courses:user:{user_id}'
+
+
+def forget_user(user_id):
+    """
+    Удаляет пользователя из кэша, следующий запрос загрузит его из базы.
+    """
+    caches[USER_CACHE_ALIAS].delete(_key(user_id))
+
+
+class CachedModelBackend(ModelBackend):
+    """
+    ModelBackend, который берёт пользователя сессии из кэша вместо запроса к auth_user.
+
+    Смена пароля по-прежнему завершает другие сессии: Django сверяет хэш из сессии
+    с паролем пользователя, а сохранение пользователя удаляет его из кэша.
+    """
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        user = super().authenticate(request, username, password, **kwargs)
+        if user is None and password is not None:
+            # Следующий в AUTHENTICATION_BACKENDS ModelBackend нужен только для старых сессий:
+            # PermissionDenied останавливает перебор, и неверный пароль не хэшируется второй раз
+            raise PermissionDenied
+        return user
+
+    def get_user(self, user_id):
+        cache = caches[USER_CACHE_ALIAS]
+        user = cache.get(_key(user_id))
+        if user is None:
+            user = super().get_user(user_id)
+            if user is not None:
+                cache.set(_key(user_id), user, USER_CACHE_TIMEOUT)
+            return user
+        return user if self.user_can_authenticate(user) else None
@@ -0,0 +1,204 @@
+import hashlib
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.safestring import mark_safe
+
+# Время жизни закэшированных страниц и фрагментов.
+# Устаревание обеспечивается версиями, TTL лишь ограничивает размер кэша.
+PAGE_CACHE_TIMEOUT = getattr(settings, 'COURSES_PAGE_CACHE_TIMEOUT', 60 * 60 * 24)
+
+KEY_PREFIX = 'courses'
+STATS_KEYS = ('hits', 'misses')
+
+
+def _version_key(name):
+    return f'{KEY_PREFIX}:version:{name}'
+
+
+def get_version(name):
+    """
+    Возвращает текущую версию пространства ключей.
+    Если версия вытеснена из кэша, начинается с метки времени,
+    чтобы не совпасть со старыми записями.
+    """
+    key = _version_key(name)
+    version = cache.get(key)
+    if version is None:
+        version = time.time_ns()
+        if not cache.add(key, version, None):
+            version = cache.get(key, version)
+    return version
+
+
+def get_versions(names):
+    """
+    Возвращает версии нескольких пространств ключей одним обращением к кэшу.
+    """
+    stored = cache.get_many([_version_key(name) for name in names])
+    return [stored.get(_version_key(name)) or get_version(name) for name in names]
+
+
+def bump_version(name):
+    """
+    Увеличивает версию, делая недействительными все записи с её участием.
+    """
+    key = _version_key(name)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        version = time.time_ns()
+        cache.set(key, version, None)
+        return version
+
+
+def _count(stat):
+    key = f'{KEY_PREFIX}:stats:{stat}'
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, None)
+
+
+async def _acount(stat):
+    key = f'{KEY_PREFIX}:stats:{stat}'
+    try:
+        await cache.aincr(key)
+    except ValueError:
+        await cache.aset(key, 1, None)
+
+
+def get_stats():
+    """
+    Возвращает счётчики попаданий и промахов кэша страниц и фрагментов.
+    """
+    keys = {f'{KEY_PREFIX}:stats:{stat}': stat for stat in STATS_KEYS}
+    values = cache.get_many(keys)
+    stats = {stat: values.get(key, 0) for key, stat in keys.items()}
+    total = stats['hits'] + stats['misses']
+    stats['hit_ratio'] = round(stats['hits'] / total, 4) if total else 0.0
+    return stats
+
+
+def make_key(kind, name, versions, suffix=''):
+    """
+    Строит ключ записи из имени, текущих версий и произвольного суффикса (например, пути).
+    """
+    version_part = '.'.join(str(v) for v in get_versions(versions))
+    digest = hashlib.md5(suffix.encode(), usedforsecurity=False).hexdigest()
+    return f'{KEY_PREFIX}:{kind}:{name}:{version_part}:{digest}'
+
+
+def cache_get(key):
+    value = cache.get(key)
+    _count('misses' if value is None else 'hits')
+    return value
+
+
+async def amake_key(kind, name, versions, suffix=''):
+    """
+    Асинхронный вариант make_key().
+    """
+    stored = await cache.aget_many([_version_key(v) for v in versions])
+    values = []
+    for v in versions:
+        version = stored.get(_version_key(v))
+        if version is None:
+            version = await sync_to_async(get_version)(v)
+        values.append(str(version))
+    digest = hashlib.md5(suffix.encode(), usedforsecurity=False).hexdigest()
+    return f'{KEY_PREFIX}:{kind}:{name}:{".".join(values)}:{digest}'
+
+
+async def acache_get(key):
+    value = await cache.aget(key)
+    await _acount('misses' if value is None else 'hits')
+    return value
+
+
+def get_or_set_fragment(name, versions, render):
+    """
+    Возвращает HTML-фрагмент из кэша или рендерит и сохраняет его.
+    """
+    key = make_key('fragment', name, versions)
+    html = cache_get(key)
+    if html is None:
+        html = str(render())
+        cache.set(key, html, PAGE_CACHE_TIMEOUT)
+    return mark_safe(html)
+
+
+async def aget_or_set_fragment(name, versions, arender):
+    """
+    Асинхронный вариант get_or_set_fragment(); arender - корутинная функция.
+    """
+    key = await amake_key('fragment', name, versions)
+    html = await acache_get(key)
+    if html is None:
+        html = str(await arender())
+        await cache.aset(key, html, PAGE_CACHE_TIMEOUT)
+    return mark_safe(html)
+
+
+class VersionedPageCacheMixin:
+    """
+    Кэширует отрендеренную страницу целиком для анонимных GET-запросов.
+
+    Ключ строится из версий, возвращаемых get_cache_versions(), и полного пути
+    запроса, поэтому изменение данных (см. signals.py) сразу даёт новую страницу.
+    """
+    cache_name = None
+
+    def get_cache_versions(self):
+        return []
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method != 'GET' or request.user.is_authenticated:
+            return super().dispatch(request, *args, **kwargs)
+
+        key = make_key('page', self.cache_name, self.get_cache_versions(), request.get_full_path())
+        cached = cache_get(key)
+        if cached is not None:
+            content, content_type = cached
+            return HttpResponse(content, content_type=content_type)
+
+        response = super().dispatch(request, *args, **kwargs)
+
+        def store(response):
+            if response.status_code == 200:
+                cache.set(key, (response.content, response['Content-Type']), PAGE_CACHE_TIMEOUT)
+
+        if hasattr(response, 'add_post_render_callback'):
+            response.add_post_render_callback(store)
+        else:
+            store(response)
+        return response
+
+
+class AsyncVersionedPageCacheMixin:
+    """
+    Вариант VersionedPageCacheMixin для асинхронных представлений.
+    """
+    cache_name = None
+
+    def get_cache_versions(self):
+        return []
+
+    async def dispatch(self, request, *args, **kwargs):
+        user = await request.auser()
+        if request.method != 'GET' or user.is_authenticated:
+            return await super().dispatch(request, *args, **kwargs)
+
+        key = await amake_key('page', self.cache_name, self.get_cache_versions(), request.get_full_path())
+        cached = await acache_get(key)
+        if cached is not None:
+            content, content_type = cached
+            return HttpResponse(content, content_type=content_type)
+
+        response = await super().dispatch(request, *args, **kwargs)
+        if response.status_code == 200:
+            await cache.aset(key, (response.content, response['Content-Type']), PAGE_CACHE_TIMEOUT)
+        return response
@@ -0,0 +1,97 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.utils.text import slugify
+
+from . import archive, search
+from .counters import recount
+from .models import Comment, Course, Lecture, Test
+from .quiz_stats import create_question_rows
+
+User = get_user_model()
+
+BATCH_SIZE = 500
+
+
+def unique_slug(base):
+    """
+    Возвращает свободный slug вида base, base-2, base-3... за один запрос.
+    """
+    max_length = Course._meta.get_field('slug').max_length
+    base = slugify(base)[:max_length - 4] or 'course'
+    taken = set(Course.objects.filter(slug__startswith=base).values_list('slug', flat=True))
+    slug, number = base, 1
+    while slug in taken:
+        number += 1
+        slug = f'{base}-{number}'
+    return slug
+
+
+def fill_pks(model, objects, **parent):
+    """
+    Проставляет первичные ключи объектам после bulk_create, если база их не вернула.
+    Объекты вставляются по порядку, поэтому это последние len(objects) записей родителя.
+    """
+    if objects and objects[0].pk is None:
+        pks = reversed(model.objects.filter(**parent).order_by('-id').values_list('id', flat=True)[:len(objects)])
+        for obj, pk in zip(objects, pks):
+            obj.pk = pk
+    return objects
+
+
+@transaction.atomic
+def clone_course(course, author=None, title=None, slug=None, include_comments=False):
+    """
+    Копирует курс вместе с лекциями и тестами (и, по желанию, комментариями).
+
+    Каждая модель копируется одним bulk_create, связи переносятся через
+    соответствие старых и новых первичных ключей, поэтому число запросов
+    не зависит от размера курса.
+
+    Файл изображения общий с оригиналом, а уменьшенные копии у курса свои:
+    их описание не копируется, генерацию после фиксации транзакции запускает
+    сигнал course_image_changed.
+    """
+    copy = Course.objects.create(
+        title=title or f"{course.title} (копия)",
+        slug=slug or unique_slug(f'{course.slug}-copy'),
+        description=course.description,
+        author=author or course.author,
+        image=course.image,
+    )
+
+    lectures = list(course.lectures.order_by('order', 'id'))
+    new_lectures = fill_pks(Lecture, Lecture.objects.bulk_create([
+        Lecture(course=copy, title=lecture.title, video_url=lecture.video_url, order=lecture.order,
+                progress_bit=lecture.progress_bit)
+        for lecture in lectures
+    ], batch_size=BATCH_SIZE), course=copy)
+    lecture_map = {old.pk: new for old, new in zip(lectures, new_lectures)}
+
+    tests = list(Test.objects.filter(lecture__course=course).order_by('id'))
+    new_tests = fill_pks(Test, Test.objects.bulk_create([
+        Test(lecture=lecture_map[test.lecture_id], question=test.question,
+             correct_answer=test.correct_answer, choices=test.choices)
+        for test in tests
+    ], batch_size=BATCH_SIZE), lecture__course=copy)
+
+    create_question_rows(new_tests, batch_size=BATCH_SIZE)
+
+    new_comments = []
+    if include_comments:
+        # Копируются и архивные комментарии (они старше остальных); в копии они снова попадают в Comment
+        comments = list(archive.course_comments(course))
+        authors = User.objects.in_bulk({comment.author_id for comment in comments})
+        for comment in comments:
+            comment.author = authors[comment.author_id]
+        comments += Comment.objects.filter(lecture__course=course).select_related('author').order_by('created_at', 'id')
+        new_comments = fill_pks(Comment, Comment.objects.bulk_create([
+            Comment(lecture=lecture_map[comment.lecture_id], author=comment.author, text=comment.text)
+            for comment in comments
+        ], batch_size=BATCH_SIZE), lecture__course=copy)
+
+    search.index_new_objects('lecture', new_lectures)
+    search.index_new_objects('test', new_tests)
+    search.index_new_objects('comment', new_comments)
+    recount(Course.objects.filter(pk=copy.pk))
+    copy.lecture_count = len(new_lectures)
+    return copy
@@ -0,0 +1,91 @@
+from django.contrib.messages import get_messages
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+
+# Условные GET-запросы (If-None-Match / If-Modified-Since) для страниц курса и лекции.
+# Изменение лекции отмечается в Course.updated_at, изменение комментария или теста -
+# в Lecture.updated_at (см. signals.py), поэтому для проверки достаточно прочитать
+# одно поле страницы по первичному ключу или slug.
+
+
+def touch(model, pk, when=None):
+    """
+    Отмечает объект изменённым одним UPDATE, не вызывая save() и сигналы.
+    """
+    return model.objects.filter(pk=pk).update(updated_at=when or timezone.now())
+
+
+def make_validators(updated_at, user):
+    """
+    Возвращает (ETag, Last-Modified) страницы.
+
+    Страница зависит и от пользователя (меню, кнопки автора), поэтому его id входит в ETag.
+    ETag слабый: токен CSRF в форме при каждом рендеринге разный.
+    """
+    etag = f'W/"{updated_at.timestamp():.6f}-{user.pk or 0}"'
+    # Last-Modified передаётся с точностью до секунды, точнее сравнивает ETag
+    return etag, int(updated_at.timestamp())
+
+
+def finalize(request, response, etag, last_modified):
+    """
+    Добавляет валидаторы к ответу 200 или 304 и требует от кэшей перепроверки.
+    """
+    if response.status_code in (200, 304):
+        response.headers.setdefault('ETag', etag)
+        response.headers.setdefault('Last-Modified', http_date(last_modified))
+        patch_cache_control(response, no_cache=True)
+        if request.user.is_authenticated:
+            patch_cache_control(response, private=True)
+        patch_vary_headers(response, ('Cookie',))
+    return response
+
+
+def _is_conditional(request):
+    # Непоказанные сообщения попадут в страницу, поэтому её нужно отрендерить заново
+    return request.method in ('GET', 'HEAD') and not len(get_messages(request))
+
+
+class ConditionalGetMixin:
+    """
+    Отвечает 304 Not Modified до загрузки данных и рендеринга шаблона,
+    если страница не изменилась с версии, которая есть у клиента.
+
+    get_modified_queryset() должен выбирать объект страницы по индексу;
+    из него читается только updated_at.
+    """
+    def get_modified_queryset(self):
+        raise NotImplementedError
+
+    def dispatch(self, request, *args, **kwargs):
+        # Асинхронные подклассы проверяют условия в AsyncConditionalGetMixin
+        if self.view_is_async or not _is_conditional(request):
+            return super().dispatch(request, *args, **kwargs)
+        updated_at = self.get_modified_queryset().values_list('updated_at', flat=True).first()
+        if updated_at is None:
+            return super().dispatch(request, *args, **kwargs)
+        etag, last_modified = make_validators(updated_at, request.user)
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = super().dispatch(request, *args, **kwargs)
+        return finalize(request, response, etag, last_modified)
+
+
+class AsyncConditionalGetMixin(ConditionalGetMixin):
+    """
+    Вариант ConditionalGetMixin для асинхронных представлений.
+    """
+    async def dispatch(self, request, *args, **kwargs):
+        # Как _resolve_user() в views.py: дальше пользователь нужен без синхронных запросов
+        request.user = await request.auser()
+        if not _is_conditional(request):
+            return await super().dispatch(request, *args, **kwargs)
+        updated_at = await self.get_modified_queryset().values_list('updated_at', flat=True).afirst()
+        if updated_at is None:
+            return await super().dispatch(request, *args, **kwargs)
+        etag, last_modified = make_validators(updated_at, request.user)
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = await super().dispatch(request, *args, **kwargs)
+        return finalize(request, response, etag, last_modified)
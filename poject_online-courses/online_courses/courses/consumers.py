@@ -0,0 +1,47 @@
+import json
+
+from asgiref.sync import async_to_sync
+from channels.generic.websocket import AsyncWebsocketConsumer
+from channels.layers import get_channel_layer
+from django.template.loader import render_to_string
+
+
+def lecture_group_name(lecture_id):
+    """
+    Имя группы каналов, в которую входят все открытые страницы лекции.
+    """
+    return f'lecture_{lecture_id}'
+
+
+def broadcast_comment(comment):
+    """
+    Рассылает отрендеренный комментарий всем клиентам, открывшим страницу лекции.
+    """
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return
+    html = render_to_string('courses/comment_item.html', {'comment': comment})
+    async_to_sync(channel_layer.group_send)(
+        lecture_group_name(comment.lecture_id),
+        {'type': 'comment.posted', 'html': html},
+    )
+
+
+class LectureCommentsConsumer(AsyncWebsocketConsumer):
+    """
+    WebSocket-потребитель новых комментариев лекции.
+    Клиент только получает готовые HTML-фрагменты, сообщения от клиента игнорируются.
+    """
+    async def connect(self):
+        self.group_name = lecture_group_name(self.scope['url_route']['kwargs']['lecture_id'])
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
+        await self.accept()
+
+    async def disconnect(self, code):
+        await self.channel_layer.group_discard(self.group_name, self.channel_name)
+
+    async def comment_posted(self, event):
+        """
+        Отправляет клиенту фрагмент нового комментария.
+        """
+        await self.send(text_data=json.dumps({'html': event['html']}))
@@ -0,0 +1,58 @@
+from django.db.models import Count, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Comment, CommentArchiveChunk, Course, Lecture
+
+# Счётчики Course.lecture_count и Lecture.comment_count поддерживаются сигналами
+# (см. signals.py) атомарными UPDATE с F(). Массовые операции (bulk_create, update)
+# сигналы не отправляют, поэтому после них вызывается recount().
+# comment_count включает архивные комментарии (см. archive.py).
+
+
+def count_subquery(model, field):
+    """
+    Подзапрос "количество строк model, ссылающихся на текущую строку через field".
+    """
+    rows = model.objects.filter(**{field: OuterRef('pk')}).order_by().values(field).annotate(total=Count('pk'))
+    return Coalesce(Subquery(rows.values('total')), Value(0))
+
+
+def sum_subquery(model, field, column):
+    """
+    Подзапрос "сумма column по строкам model, ссылающимся на текущую строку через field".
+    """
+    rows = model.objects.filter(**{field: OuterRef('pk')}).order_by().values(field).annotate(total=Sum(column))
+    return Coalesce(Subquery(rows.values('total')), Value(0))
+
+
+def adjust(model, pk, field, delta, **changes):
+    """
+    Изменяет счётчик на delta одним UPDATE. Уменьшение не опускает счётчик ниже нуля.
+    changes - другие поля, записываемые тем же UPDATE (например, updated_at).
+    """
+    queryset = model.objects.filter(pk=pk)
+    if delta < 0:
+        queryset = queryset.filter(**{f'{field}__gte': -delta})
+    return queryset.update(**{field: F(field) + delta}, **changes)
+
+
+def recount(courses=None):
+    """
+    Пересчитывает счётчики курсов и их лекций двумя UPDATE.
+    courses - queryset курсов; по умолчанию пересчитываются все.
+    Записываются только разошедшиеся счётчики, и только у этих строк меняется updated_at.
+    Возвращает количество исправленных курсов и лекций.
+    """
+    lectures = Lecture.objects.all()
+    if courses is None:
+        courses = Course.objects.all()
+    else:
+        lectures = lectures.filter(course__in=courses.values('pk'))
+    lecture_count = count_subquery(Lecture, 'course')
+    comment_count = count_subquery(Comment, 'lecture') + sum_subquery(CommentArchiveChunk, 'lecture', 'comment_count')
+    now = timezone.now()
+    return (
+        courses.alias(actual=lecture_count).exclude(lecture_count=F('actual')).update(lecture_count=lecture_count, updated_at=now),
+        lectures.alias(actual=comment_count).exclude(comment_count=F('actual')).update(comment_count=comment_count, updated_at=now),
+    )
@@ -14,24 +14,37 @@ class CourseForm(forms.ModelForm):
         model = Course
         fields = ['title', 'slug', 'description', 'image']  # Добавьте поле slug, если необходимо
 
+class CourseCloneForm(forms.Form):
+    """
+    Форма копирования курса с лекциями и тестами.
+    - title: Заголовок нового курса
+    - slug: URL нового курса (если не указан, подбирается автоматически)
+    - include_comments: Копировать ли комментарии к лекциям
+    """
+    title = forms.CharField(max_length=150, label="Название курса")
+    slug = forms.SlugField(max_length=150, required=False, label="URL курса")
+    include_comments = forms.BooleanField(required=False, label="Копировать комментарии")
+
+    def clean_slug(self):
+        """
+        Проверяет, что указанный URL ещё не занят другим курсом.
+        """
+        slug = self.cleaned_data.get('slug')
+        if slug and Course.objects.filter(slug=slug).exists():
+            raise forms.ValidationError("Курс с таким URL уже существует.")
+        return slug
+
 class LectureForm(forms.ModelForm):
     """
     Форма для создания или редактирования лекции.
     Использует модель Lecture и позволяет вводить следующие поля:
     - title: Заголовок лекции
     - video_url: URL видео лекции
-    - order: Порядок лекции в курсе
+    Порядок лекции назначается автоматически и меняется через перестановку лекций курса.
     """
     class Meta:
         model = Lecture
-        fields = ['title', 'video_url', 'order']
-        
-    def __init__(self, *args, **kwargs):
-        """
-        Инициализация формы с установкой значения по умолчанию для поля order.
-        """
-        super().__init__(*args, **kwargs)
-        self.fields['order'].initial = 1  # Устанавливаем значение по умолчанию для поля order
+        fields = ['title', 'video_url']
 
 class CommentForm(forms.ModelForm):
     """
@@ -66,11 +79,13 @@ class TestForm(forms.ModelForm):
         choices = self.cleaned_data.get('choices')
         if not choices:
             raise forms.ValidationError("Это поле не может быть пустым.")
-        try:
-            import json
-            choices = json.loads(choices)
-            if not isinstance(choices, list) or len(choices) < 2:
-                raise forms.ValidationError("Введите как минимум два варианта ответа.")
-        except json.JSONDecodeError:
-            raise forms.ValidationError("Введите варианты ответов в формате JSON.")
+        # Поле JSONField формы уже разбирает JSON; строка остаётся, если JSON содержал строку
+        if isinstance(choices, str):
+            try:
+                import json
+                choices = json.loads(choices)
+            except json.JSONDecodeError:
+                raise forms.ValidationError("Введите варианты ответов в формате JSON.")
+        if not isinstance(choices, list) or len(choices) < 2:
+            raise forms.ValidationError("Введите как минимум два варианта ответа.")
         return choices
@@ -0,0 +1,73 @@
+from django.core.cache import cache
+from django.db import transaction
+
+from . import leaderboard, quiz_stats
+from .cache import PAGE_CACHE_TIMEOUT, bump_version, cache_get, make_key
+from .models import QuizAnswer, QuizAttempt, Test
+
+ANSWER_MAX_LENGTH = QuizAnswer._meta.get_field('selected_answer').max_length
+
+
+def _answer_key_version(lecture_id):
+    return f'tests:{lecture_id}'
+
+
+def get_answer_key(lecture_id):
+    """
+    Возвращает скомпилированный ключ ответов лекции: кортеж пар (id теста, правильный ответ).
+
+    Ключ собирается одним запросом и хранится в кэше до изменения любого теста лекции.
+    """
+    key = make_key('answer_key', lecture_id, [_answer_key_version(lecture_id)])
+    answer_key = cache_get(key)
+    if answer_key is None:
+        answer_key = tuple(
+            Test.objects.filter(lecture_id=lecture_id).order_by('id').values_list('id', 'correct_answer')
+        )
+        cache.set(key, answer_key, PAGE_CACHE_TIMEOUT)
+    return answer_key
+
+
+def invalidate_answer_key(lecture_id):
+    """
+    Сбрасывает ключ ответов лекции (вызывается из сигналов модели Test).
+    """
+    bump_version(_answer_key_version(lecture_id))
+
+
+def grade(answer_key, data):
+    """
+    Проверяет ответы за один проход по ключу.
+
+    data - словарь отправленных значений вида {'question_<id>': ответ}.
+    Возвращает количество правильных ответов и список (id теста, ответ, верно ли).
+    """
+    score = 0
+    answers = []
+    for test_id, correct_answer in answer_key:
+        selected = data.get(f'question_{test_id}') or ''
+        is_correct = selected == correct_answer
+        score += is_correct
+        answers.append((test_id, selected, is_correct))
+    return score, answers
+
+
+def record_attempt(lecture_id, user, score, answers):
+    """
+    Сохраняет попытку и все ответы на вопросы одной транзакцией (ответы - через bulk_create)
+    и обновляет агрегированную статистику вопросов и лекции и рейтинг курса.
+    """
+    with transaction.atomic():
+        attempt = QuizAttempt.objects.create(
+            lecture_id=lecture_id,
+            user=user if user is not None and user.is_authenticated else None,
+            score=score,
+            total=len(answers),
+        )
+        QuizAnswer.objects.bulk_create([
+            QuizAnswer(attempt=attempt, test_id=test_id, selected_answer=selected[:ANSWER_MAX_LENGTH], is_correct=is_correct)
+            for test_id, selected, is_correct in answers
+        ])
+        quiz_stats.record(lecture_id, score, answers)
+        leaderboard.record(attempt)
+    return attempt
@@ -0,0 +1,148 @@
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections
+from django.utils import timezone
+from PIL import Image, ImageOps, features
+
+from .cache import bump_version
+from .models import Course
+
+logger = logging.getLogger(__name__)
+
+# Ширины производных изображений карточек курсов
+WIDTHS = tuple(getattr(settings, 'COURSES_IMAGE_WIDTHS', (320, 640, 960)))
+# Генерировать ли изображения в фоновом потоке (False - синхронно, удобно для тестов)
+GENERATE_IN_BACKGROUND = getattr(settings, 'COURSES_IMAGE_BACKGROUND', True)
+
+JPEG_QUALITY = 82
+WEBP_QUALITY = 80
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='course-images')
+
+
+def webp_supported():
+    return features.check('webp')
+
+
+def rendition_name(source_name, width, extension):
+    """
+    Имя производного файла рядом с оригиналом: course_images/photo.jpg -> course_images/photo_320w.webp
+    """
+    stem, _ = os.path.splitext(source_name)
+    return f'{stem}_{width}w.{extension}'
+
+
+def _encode(image, fmt, quality):
+    buffer = BytesIO()
+    image.save(buffer, format=fmt, quality=quality, optimize=True)
+    return ContentFile(buffer.getvalue())
+
+
+def _save(name, content):
+    if default_storage.exists(name):
+        default_storage.delete(name)
+    return default_storage.save(name, content)
+
+
+def build_renditions(source_name):
+    """
+    Создаёт изображения фиксированной ширины в WebP (если поддерживается) и JPEG.
+    Возвращает описание для Course.image_renditions.
+    """
+    with default_storage.open(source_name, 'rb') as source:
+        original = ImageOps.exif_transpose(Image.open(source))
+        original.load()
+    if original.mode not in ('RGB', 'L'):
+        original = original.convert('RGB')
+
+    # Не увеличиваем изображение: ширины больше оригинала заменяются его шириной
+    widths = sorted({min(width, original.width) for width in WIDTHS})
+    renditions = []
+    for width in widths:
+        height = max(1, round(original.height * width / original.width))
+        resized = original.resize((width, height), Image.LANCZOS) if width != original.width else original
+        entry = {'width': width, 'jpeg': _save(rendition_name(source_name, width, 'jpg'), _encode(resized, 'JPEG', JPEG_QUALITY))}
+        if webp_supported():
+            entry['webp'] = _save(rendition_name(source_name, width, 'webp'), _encode(resized, 'WEBP', WEBP_QUALITY))
+        renditions.append(entry)
+    return {'source': source_name, 'items': renditions}
+
+
+def rendition_files(renditions):
+    """
+    Имена всех файлов из описания Course.image_renditions.
+    """
+    return {entry[fmt] for entry in (renditions or {}).get('items', ()) for fmt in ('jpeg', 'webp') if entry.get(fmt)}
+
+
+def delete_renditions(renditions, keep=(), course_id=None):
+    """
+    Удаляет из хранилища файлы уменьшенных копий курса course_id, кроме имён из keep
+    и файлов, на которые ссылаются другие курсы: имена копий зависят только от имени
+    оригинала, а копия курса (cloning.py) использует то же изображение.
+    Оригинал изображения не трогается.
+    """
+    names = rendition_files(renditions) - set(keep)
+    if not names:
+        return
+    shared = Course.objects.filter(image_renditions__source=renditions['source']).exclude(pk=course_id)
+    for other in shared.values_list('image_renditions', flat=True):
+        names -= rendition_files(other)
+    for name in names:
+        try:
+            default_storage.delete(name)
+        except OSError:
+            logger.warning("Не удалось удалить файл %s", name)
+
+
+def generate_for_course(course_id, force=False):
+    """
+    Создаёт производные изображения курса и сохраняет их описание.
+    Пропускает курс, если изображения уже созданы для текущего файла.
+    Копии прежнего изображения удаляются из хранилища.
+    """
+    course = Course.objects.filter(pk=course_id).only('image', 'image_renditions').first()
+    if course is None:
+        return False
+    source_name = course.image.name if course.image else ''
+    if not force and (course.image_renditions or {}).get('source', '') == source_name:
+        return False
+
+    renditions = build_renditions(source_name) if source_name else {}
+    # update() не вызывает post_save и не запускает генерацию повторно
+    if not Course.objects.filter(pk=course_id).update(image_renditions=renditions, updated_at=timezone.now()):
+        # Курс удалили, пока создавались копии
+        delete_renditions(renditions, course_id=course_id)
+        return False
+    # Имена копий зависят только от имени оригинала, совпадающие файлы уже перезаписаны
+    delete_renditions(course.image_renditions, keep=rendition_files(renditions), course_id=course_id)
+    bump_version('courses')
+    return True
+
+
+def _generate_in_thread(course_id):
+    try:
+        generate_for_course(course_id)
+    except Exception:
+        logger.exception("Не удалось создать изображения для курса %s", course_id)
+    finally:
+        connections.close_all()
+
+
+def schedule_generation(course):
+    """
+    Запускает генерацию изображений вне потока обработки запроса.
+    Вызывается из сигнала только при смене файла (см. signals.course_image_changed).
+    """
+    if (course.image_renditions or {}).get('source', '') == (course.image.name if course.image else ''):
+        return
+    if GENERATE_IN_BACKGROUND:
+        _executor.submit(_generate_in_thread, course.pk)
+    else:
+        generate_for_course(course.pk)
@@ -0,0 +1,198 @@
+import json
+import logging
+import random
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.template.backends.django import DjangoTemplates, Template
+
+logger = logging.getLogger('courses.timing')
+
+# Доля запросов, для которых собираются SQL и время шаблонов (0 - только общее время)
+SAMPLE_RATE = getattr(settings, 'COURSES_TIMING_SAMPLE_RATE', 0.1)
+# Запросы дольше порога (мс) записываются в лог; 0 - записывать все выбранные запросы
+SLOW_MS = getattr(settings, 'COURSES_TIMING_SLOW_MS', 500)
+# Добавлять ли заголовок Server-Timing в ответ
+SEND_HEADER = getattr(settings, 'COURSES_TIMING_HEADER', True)
+# Сколько самых частых повторяющихся запросов попадает в лог
+TOP_DUPLICATES = 3
+
+# Статистика текущего запроса. contextvars копируются в sync_to_async,
+# поэтому запросы асинхронных представлений учитываются так же, как синхронных.
+_current = ContextVar('courses_request_timing', default=None)
+
+
+class RequestStats:
+    """
+    Счётчики одного запроса: SQL (количество, время, повторы) и отрисовка шаблонов.
+    """
+    __slots__ = ('queries', 'sql_time', 'statements', 'template_time', 'template_depth')
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_time = 0.0
+        self.statements = {}
+        self.template_time = 0.0
+        self.template_depth = 0
+
+    def add_query(self, sql, duration):
+        self.queries += 1
+        self.sql_time += duration
+        # SQL уже параметризован (%s), поэтому одинаковый текст - один и тот же запрос
+        self.statements[sql] = self.statements.get(sql, 0) + 1
+
+    def duplicates(self):
+        """
+        Группы повторяющихся запросов (признак N+1): [(количество, sql)], самые частые первыми.
+        """
+        return sorted(((count, sql) for sql, count in self.statements.items() if count > 1), reverse=True)
+
+
+def record_query(execute, sql, params, many, context):
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.add_query(sql, time.perf_counter() - started)
+
+
+def install(connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def install_all():
+    """
+    Подключает учёт SQL ко всем уже открытым и ко всем новым соединениям.
+    """
+    connection_created.connect(install, dispatch_uid='courses.instrumentation')
+    for connection in connections.all(initialized_only=True):
+        install(connection)
+
+
+class InstrumentedTemplate(Template):
+    def render(self, context=None, request=None):
+        stats = _current.get()
+        if stats is None:
+            return super().render(context, request)
+        # Вложенная отрисовка (render_to_string внутри шаблона) уже учтена внешней
+        stats.template_depth += 1
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            stats.template_depth -= 1
+            if not stats.template_depth:
+                stats.template_time += time.perf_counter() - started
+
+
+class InstrumentedTemplates(DjangoTemplates):
+    """
+    Бэкенд шаблонов Django, измеряющий время отрисовки для RequestTimingMiddleware.
+    """
+    def from_string(self, template_code):
+        return InstrumentedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        template = super().get_template(template_name)
+        return InstrumentedTemplate(template.template, self)
+
+
+class RequestTimingMiddleware:
+    """
+    Измеряет время запроса, а для доли запросов (COURSES_TIMING_SAMPLE_RATE) - ещё
+    количество и время SQL, повторяющиеся запросы и время отрисовки шаблонов.
+
+    Результат добавляется в заголовок Server-Timing (виден в DevTools браузера),
+    а запросы дольше COURSES_TIMING_SLOW_MS записываются в лог courses.timing
+    одной строкой JSON. Для невыбранных запросов затраты - один вызов perf_counter
+    и проверка contextvar на каждый SQL-запрос.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        install_all()
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        stats, token, started = self.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            if token is not None:
+                _current.reset(token)
+        return self.finish(request, response, stats, started)
+
+    async def __acall__(self, request):
+        stats, token, started = self.start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            if token is not None:
+                _current.reset(token)
+        return self.finish(request, response, stats, started)
+
+    def start(self):
+        stats = token = None
+        if SAMPLE_RATE and random.random() < SAMPLE_RATE:
+            stats = RequestStats()
+            token = _current.set(stats)
+        return stats, token, time.perf_counter()
+
+    def finish(self, request, response, stats, started):
+        total_ms = (time.perf_counter() - started) * 1000
+        if SEND_HEADER:
+            response['Server-Timing'] = self.server_timing(stats, total_ms)
+        if SLOW_MS:
+            slow = total_ms >= SLOW_MS
+        else:
+            # Порог 0: записываем все запросы, для которых собрана подробная статистика
+            slow = stats is not None
+        if slow:
+            self.log(request, response, stats, total_ms)
+        return response
+
+    def server_timing(self, stats, total_ms):
+        metrics = []
+        if stats is not None:
+            duplicates = sum(count - 1 for count, _ in stats.duplicates())
+            metrics += [
+                f'sql;dur={stats.sql_time * 1000:.1f};desc="{stats.queries} queries, {duplicates} duplicates"',
+                f'tpl;dur={stats.template_time * 1000:.1f}',
+            ]
+        metrics.append(f'total;dur={total_ms:.1f}')
+        return ', '.join(metrics)
+
+    def log(self, request, response, stats, total_ms):
+        match = getattr(request, 'resolver_match', None)
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'view': match.view_name if match else None,
+            'status': response.status_code,
+            'total_ms': round(total_ms, 1),
+            'sampled': stats is not None,
+        }
+        if stats is not None:
+            duplicates = stats.duplicates()
+            record.update({
+                'queries': stats.queries,
+                'sql_ms': round(stats.sql_time * 1000, 1),
+                'template_ms': round(stats.template_time * 1000, 1),
+                'duplicate_groups': len(duplicates),
+                'duplicates': [{'count': count, 'sql': sql[:200]} for count, sql in duplicates[:TOP_DUPLICATES]],
+            })
+        level = logging.WARNING if SLOW_MS else logging.INFO
+        logger.log(level, json.dumps(record, ensure_ascii=False), extra={'timing': record})
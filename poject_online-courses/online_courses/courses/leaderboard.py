@@ -0,0 +1,135 @@
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Max, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from .models import Course, LeaderboardBucket, LeaderboardEntry, Lecture, QuizAttempt
+
+# Рейтинг курса хранится в двух таблицах: очки каждого участника (LeaderboardEntry)
+# и количество участников с одинаковыми очками (LeaderboardBucket).
+# Проверка попытки меняет не больше одной строки участника и двух корзин;
+# первые N читаются по индексу, место - суммой корзин с большими очками.
+TOP_SIZE = getattr(settings, 'COURSES_LEADERBOARD_SIZE', 20)
+BATCH_SIZE = 500
+
+
+def _best_score(user_id, lecture_id, exclude_pk):
+    # Индекс attempt_user_lecture_idx: просматриваются только попытки пользователя по лекции
+    return QuizAttempt.objects.filter(user_id=user_id, lecture_id=lecture_id).exclude(pk=exclude_pk).aggregate(
+        best=Max('score'),
+    )['best'] or 0
+
+
+def _course_and_best(attempt):
+    # Курс лекции и прежний лучший результат пользователя по ней - одним запросом
+    best = (
+        QuizAttempt.objects.filter(user_id=attempt.user_id, lecture_id=OuterRef('pk')).exclude(pk=attempt.pk)
+        .order_by().values('lecture_id').annotate(best=Max('score')).values('best')
+    )
+    return Lecture.objects.filter(pk=attempt.lecture_id).values_list('course_id', Coalesce(Subquery(best), Value(0))).first()
+
+
+def _add_to_bucket(course_id, score, delta):
+    buckets = LeaderboardBucket.objects.filter(course_id=course_id, score=score)
+    if delta < 0:
+        buckets.filter(users__gte=-delta).update(users=F('users') + delta)
+    elif not buckets.update(users=F('users') + delta):
+        # ignore_conflicts: корзину могла успеть создать параллельная транзакция
+        LeaderboardBucket.objects.bulk_create([LeaderboardBucket(course_id=course_id, score=score)], ignore_conflicts=True)
+        buckets.update(users=F('users') + delta)
+
+
+def record(attempt):
+    """
+    Учитывает проверенную попытку: если пользователь улучшил свой лучший результат
+    по лекции, его очки в курсе растут на разницу. Попытки анонимных пользователей
+    и попытки без улучшения не меняют рейтинг и стоят одного чтения.
+    Вызывается в транзакции record_attempt().
+    """
+    if attempt.user_id is None:
+        return
+    course_id, best = _course_and_best(attempt)
+    gain = attempt.score - best
+    if gain <= 0:
+        return
+    entry, created = LeaderboardEntry.objects.select_for_update().get_or_create(
+        course_id=course_id, user_id=attempt.user_id, defaults={'score': gain},
+    )
+    if not created:
+        # Повторная проверка под блокировкой строки: параллельная попытка могла уже засчитать улучшение
+        gain = attempt.score - _best_score(attempt.user_id, attempt.lecture_id, attempt.pk)
+        if gain <= 0:
+            return
+        _add_to_bucket(course_id, entry.score, -1)
+        entry.score += gain
+        entry.save(update_fields=['score', 'updated_at'])
+    _add_to_bucket(course_id, entry.score, 1)
+
+
+def top(course, limit=TOP_SIZE):
+    """
+    Первые limit участников курса: список пар (место, LeaderboardEntry).
+    Участники с равными очками делят место.
+    """
+    entries = LeaderboardEntry.objects.filter(course=course).select_related('user').order_by('-score', 'updated_at')[:limit]
+    ranked = []
+    for index, entry in enumerate(entries, start=1):
+        place = ranked[-1][0] if ranked and ranked[-1][1].score == entry.score else index
+        ranked.append((place, entry))
+    return ranked
+
+
+def rank(course, user):
+    """
+    Место пользователя в курсе: (место, очки, всего участников) или None, если его нет в рейтинге.
+    """
+    score = LeaderboardEntry.objects.filter(course=course, user=user).values_list('score', flat=True).first()
+    if score is None:
+        return None
+    totals = LeaderboardBucket.objects.filter(course=course).aggregate(
+        above=Sum('users', filter=Q(score__gt=score)), total=Sum('users'),
+    )
+    return (totals['above'] or 0) + 1, score, totals['total'] or 0
+
+
+def forget_user(user):
+    """
+    Убирает пользователя из корзин его курсов (строки рейтинга удалятся каскадно вместе с ним).
+    """
+    for course_id, score in LeaderboardEntry.objects.filter(user=user).values_list('course_id', 'score'):
+        _add_to_bucket(course_id, score, -1)
+
+
+@transaction.atomic
+def rebuild(courses=None, batch_size=BATCH_SIZE):
+    """
+    Пересчитывает рейтинг по сохранённым попыткам.
+    courses - queryset курсов; по умолчанию пересчитываются все.
+    Возвращает количество участников.
+    """
+    if courses is None:
+        courses = Course.objects.all()
+    course_ids = courses.values('pk')
+    LeaderboardEntry.objects.filter(course__in=course_ids).delete()
+    LeaderboardBucket.objects.filter(course__in=course_ids).delete()
+
+    scores = defaultdict(int)
+    best = (
+        QuizAttempt.objects.filter(user__isnull=False, lecture__course__in=course_ids)
+        .values('lecture__course', 'user', 'lecture').annotate(best=Max('score')).order_by()
+    )
+    for row in best.iterator(chunk_size=batch_size * 10):
+        scores[row['lecture__course'], row['user']] += row['best']
+    scores = {key: score for key, score in scores.items() if score > 0}
+
+    LeaderboardEntry.objects.bulk_create([
+        LeaderboardEntry(course_id=course_id, user_id=user_id, score=score)
+        for (course_id, user_id), score in scores.items()
+    ], batch_size=batch_size)
+    LeaderboardBucket.objects.bulk_create([
+        LeaderboardBucket(course_id=course_id, score=score, users=users)
+        for (course_id, score), users in Counter((course_id, score) for (course_id, _), score in scores.items()).items()
+    ], batch_size=batch_size)
+    return len(scores)
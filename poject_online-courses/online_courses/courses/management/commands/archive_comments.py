@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from courses import archive
+
+
+class Command(BaseCommand):
+    """
+    Переносит старые комментарии лекций в архив (CommentArchiveChunk).
+
+    Каждая пачка переносится отдельной транзакцией, поэтому команду можно
+    прервать в любой момент; --max-batches ограничивает работу за один запуск (удобно для cron).
+    """
+    help = "Переносит комментарии старше заданного возраста в сжатый архив"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=archive.ARCHIVE_AFTER_DAYS, help="Архивировать комментарии старше стольких дней")
+        parser.add_argument('--batch-size', type=int, default=archive.CHUNK_SIZE, help="Комментариев в одном блоке архива")
+        parser.add_argument('--max-batches', type=int, default=None, help="Не больше стольких пачек за запуск")
+
+    def handle(self, *args, **options):
+        archived, batches = archive.archive_comments(options['days'], options['batch_size'], options['max_batches'])
+        self.stdout.write(self.style.SUCCESS(f"В архив перенесено комментариев: {archived}, блоков: {batches}."))
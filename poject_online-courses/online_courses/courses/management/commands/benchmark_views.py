@@ -0,0 +1,99 @@
+import asyncio
+import time
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from django.test import AsyncRequestFactory
+
+from courses.models import Course, Lecture
+from courses.views import (
+    CourseListView, CourseDetailView, LectureDetailView, TestDetailView,
+    AsyncCourseListView, AsyncCourseDetailView, AsyncLectureDetailView, AsyncTestDetailView,
+)
+
+User = get_user_model()
+
+
+def percentile(values, percent):
+    """
+    Перцентиль по методу ближайшего ранга.
+    """
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(percent / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class Command(BaseCommand):
+    """
+    Сравнивает синхронные и асинхронные представления страниц чтения под конкурентной нагрузкой.
+
+    Запросы выполняются внутри процесса так же, как их выполняет ASGIHandler:
+    синхронное представление оборачивается в sync_to_async(thread_sensitive=True),
+    асинхронное вызывается напрямую в цикле событий.
+    """
+    help = "Измеряет запросы в секунду и p50/p99 задержки синхронных и асинхронных представлений"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help="Количество запросов на представление")
+        parser.add_argument('--concurrency', type=int, default=20, help="Количество одновременных запросов")
+        parser.add_argument(
+            '--anonymous', action='store_true',
+            help="Запросы от анонимного пользователя (через кэш страниц). По умолчанию - от первого пользователя.",
+        )
+
+    def handle(self, *args, **options):
+        course = Course.objects.order_by('id').first()
+        lecture = Lecture.objects.filter(tests__isnull=False).order_by('id').first() or Lecture.objects.order_by('id').first()
+        if course is None or lecture is None:
+            raise CommandError("Нет данных для измерения: создайте курсы и лекции (например, командой seed_benchmark).")
+
+        user = AnonymousUser() if options['anonymous'] else User.objects.order_by('id').first() or AnonymousUser()
+        scenarios = [
+            ('course_list', CourseListView, AsyncCourseListView, '/', {}),
+            ('course_detail', CourseDetailView, AsyncCourseDetailView, f'/course/{course.slug}/', {'slug': course.slug}),
+            ('lecture_detail', LectureDetailView, AsyncLectureDetailView, f'/lecture/{lecture.id}/', {'lecture_id': lecture.id}),
+            ('test_detail', TestDetailView, AsyncTestDetailView, f'/lecture/{lecture.id}/test/pass/', {'lecture_id': lecture.id}),
+        ]
+
+        self.stdout.write(f"{'представление':<16}{'режим':<8}{'RPS':>10}{'p50, мс':>10}{'p99, мс':>10}")
+        for name, sync_cls, async_cls, path, kwargs in scenarios:
+            for mode, view in (('sync', sync_to_async(sync_cls.as_view())), ('async', async_cls.as_view())):
+                rps, latencies = asyncio.run(
+                    self.run_load(view, path, kwargs, user, options['requests'], options['concurrency'])
+                )
+                self.stdout.write(
+                    f"{name:<16}{mode:<8}{rps:>10.1f}"
+                    f"{percentile(latencies, 50) * 1000:>10.2f}{percentile(latencies, 99) * 1000:>10.2f}"
+                )
+
+    async def run_load(self, view, path, kwargs, user, total, concurrency):
+        """
+        Выполняет total запросов не более чем по concurrency одновременно.
+        Возвращает запросы в секунду и список задержек в секундах.
+        """
+        factory = AsyncRequestFactory()
+        semaphore = asyncio.Semaphore(concurrency)
+        latencies = []
+
+        async def auser():
+            return user
+
+        async def one():
+            async with semaphore:
+                request = factory.get(path)
+                request.user = user
+                request.auser = auser
+                started = time.perf_counter()
+                response = await view(request, **kwargs)
+                if hasattr(response, 'render'):
+                    await sync_to_async(response.render)()
+                latencies.append(time.perf_counter() - started)
+                if response.status_code != 200:
+                    raise CommandError(f"{path}: статус {response.status_code}")
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(total)))
+        elapsed = time.perf_counter() - started
+        return total / elapsed, latencies
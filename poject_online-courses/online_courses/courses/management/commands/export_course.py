@@ -0,0 +1,36 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from courses import transfer
+from courses.models import Course
+
+
+class Command(BaseCommand):
+    """
+    Выгружает курсы с лекциями, тестами и комментариями в формате JSON Lines.
+    Записи формируются генератором, поэтому курс любого размера выгружается без загрузки в память.
+    """
+    help = "Выгружает курсы в JSON Lines (все курсы, если slug не указаны)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('slugs', nargs='*', help="URL курсов для выгрузки")
+        parser.add_argument('--output', '-o', default='-', help="Файл для записи (по умолчанию стандартный вывод)")
+        parser.add_argument('--no-comments', action='store_true', help="Не выгружать комментарии")
+        parser.add_argument('--chunk-size', type=int, default=transfer.BATCH_SIZE, help="Размер куска чтения из базы")
+
+    def handle(self, *args, **options):
+        courses = Course.objects.all()
+        if options['slugs']:
+            courses = courses.filter(slug__in=options['slugs'])
+            missing = set(options['slugs']) - set(courses.values_list('slug', flat=True))
+            if missing:
+                raise CommandError(f"Курсы не найдены: {', '.join(sorted(missing))}")
+
+        lines = transfer.export_lines(courses, not options['no_comments'], options['chunk_size'])
+        if options['output'] == '-':
+            sys.stdout.writelines(lines)
+            return
+        with open(options['output'], 'w', encoding='utf-8') as output:
+            output.writelines(lines)
+        self.stdout.write(self.style.SUCCESS(f"Курсы выгружены в {options['output']}."))
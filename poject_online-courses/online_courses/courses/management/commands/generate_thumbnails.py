@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from courses.images import generate_for_course
+from courses.models import Course
+
+
+class Command(BaseCommand):
+    """
+    Создаёт уменьшенные копии изображений для уже существующих курсов.
+    """
+    help = "Создаёт уменьшенные копии (WebP и JPEG) изображений курсов"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help="Пересоздать копии, даже если они уже есть")
+
+    def handle(self, *args, **options):
+        created = failed = 0
+        course_ids = Course.objects.exclude(image='').exclude(image__isnull=True).values_list('id', flat=True)
+        for course_id in course_ids.iterator():
+            try:
+                created += generate_for_course(course_id, force=options['force'])
+            except (OSError, ValueError) as exc:
+                failed += 1
+                self.stderr.write(f"Курс {course_id}: {exc}")
+        self.stdout.write(self.style.SUCCESS(f"Обработано курсов: {created}, ошибок: {failed}."))
@@ -0,0 +1,37 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from courses import transfer
+
+
+class Command(BaseCommand):
+    """
+    Загружает курсы из файла JSON Lines, созданного командой export_course.
+    Файл читается построчно, записи сохраняются пачками через bulk_create.
+    Курсы с занятым URL получают новый URL (или пропускаются с --skip-existing),
+    отсутствующие авторы создаются без пароля.
+    """
+    help = "Загружает курсы из JSON Lines"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Файл для чтения ('-' - стандартный ввод)")
+        parser.add_argument('--batch-size', type=int, default=transfer.BATCH_SIZE, help="Размер пачки вставки")
+        parser.add_argument('--skip-existing', action='store_true', help="Пропускать курсы, URL которых уже занят")
+
+    def handle(self, *args, **options):
+        try:
+            if options['path'] == '-':
+                counts = self.load(sys.stdin, options)
+            else:
+                with open(options['path'], encoding='utf-8') as source:
+                    counts = self.load(source, options)
+        except (OSError, ValueError, KeyError) as exc:
+            raise CommandError(f"Загрузка прервана: {exc}")
+        summary = ', '.join(f"{kind}: {count}" for kind, count in counts.items())
+        self.stdout.write(self.style.SUCCESS(f"Загрузка завершена ({summary})."))
+
+    def load(self, source, options):
+        return transfer.import_records(
+            transfer.read_records(source), options['batch_size'], options['skip_existing'],
+        )
@@ -0,0 +1,43 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from courses import provisioning
+
+
+class Command(BaseCommand):
+    """
+    Создаёт учётные записи студентов из CSV (столбцы username, email, password, first_name, last_name).
+    Файл читается построчно, пароли хэшируются параллельно пулом процессов,
+    пользователи сохраняются пачками через bulk_create, приветственные письма
+    ставятся в очередь одной пачкой (отправляет их send_outbox).
+    Пользователи без пароля получают неиспользуемый пароль; существующие пропускаются.
+    """
+    help = "Массово создаёт пользователей из CSV"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV-файл с заголовком ('-' - стандартный ввод)")
+        parser.add_argument('--batch-size', type=int, default=provisioning.BATCH_SIZE, help="Пользователей в одной пачке")
+        parser.add_argument('--workers', type=int, default=None, help="Процессов для хэширования паролей (по умолчанию по числу ядер)")
+        parser.add_argument('--no-validate', action='store_true', help="Не проверять пароли валидаторами AUTH_PASSWORD_VALIDATORS")
+
+    def handle(self, *args, **options):
+        try:
+            if options['path'] == '-':
+                result = self.load(sys.stdin, options)
+            else:
+                with open(options['path'], encoding='utf-8-sig', newline='') as source:
+                    result = self.load(source, options)
+        except (OSError, ValueError) as exc:
+            raise CommandError(f"Создание пользователей прервано: {exc}")
+        created, skipped, errors = result
+        for line, message in errors:
+            self.stderr.write(f"Строка {line}: {message}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Создано пользователей: {created}, уже существовали: {skipped}, с ошибками: {len(errors)}."
+        ))
+
+    def load(self, source, options):
+        return provisioning.provision(
+            provisioning.read_rows(source), options['batch_size'], options['workers'], not options['no_validate'],
+        )
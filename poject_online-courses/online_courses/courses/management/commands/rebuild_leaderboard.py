@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from courses.leaderboard import rebuild
+from courses.models import Course
+
+
+class Command(BaseCommand):
+    """
+    Пересчитывает рейтинги курсов по сохранённым попыткам.
+    Нужна для первоначального заполнения, после удаления лекций и для восстановления после сбоев.
+    """
+    help = "Пересчитывает рейтинг курсов по истории попыток"
+
+    def add_arguments(self, parser):
+        parser.add_argument('slugs', nargs='*', help="URL курсов (по умолчанию все)")
+
+    def handle(self, *args, **options):
+        courses = Course.objects.filter(slug__in=options['slugs']) if options['slugs'] else None
+        count = rebuild(courses)
+        self.stdout.write(self.style.SUCCESS(f"Рейтинг пересчитан: участников {count}."))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from courses.quiz_stats import rebuild
+
+
+class Command(BaseCommand):
+    """
+    Пересчитывает статистику вопросов и лекций по сохранённым попыткам.
+    Нужна для первоначального заполнения и восстановления после сбоев.
+    """
+    help = "Пересчитывает агрегированную статистику тестов по истории попыток"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lecture', type=int, action='append', dest='lectures',
+            help="ID лекции (можно указать несколько раз). По умолчанию - все лекции.",
+        )
+
+    def handle(self, *args, **options):
+        count = rebuild(options['lectures'])
+        self.stdout.write(self.style.SUCCESS(f"Статистика пересчитана для {count} вопросов."))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from courses import search
+
+
+class Command(BaseCommand):
+    """
+    Перестраивает полнотекстовый индекс курсов, лекций, комментариев и тестов.
+    Нужна после первого применения миграции и для восстановления индекса.
+    """
+    help = "Перестраивает полнотекстовый индекс FTS5"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=search.BATCH_SIZE, help="Размер пачки вставки")
+
+    def handle(self, *args, **options):
+        if not search.is_available():
+            raise CommandError("Полнотекстовый индекс поддерживается только для SQLite.")
+        counts = search.rebuild(options['batch_size'])
+        summary = ', '.join(f"{kind}: {count}" for kind, count in counts.items())
+        self.stdout.write(self.style.SUCCESS(f"Индекс перестроен ({summary})."))
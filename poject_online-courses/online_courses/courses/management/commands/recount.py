@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from courses import counters
+from courses.cache import bump_version
+from courses.models import Course
+
+
+class Command(BaseCommand):
+    """
+    Пересчитывает хранимые счётчики Course.lecture_count и Lecture.comment_count.
+    Нужна после массовых изменений в обход сигналов и для исправления расхождений.
+    """
+    help = "Пересчитывает количество лекций курсов и комментариев лекций"
+
+    def add_arguments(self, parser):
+        parser.add_argument('slugs', nargs='*', help="URL курсов (по умолчанию все)")
+
+    def handle(self, *args, **options):
+        courses = Course.objects.filter(slug__in=options['slugs']) if options['slugs'] else None
+        course_total, lecture_total = counters.recount(courses)
+        bump_version('courses')
+        self.stdout.write(self.style.SUCCESS(f"Пересчитано: курсов {course_total}, лекций {lecture_total}."))
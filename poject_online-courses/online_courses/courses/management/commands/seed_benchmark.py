@@ -0,0 +1,152 @@
+import itertools
+import random
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from courses import search
+from courses.cache import bump_version
+from courses.cloning import fill_pks
+from courses.counters import recount
+from courses.models import Comment, Course, Lecture, Test
+from courses.quiz_stats import create_question_rows
+
+User = get_user_model()
+
+BATCH_SIZE = 1000
+WORDS = (
+    'python django модель запрос индекс кэш шаблон форма тест лекция курс данные '
+    'функция класс список словарь цикл условие строка число ответ вопрос пример'
+).split()
+
+
+def zipf_weights(count, skew):
+    """
+    Веса вида 1 / rank ** skew: при skew > 0 первые элементы получают большую часть выборки,
+    при skew = 0 распределение равномерное.
+    """
+    return [1 / rank ** skew for rank in range(1, count + 1)]
+
+
+class Command(BaseCommand):
+    """
+    Создаёт синтетические данные для замеров производительности.
+
+    Все объекты вставляются пачками через bulk_create. Комментарии распределяются
+    по лекциям по закону Ципфа (--skew), поэтому несколько лекций собирают большую
+    часть комментариев, как на реальной платформе. При одинаковом --seed данные повторяются.
+    """
+    help = "Генерирует пользователей, курсы, лекции, тесты и комментарии для замеров"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100, help="Количество пользователей")
+        parser.add_argument('--courses', type=int, default=20, help="Количество курсов")
+        parser.add_argument('--lectures', type=int, default=20, help="Лекций в курсе")
+        parser.add_argument('--tests', type=int, default=5, help="Тестов в лекции")
+        parser.add_argument('--comments', type=int, default=10000, help="Всего комментариев")
+        parser.add_argument('--skew', type=float, default=1.2, help="Перекос распределения комментариев по лекциям (0 - равномерно)")
+        parser.add_argument('--prefix', default='bench', help="Префикс имён пользователей и URL курсов")
+        parser.add_argument('--seed', type=int, default=0, help="Начальное значение генератора случайных чисел")
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help="Размер пачки вставки")
+
+    def handle(self, *args, **options):
+        if min(options['users'], options['courses']) < 1:
+            raise CommandError("Нужен хотя бы один пользователь и один курс.")
+        self.random = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.prefix = prefix = options['prefix']
+        if Course.objects.filter(**self.new_courses()).exists():
+            raise CommandError(f"Данные с префиксом '{prefix}' уже созданы, укажите другой --prefix.")
+
+        with transaction.atomic():
+            users = self.create_users(prefix, options['users'])
+            courses = self.create_courses(prefix, options['courses'], users)
+            lectures = self.create_lectures(courses, options['lectures'])
+            tests = self.create_tests(lectures, options['tests'])
+            comments = self.create_comments(lectures, users, options['comments'], options['skew'])
+            recount(Course.objects.filter(**self.new_courses()))
+        bump_version('courses')
+        self.stdout.write(self.style.SUCCESS(
+            f"Создано: пользователей {len(users)}, курсов {len(courses)}, лекций {len(lectures)}, "
+            f"тестов {tests}, комментариев {comments}."
+        ))
+
+    def new_courses(self, lookup=''):
+        """
+        Фильтр объектов, относящихся к курсам этого запуска.
+        """
+        return {f'{lookup}slug__startswith': f'{self.prefix}-course-'}
+
+    def words(self, count):
+        return ' '.join(self.random.choices(WORDS, k=count))
+
+    def create_users(self, prefix, count):
+        # Хэш вычисляется один раз: пароль у всех пользователей одинаковый
+        password = make_password('benchmark')
+        users = User.objects.bulk_create([
+            User(username=f'{prefix}_user_{number}', password=password, email=f'{prefix}_user_{number}@example.com')
+            for number in range(count)
+        ], batch_size=self.batch_size)
+        if users[0].pk is None:
+            users = list(User.objects.filter(username__startswith=f'{prefix}_user_').order_by('id'))
+        return users
+
+    def create_courses(self, prefix, count, users):
+        courses = Course.objects.bulk_create([
+            Course(
+                title=self.words(3).capitalize(), slug=f'{prefix}-course-{number}',
+                description=self.words(40), author=self.random.choice(users),
+            )
+            for number in range(count)
+        ], batch_size=self.batch_size)
+        if courses[0].pk is None:
+            courses = list(Course.objects.filter(**self.new_courses()).order_by('id'))
+        search.index_new_objects('course', courses)
+        return courses
+
+    def create_lectures(self, courses, per_course):
+        lectures = []
+        for course in courses:
+            batch = Lecture.objects.bulk_create([
+                Lecture(course=course, title=self.words(4).capitalize(), order=order, progress_bit=order - 1)
+                for order in range(1, per_course + 1)
+            ], batch_size=self.batch_size)
+            lectures += fill_pks(Lecture, batch, course=course)
+        search.index_new_objects('lecture', lectures)
+        return lectures
+
+    def create_tests(self, lectures, per_lecture):
+        total = 0
+        lectures_per_batch = max(1, self.batch_size // max(1, per_lecture))
+        for start in range(0, len(lectures), lectures_per_batch):
+            tests = []
+            for lecture in lectures[start:start + lectures_per_batch]:
+                for _ in range(per_lecture):
+                    choices = self.random.sample(WORDS, 4)
+                    tests.append(Test(lecture=lecture, question=self.words(8) + '?',
+                                      correct_answer=self.random.choice(choices), choices=choices))
+            tests = fill_pks(Test, Test.objects.bulk_create(tests), **self.new_courses('lecture__course__'))
+            create_question_rows(tests, batch_size=self.batch_size)
+            search.index_new_objects('test', tests)
+            total += len(tests)
+        return total
+
+    def create_comments(self, lectures, users, count, skew):
+        if not lectures or count <= 0:
+            return 0
+        # Случайный порядок лекций, чтобы "популярные" не совпадали с первыми по id
+        ranked = self.random.sample(lectures, len(lectures))
+        weights = list(itertools.accumulate(zipf_weights(len(ranked), skew)))
+        created = 0
+        while created < count:
+            size = min(self.batch_size, count - created)
+            comments = [
+                Comment(lecture=lecture, author=self.random.choice(users), text=self.words(self.random.randint(5, 30)))
+                for lecture in self.random.choices(ranked, cum_weights=weights, k=size)
+            ]
+            comments = fill_pks(Comment, Comment.objects.bulk_create(comments), **self.new_courses('lecture__course__'))
+            search.index_new_objects('comment', comments)
+            created += size
+        return created
@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from courses import outbox
+
+
+class Command(BaseCommand):
+    """
+    Отправляет письма из очереди OutgoingEmail.
+
+    Без --loop отправляет все готовые письма и завершается (удобно для cron),
+    с --loop работает постоянно и опрашивает очередь раз в --interval секунд.
+    """
+    help = "Отправляет письма из очереди пачками через одно соединение с почтовым сервером"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=outbox.BATCH_SIZE, help="Писем в одной пачке")
+        parser.add_argument('--max-attempts', type=int, default=outbox.MAX_ATTEMPTS, help="Попыток до пометки письма как неотправленного")
+        parser.add_argument('--loop', action='store_true', help="Работать постоянно")
+        parser.add_argument('--interval', type=float, default=5, help="Пауза между опросами очереди в режиме --loop, секунды")
+
+    def handle(self, *args, **options):
+        total_sent = total_failed = 0
+        while True:
+            sent, failed = outbox.drain(options['batch_size'], options['max_attempts'])
+            total_sent += sent
+            total_failed += failed
+            if sent or failed:
+                self.stdout.write(f"Отправлено: {sent}, ошибок: {failed}")
+                # Пачка была полной - очередь, вероятно, не пуста
+                if sent + failed >= options['batch_size']:
+                    continue
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+        self.stdout.write(self.style.SUCCESS(f"Всего отправлено: {total_sent}, ошибок: {total_failed}"))
@@ -0,0 +1,148 @@
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+
+# Отдача файла фронт-прокси: при заданном префиксе вместо тела ответа
+# отправляется заголовок вида "X-Accel-Redirect: /protected-media/<путь>" (nginx).
+ACCEL_REDIRECT_PREFIX = getattr(settings, 'COURSES_MEDIA_ACCEL_REDIRECT', None)
+ACCEL_REDIRECT_HEADER = getattr(settings, 'COURSES_MEDIA_ACCEL_HEADER', 'X-Accel-Redirect')
+CACHE_MAX_AGE = getattr(settings, 'COURSES_MEDIA_MAX_AGE', 60 * 60 * 24)
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class RangeFile:
+    """
+    Файлоподобный объект, ограниченный диапазоном байтов.
+
+    fileno() возвращает дескриптор исходного файла, уже установленного на начало
+    диапазона, поэтому WSGI-сервер с wsgi.file_wrapper (например, gunicorn)
+    отправит ровно Content-Length байт через os.sendfile без копирования в Python.
+    """
+    def __init__(self, file, start, length):
+        self.file = file
+        self.remaining = length
+        file.seek(start)
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b''
+        if size is None or size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def resolve_path(path):
+    """
+    Возвращает абсолютный путь к файлу внутри MEDIA_ROOT или вызывает Http404.
+    """
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404("Файл не найден")
+    if not os.path.isfile(full_path):
+        raise Http404("Файл не найден")
+    return full_path
+
+
+def parse_range(header, size):
+    """
+    Разбирает заголовок Range с одним диапазоном.
+
+    Возвращает (start, end) включительно, None, если заголовок нужно игнорировать
+    (нет заголовка, несколько диапазонов, другая единица), и False,
+    если диапазон невыполним.
+    """
+    match = RANGE_RE.match(header.strip()) if header else None
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Последние N байтов
+        length = int(last)
+        if length == 0:
+            return False
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+def if_range_matches(request, etag, last_modified):
+    """
+    Проверяет If-Range: диапазон отдаётся, только если файл не изменился.
+    """
+    if_range = request.headers.get('If-Range')
+    if not if_range:
+        return True
+    if if_range.startswith('"') or if_range.startswith('W/'):
+        return if_range == etag
+    since = parse_http_date_safe(if_range)
+    return since is not None and int(last_modified) <= since
+
+
+def serve(request, path):
+    """
+    Отдаёт файл из MEDIA_ROOT с поддержкой Range/If-Range, ETag/Last-Modified и 304.
+    """
+    full_path = resolve_path(path)
+    stat = os.stat(full_path)
+    etag = f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+    last_modified = int(stat.st_mtime)
+
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        return not_modified
+
+    content_type, encoding = mimetypes.guess_type(full_path)
+    content_type = content_type or 'application/octet-stream'
+
+    if ACCEL_REDIRECT_PREFIX:
+        # Файл, Range и условные запросы обрабатывает фронт-прокси
+        response = HttpResponse(content_type=content_type)
+        response[ACCEL_REDIRECT_HEADER] = ACCEL_REDIRECT_PREFIX.rstrip('/') + '/' + path.lstrip('/')
+    else:
+        byte_range = None
+        if if_range_matches(request, etag, last_modified):
+            byte_range = parse_range(request.headers.get('Range'), stat.st_size)
+
+        if byte_range is False:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{stat.st_size}'
+            return response
+
+        if byte_range is None:
+            response = FileResponse(open(full_path, 'rb'), content_type=content_type)
+        else:
+            start, end = byte_range
+            length = end - start + 1
+            response = FileResponse(RangeFile(open(full_path, 'rb'), start, length), status=206, content_type=content_type)
+            response['Content-Length'] = str(length)
+            response['Content-Range'] = f'bytes {start}-{end}/{stat.st_size}'
+        if encoding:
+            response['Content-Encoding'] = encoding
+
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    response['Cache-Control'] = f'public, max-age={CACHE_MAX_AGE}'
+    return response
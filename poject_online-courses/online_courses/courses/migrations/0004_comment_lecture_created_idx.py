@@ -0,0 +1,19 @@
+# Generated by Django 5.1.15 on 2026-10-17 11:02
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0003_course_image'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['lecture', 'created_at', 'id'], name='comment_lecture_created_idx'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.1.15 on 2026-10-17 11:05
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0004_comment_lecture_created_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuizAttempt',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.PositiveIntegerField(verbose_name='Правильных ответов')),
+                ('total', models.PositiveIntegerField(verbose_name='Всего вопросов')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата прохождения')),
+                ('lecture', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='quiz_attempts', to='courses.lecture', verbose_name='Лекция')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='quiz_attempts', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='QuizAnswer',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('selected_answer', models.CharField(blank=True, max_length=150, verbose_name='Выбранный ответ')),
+                ('is_correct', models.BooleanField(default=False, verbose_name='Ответ верный')),
+                ('test', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='answers', to='courses.test', verbose_name='Вопрос')),
+                ('attempt', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='answers', to='courses.quizattempt', verbose_name='Попытка')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='quizattempt',
+            index=models.Index(fields=['user', 'lecture', 'created_at'], name='attempt_user_lecture_idx'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.1.15 on 2026-10-17 11:06
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0005_quizattempt_quizanswer'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LectureQuizStats',
+            fields=[
+                ('lecture', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='quiz_stats', serialize=False, to='courses.lecture', verbose_name='Лекция')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='Попыток')),
+                ('total_score', models.PositiveIntegerField(default=0, verbose_name='Сумма правильных ответов')),
+                ('total_questions', models.PositiveIntegerField(default=0, verbose_name='Сумма вопросов')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='QuestionStats',
+            fields=[
+                ('test', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='courses.test', verbose_name='Вопрос')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='Попыток')),
+                ('correct', models.PositiveIntegerField(default=0, verbose_name='Правильных ответов')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ChoiceStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('choice', models.TextField(verbose_name='Вариант ответа')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='Выбран раз')),
+                ('test', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='choice_stats', to='courses.test', verbose_name='Вопрос')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('test', 'choice'), name='unique_choice_stats')],
+            },
+        ),
+    ]
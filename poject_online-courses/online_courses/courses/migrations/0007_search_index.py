@@ -0,0 +1,30 @@
+from django.db import migrations
+
+CREATE_TABLE_SQL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS courses_search USING fts5("
+    "kind UNINDEXED, object_id UNINDEXED, target UNINDEXED, title, body, extra, "
+    "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+)
+DROP_TABLE_SQL = "DROP TABLE IF EXISTS courses_search"
+
+
+def create_search_table(apps, schema_editor):
+    # Полнотекстовый индекс FTS5 есть только в SQLite
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(CREATE_TABLE_SQL)
+
+
+def drop_search_table(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(DROP_TABLE_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0006_quiz_stats'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_table, drop_search_table),
+    ]
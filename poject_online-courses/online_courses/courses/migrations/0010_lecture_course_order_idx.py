@@ -0,0 +1,17 @@
+# Generated by Django 5.1.15 on 2026-10-17 11:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0009_outgoingemail'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='lecture',
+            index=models.Index(fields=['course', 'order'], name='lecture_course_order_idx'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.1.15 on 2026-10-17 11:25
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def count_subquery(model, field):
+    rows = model.objects.filter(**{field: OuterRef('pk')}).order_by().values(field).annotate(total=Count('pk'))
+    return Coalesce(Subquery(rows.values('total')), Value(0))
+
+
+def fill_counts(apps, schema_editor):
+    Course = apps.get_model('courses', 'Course')
+    Lecture = apps.get_model('courses', 'Lecture')
+    Comment = apps.get_model('courses', 'Comment')
+    Course.objects.update(lecture_count=count_subquery(Lecture, 'course'))
+    Lecture.objects.update(comment_count=count_subquery(Comment, 'lecture'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0010_lecture_course_order_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='lecture_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество лекций'),
+        ),
+        migrations.AddField(
+            model_name='lecture',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество комментариев'),
+        ),
+        migrations.RunPython(fill_counts, migrations.RunPython.noop),
+    ]
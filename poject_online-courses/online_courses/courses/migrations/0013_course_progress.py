@@ -0,0 +1,65 @@
+# Generated by Django 5.1.15 on 2026-10-17 11:36
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def assign_progress_bits(apps, schema_editor):
+    Lecture = apps.get_model('courses', 'Lecture')
+    batch = []
+    course_id, bit = None, 0
+    for lecture in Lecture.objects.order_by('course', 'order', 'id').only('id', 'course_id').iterator(chunk_size=2000):
+        if lecture.course_id != course_id:
+            course_id, bit = lecture.course_id, 0
+        lecture.progress_bit = bit
+        bit += 1
+        batch.append(lecture)
+        if len(batch) >= 2000:
+            Lecture.objects.bulk_update(batch, ['progress_bit'])
+            batch = []
+    Lecture.objects.bulk_update(batch, ['progress_bit'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0012_updated_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CourseProgress',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('completed', models.BinaryField(default=bytes, verbose_name='Пройденные лекции')),
+                ('completed_count', models.PositiveIntegerField(default=0, verbose_name='Пройдено лекций')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Дата изменения')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='lecture',
+            name='progress_bit',
+            field=models.PositiveIntegerField(editable=False, null=True, verbose_name='Бит в отметках прохождения'),
+        ),
+        migrations.RunPython(assign_progress_bits, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='lecture',
+            constraint=models.UniqueConstraint(fields=('course', 'progress_bit'), name='unique_lecture_progress_bit'),
+        ),
+        migrations.AddField(
+            model_name='courseprogress',
+            name='course',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='progress', to='courses.course', verbose_name='Курс'),
+        ),
+        migrations.AddField(
+            model_name='courseprogress',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='course_progress', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь'),
+        ),
+        migrations.AddConstraint(
+            model_name='courseprogress',
+            constraint=models.UniqueConstraint(fields=('user', 'course'), name='unique_course_progress'),
+        ),
+    ]
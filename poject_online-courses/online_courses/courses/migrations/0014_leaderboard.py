@@ -0,0 +1,42 @@
+# Generated by Django 5.1.15 on 2026-10-17 11:38
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0013_course_progress'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaderboardBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.PositiveIntegerField(verbose_name='Очки')),
+                ('users', models.PositiveIntegerField(default=0, verbose_name='Участников')),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='leaderboard_buckets', to='courses.course', verbose_name='Курс')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('course', 'score'), name='unique_leaderboard_bucket')],
+            },
+        ),
+        migrations.CreateModel(
+            name='LeaderboardEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.PositiveIntegerField(default=0, verbose_name='Очки')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Дата изменения')),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='leaderboard', to='courses.course', verbose_name='Курс')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='leaderboard_entries', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['course', '-score', 'updated_at'], name='leaderboard_top_idx')],
+                'constraints': [models.UniqueConstraint(fields=('course', 'user'), name='unique_leaderboard_entry')],
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.1.15 on 2026-10-17 11:47
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0014_leaderboard'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CommentArchiveChunk',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('first_created_at', models.DateTimeField(verbose_name='Самый старый комментарий')),
+                ('first_id', models.PositiveIntegerField(verbose_name='ID самого старого комментария')),
+                ('last_created_at', models.DateTimeField(verbose_name='Самый новый комментарий')),
+                ('last_id', models.PositiveIntegerField(verbose_name='ID самого нового комментария')),
+                ('comment_count', models.PositiveIntegerField(verbose_name='Количество комментариев')),
+                ('data', models.BinaryField(verbose_name='Сжатые комментарии')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата архивации')),
+                ('authors', models.ManyToManyField(related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Авторы')),
+                ('lecture', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='comment_archive', to='courses.lecture', verbose_name='Лекция')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['lecture', 'last_created_at', 'last_id'], name='comment_archive_lecture_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,52 @@
+from django.conf import settings
+from django.db import migrations
+
+# Константы повторяют search.py на момент миграции: rowid = id * 4 + номер типа
+TABLE = 'courses_search'
+KINDS = {'course': 0, 'lecture': 1, 'comment': 2, 'test': 3}
+
+
+def backfill_search_table(apps, schema_editor):
+    """
+    Добавляет в индекс объекты, созданные до появления 0007_search_index.
+    Объекты, которые уже есть в индексе, пропускаются, поэтому миграцию можно применять повторно.
+    """
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    course = apps.get_model('courses', 'Course')._meta.db_table
+    lecture = apps.get_model('courses', 'Lecture')._meta.db_table
+    comment = apps.get_model('courses', 'Comment')._meta.db_table
+    test = apps.get_model('courses', 'Test')._meta.db_table
+    user = apps.get_model(settings.AUTH_USER_MODEL)._meta.db_table
+    # Поля записи как в search.document(): target, title, body, extra
+    columns = "id, target, title, body, extra"
+    selects = {
+        'course': f"SELECT c.id, c.slug, c.title, c.description, u.username FROM {course} c JOIN {user} u ON u.id = c.author_id",
+        'lecture': f"SELECT l.id, CAST(l.id AS TEXT), l.title, '', c.title FROM {lecture} l JOIN {course} c ON c.id = l.course_id",
+        'comment': (
+            f"SELECT m.id, CAST(m.lecture_id AS TEXT), l.title, m.text, u.username FROM {comment} m "
+            f"JOIN {lecture} l ON l.id = m.lecture_id JOIN {user} u ON u.id = m.author_id"
+        ),
+        'test': f"SELECT t.id, CAST(t.lecture_id AS TEXT), l.title, t.question, '' FROM {test} t JOIN {lecture} l ON l.id = t.lecture_id",
+    }
+    with schema_editor.connection.cursor() as cursor:
+        for kind, select in selects.items():
+            cursor.execute(
+                f"WITH source ({columns}) AS ({select}) "
+                f"INSERT INTO {TABLE} (rowid, kind, object_id, target, title, body, extra) "
+                f"SELECT id * {len(KINDS)} + {KINDS[kind]}, %s, {columns} FROM source "
+                f"WHERE id * {len(KINDS)} + {KINDS[kind]} NOT IN (SELECT rowid FROM {TABLE})",
+                [kind],
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0015_comment_archive'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_search_table, migrations.RunPython.noop),
+    ]
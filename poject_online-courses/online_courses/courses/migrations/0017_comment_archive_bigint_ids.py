@@ -0,0 +1,23 @@
+# Generated by Django 5.1.15 on 2026-10-17 12:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0016_search_backfill'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='commentarchivechunk',
+            name='first_id',
+            field=models.PositiveBigIntegerField(verbose_name='ID самого старого комментария'),
+        ),
+        migrations.AlterField(
+            model_name='commentarchivechunk',
+            name='last_id',
+            field=models.PositiveBigIntegerField(verbose_name='ID самого нового комментария'),
+        ),
+    ]
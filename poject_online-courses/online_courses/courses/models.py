@@ -1,5 +1,7 @@
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
 
 User = get_user_model()
 
@@ -14,19 +16,43 @@ class Course(models.Model):
     - slug: Человекопонятный URL для курса (уникальный)
     - description: Описание курса
     - created_at: Дата и время создания курса (автоматически заполняется)
+    - updated_at: Дата и время последнего изменения курса или его лекций
     - author: Автор курса (связь с моделью пользователя)
     - image: Изображение курса (опционально)
+    - image_renditions: Описание уменьшенных копий изображения (заполняется автоматически)
+    - lecture_count: Количество лекций курса (поддерживается сигналами)
     """
     title = models.CharField(max_length=150, verbose_name="Название курса")
     slug = models.SlugField(max_length=150, unique=True, verbose_name="URL курса")
     description = models.TextField(verbose_name="Описание курса")
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Дата создания")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Дата изменения")
     author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='courses', verbose_name="Автор курса")
     image = models.ImageField(upload_to='course_images/', blank=True, null=True, verbose_name="Изображение курса")
+    image_renditions = models.JSONField(default=dict, blank=True, editable=False, verbose_name="Уменьшенные копии изображения")
+    lecture_count = models.PositiveIntegerField(default=0, editable=False, verbose_name="Количество лекций")
 
     def __str__(self):
         return self.title
 
+    @property
+    def image_sources(self):
+        """
+        Данные для <picture>/srcset: строки srcset для WebP и JPEG и запасной URL.
+        Пусто, если уменьшенные копии ещё не созданы для текущего изображения.
+        """
+        renditions = self.image_renditions or {}
+        if not self.image or renditions.get('source') != self.image.name or not renditions.get('items'):
+            return {}
+        items = renditions['items']
+        sources = {
+            'jpeg': ', '.join(f"{default_storage.url(item['jpeg'])} {item['width']}w" for item in items),
+            'fallback': default_storage.url(items[len(items) // 2]['jpeg']),
+        }
+        if all('webp' in item for item in items):
+            sources['webp'] = ', '.join(f"{default_storage.url(item['webp'])} {item['width']}w" for item in items)
+        return sources
+
 
 class Lecture(models.Model):
     """
@@ -39,13 +65,28 @@ class Lecture(models.Model):
     - title: Название лекции
     - video_url: URL видеоурока (опционально)
     - created_at: Дата и время создания лекции (автоматически заполняется)
+    - updated_at: Дата и время последнего изменения лекции, её комментариев или тестов
     - order: Порядок лекции в курсе
+    - comment_count: Количество комментариев к лекции (поддерживается сигналами)
+    - progress_bit: Номер бита лекции в отметках прохождения курса (см. CourseProgress)
     """
     course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='lectures', verbose_name="Курс")
     title = models.CharField(max_length=150, verbose_name="Название лекции")
     video_url = models.URLField(max_length=200, verbose_name="URL видеоурока", null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Дата создания")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Дата изменения")
     order = models.PositiveIntegerField(verbose_name="Порядок лекции", help_text="Определяет порядок лекций в курсе", null=True, blank=True)
+    comment_count = models.PositiveIntegerField(default=0, editable=False, verbose_name="Количество комментариев")
+    progress_bit = models.PositiveIntegerField(null=True, editable=False, verbose_name="Бит в отметках прохождения")
+
+    class Meta:
+        indexes = [
+            # Список лекций курса по порядку и вычисление следующего order
+            models.Index(fields=['course', 'order'], name='lecture_course_order_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['course', 'progress_bit'], name='unique_lecture_progress_bit'),
+        ]
 
     def __str__(self):
         return f"{self.title} - {self.course.title}"
@@ -61,15 +102,59 @@ class Comment(models.Model):
     - author: Автор комментария (связь с моделью пользователя)
     - text: Текст комментария
     - created_at: Дата и время создания комментария (автоматически заполняется)
+    - updated_at: Дата и время последнего изменения комментария
     """
     lecture = models.ForeignKey(Lecture, on_delete=models.CASCADE, related_name='comments', verbose_name="Лекция")
     author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='comments', verbose_name="Автор комментария")
     text = models.TextField(verbose_name="Текст комментария")
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Дата создания")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Дата изменения")
+
+    class Meta:
+        indexes = [
+            # Составной индекс для курсорной пагинации комментариев лекции
+            models.Index(fields=['lecture', 'created_at', 'id'], name='comment_lecture_created_idx'),
+        ]
 
     def __str__(self):
         return f"Комментарий от {self.author} к {self.lecture.title}"
 
+class CommentArchiveChunk(models.Model):
+    """
+    Модель блока архивных комментариев.
+
+    Старые комментарии лекции переносятся из Comment пачками (команда archive_comments):
+    каждая пачка хранится одной строкой со сжатым списком комментариев (см. archive.py).
+    Архивные комментарии всегда старше оставшихся в Comment, а блоки одной лекции
+    не пересекаются по ключу (created_at, id), поэтому страницы читаются по границам блоков.
+
+    Поля:
+    - lecture: Лекция, к которой относятся комментарии (связь с моделью Lecture)
+    - first_created_at, first_id: Ключ самого старого комментария блока
+    - last_created_at, last_id: Ключ самого нового комментария блока
+    - comment_count: Количество комментариев в блоке
+    - data: Сжатый список комментариев
+    - authors: Авторы комментариев блока (нужны при удалении пользователя)
+    - created_at: Дата и время архивации
+    """
+    lecture = models.ForeignKey(Lecture, on_delete=models.CASCADE, related_name='comment_archive', verbose_name="Лекция")
+    first_created_at = models.DateTimeField(verbose_name="Самый старый комментарий")
+    first_id = models.PositiveBigIntegerField(verbose_name="ID самого старого комментария")
+    last_created_at = models.DateTimeField(verbose_name="Самый новый комментарий")
+    last_id = models.PositiveBigIntegerField(verbose_name="ID самого нового комментария")
+    comment_count = models.PositiveIntegerField(verbose_name="Количество комментариев")
+    data = models.BinaryField(verbose_name="Сжатые комментарии")
+    authors = models.ManyToManyField(User, related_name='+', verbose_name="Авторы")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Дата архивации")
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['lecture', 'last_created_at', 'last_id'], name='comment_archive_lecture_idx'),
+        ]
+
+    def __str__(self):
+        return f"Архив комментариев лекции {self.lecture_id}: {self.comment_count}"
+
 class Test(models.Model):
     """
     Модель теста.
@@ -81,11 +166,261 @@ class Test(models.Model):
     - question: Вопрос теста
     - correct_answer: Правильный ответ на тест
     - choices: Варианты ответов в формате JSON
+    - updated_at: Дата и время последнего изменения теста
     """
     lecture = models.ForeignKey(Lecture, on_delete=models.CASCADE, related_name='tests', verbose_name="Лекция")
     question = models.TextField(verbose_name="Вопрос")
     correct_answer = models.CharField(max_length=150, verbose_name="Правильный ответ")
     choices = models.JSONField(verbose_name="Варианты ответов", help_text="Введите варианты ответов в формате JSON")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Дата изменения")
 
     def __str__(self):
         return f"Тест для лекции {self.lecture.title}"
+
+class QuizAttempt(models.Model):
+    """
+    Модель попытки прохождения теста.
+
+    Хранит результат одной отправки тестов лекции.
+
+    Поля:
+    - lecture: Лекция, тесты которой проходились (связь с моделью Lecture)
+    - user: Пользователь, проходивший тест (пусто для анонимных пользователей)
+    - score: Количество правильных ответов
+    - total: Количество вопросов на момент прохождения
+    - created_at: Дата и время прохождения (автоматически заполняется)
+    """
+    lecture = models.ForeignKey(Lecture, on_delete=models.CASCADE, related_name='quiz_attempts', verbose_name="Лекция")
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='quiz_attempts', verbose_name="Пользователь", null=True, blank=True)
+    score = models.PositiveIntegerField(verbose_name="Правильных ответов")
+    total = models.PositiveIntegerField(verbose_name="Всего вопросов")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Дата прохождения")
+
+    class Meta:
+        indexes = [
+            # История попыток пользователя по лекции
+            models.Index(fields=['user', 'lecture', 'created_at'], name='attempt_user_lecture_idx'),
+        ]
+
+    def __str__(self):
+        return f"Попытка {self.user} по лекции {self.lecture_id}: {self.score}/{self.total}"
+
+class QuizAnswer(models.Model):
+    """
+    Модель ответа на вопрос в рамках попытки.
+
+    Поля:
+    - attempt: Попытка, к которой относится ответ (связь с моделью QuizAttempt)
+    - test: Вопрос (связь с моделью Test)
+    - selected_answer: Выбранный вариант (пусто, если ответа не было)
+    - is_correct: Признак правильного ответа
+    """
+    attempt = models.ForeignKey(QuizAttempt, on_delete=models.CASCADE, related_name='answers', verbose_name="Попытка")
+    test = models.ForeignKey(Test, on_delete=models.CASCADE, related_name='answers', verbose_name="Вопрос")
+    selected_answer = models.CharField(max_length=150, blank=True, verbose_name="Выбранный ответ")
+    is_correct = models.BooleanField(default=False, verbose_name="Ответ верный")
+
+    def __str__(self):
+        return f"Ответ на вопрос {self.test_id} в попытке {self.attempt_id}"
+
+class QuestionStats(models.Model):
+    """
+    Модель агрегированной статистики по вопросу теста.
+
+    Обновляется атомарно (F-выражениями) при проверке каждой попытки.
+
+    Поля:
+    - test: Вопрос (связь с моделью Test)
+    - attempts: Сколько раз вопрос проверялся
+    - correct: Сколько раз на вопрос ответили правильно
+    """
+    test = models.OneToOneField(Test, on_delete=models.CASCADE, primary_key=True, related_name='stats', verbose_name="Вопрос")
+    attempts = models.PositiveIntegerField(default=0, verbose_name="Попыток")
+    correct = models.PositiveIntegerField(default=0, verbose_name="Правильных ответов")
+
+    @property
+    def accuracy(self):
+        """
+        Доля правильных ответов в процентах.
+        """
+        return round(100 * self.correct / self.attempts, 1) if self.attempts else None
+
+    def __str__(self):
+        return f"Статистика вопроса {self.test_id}: {self.correct}/{self.attempts}"
+
+class ChoiceStats(models.Model):
+    """
+    Модель распределения ответов по вариантам вопроса.
+
+    Поля:
+    - test: Вопрос (связь с моделью Test)
+    - choice: Вариант ответа из поля choices
+    - count: Сколько раз был выбран вариант
+    """
+    test = models.ForeignKey(Test, on_delete=models.CASCADE, related_name='choice_stats', verbose_name="Вопрос")
+    choice = models.TextField(verbose_name="Вариант ответа")
+    count = models.PositiveIntegerField(default=0, verbose_name="Выбран раз")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['test', 'choice'], name='unique_choice_stats'),
+        ]
+
+    def __str__(self):
+        return f"Вариант \"{self.choice}\" вопроса {self.test_id}: {self.count}"
+
+class LectureQuizStats(models.Model):
+    """
+    Модель агрегированной статистики по тестам лекции.
+
+    Поля:
+    - lecture: Лекция (связь с моделью Lecture)
+    - attempts: Количество попыток
+    - total_score: Сумма правильных ответов по всем попыткам
+    - total_questions: Сумма вопросов по всем попыткам
+    """
+    lecture = models.OneToOneField(Lecture, on_delete=models.CASCADE, primary_key=True, related_name='quiz_stats', verbose_name="Лекция")
+    attempts = models.PositiveIntegerField(default=0, verbose_name="Попыток")
+    total_score = models.PositiveIntegerField(default=0, verbose_name="Сумма правильных ответов")
+    total_questions = models.PositiveIntegerField(default=0, verbose_name="Сумма вопросов")
+
+    @property
+    def accuracy(self):
+        """
+        Средняя доля правильных ответов в процентах.
+        """
+        return round(100 * self.total_score / self.total_questions, 1) if self.total_questions else None
+
+    def __str__(self):
+        return f"Статистика тестов лекции {self.lecture_id}"
+
+class LeaderboardEntry(models.Model):
+    """
+    Модель строки рейтинга курса.
+
+    Очки пользователя в курсе - сумма его лучших результатов по тестам каждой лекции.
+    Обновляются при проверке каждой попытки (см. leaderboard.py).
+
+    Поля:
+    - course: Курс (связь с моделью Course)
+    - user: Пользователь (связь с моделью пользователя)
+    - score: Очки пользователя в курсе
+    - updated_at: Дата и время последнего изменения очков
+    """
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='leaderboard', verbose_name="Курс")
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='leaderboard_entries', verbose_name="Пользователь")
+    score = models.PositiveIntegerField(default=0, verbose_name="Очки")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Дата изменения")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['course', 'user'], name='unique_leaderboard_entry'),
+        ]
+        indexes = [
+            # Лучшие участники курса читаются по индексу без сортировки всей таблицы
+            models.Index(fields=['course', '-score', 'updated_at'], name='leaderboard_top_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user} в курсе {self.course_id}: {self.score}"
+
+class LeaderboardBucket(models.Model):
+    """
+    Модель количества участников рейтинга курса с одинаковыми очками.
+
+    Место пользователя - 1 + число участников в корзинах с большими очками,
+    поэтому его поиск зависит от количества различных результатов, а не участников.
+
+    Поля:
+    - course: Курс (связь с моделью Course)
+    - score: Очки
+    - users: Количество участников с такими очками
+    """
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='leaderboard_buckets', verbose_name="Курс")
+    score = models.PositiveIntegerField(verbose_name="Очки")
+    users = models.PositiveIntegerField(default=0, verbose_name="Участников")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['course', 'score'], name='unique_leaderboard_bucket'),
+        ]
+
+    def __str__(self):
+        return f"Курс {self.course_id}, очки {self.score}: {self.users}"
+
+class CourseProgress(models.Model):
+    """
+    Модель прогресса пользователя по курсу.
+
+    Пройденные лекции хранятся битовой маской: лекции соответствует бит
+    с номером Lecture.progress_bit. Номер не меняется при перестановке лекций,
+    поэтому отметка и проверка лекции не зависят от числа лекций и пользователей.
+
+    Поля:
+    - user: Пользователь (связь с моделью пользователя)
+    - course: Курс (связь с моделью Course)
+    - completed: Битовая маска пройденных лекций
+    - completed_count: Количество пройденных лекций (число установленных битов)
+    - updated_at: Дата и время последней отметки
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='course_progress', verbose_name="Пользователь")
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='progress', verbose_name="Курс")
+    completed = models.BinaryField(default=bytes, verbose_name="Пройденные лекции")
+    completed_count = models.PositiveIntegerField(default=0, verbose_name="Пройдено лекций")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Дата изменения")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'course'], name='unique_course_progress'),
+        ]
+
+    def __str__(self):
+        return f"Прогресс {self.user} по курсу {self.course_id}: {self.completed_count}"
+
+class OutgoingEmail(models.Model):
+    """
+    Модель письма в очереди на отправку (outbox).
+
+    Письма сохраняются в базе в момент события и отправляются отдельным
+    обработчиком (команда send_outbox), поэтому запрос не ждёт почтовый сервер.
+
+    Поля:
+    - subject: Тема письма
+    - body: Текст письма
+    - from_email: Адрес отправителя
+    - to: Список адресов получателей
+    - status: Состояние (ожидает, отправлено, ошибка)
+    - attempts: Количество попыток отправки
+    - next_attempt_at: Время, не раньше которого письмо можно отправлять
+    - last_error: Текст последней ошибки
+    - created_at: Дата и время постановки в очередь (автоматически заполняется)
+    - sent_at: Дата и время отправки
+    """
+    PENDING = 'pending'
+    SENT = 'sent'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Ожидает отправки'),
+        (SENT, 'Отправлено'),
+        (FAILED, 'Не отправлено'),
+    ]
+
+    subject = models.CharField(max_length=255, verbose_name="Тема")
+    body = models.TextField(verbose_name="Текст письма")
+    from_email = models.CharField(max_length=254, verbose_name="Отправитель")
+    to = models.JSONField(verbose_name="Получатели")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING, verbose_name="Состояние")
+    attempts = models.PositiveIntegerField(default=0, verbose_name="Попыток отправки")
+    next_attempt_at = models.DateTimeField(default=timezone.now, verbose_name="Следующая попытка")
+    last_error = models.TextField(blank=True, verbose_name="Последняя ошибка")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Дата создания")
+    sent_at = models.DateTimeField(null=True, blank=True, verbose_name="Дата отправки")
+
+    class Meta:
+        indexes = [
+            # Выборка писем, готовых к отправке
+            models.Index(fields=['status', 'next_attempt_at'], name='outbox_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} -> {', '.join(self.to)}"
@@ -0,0 +1,67 @@
+from django.db import transaction
+from django.db.models import Max, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from .cache import bump_version
+from .conditional import touch
+from .models import Course, Lecture
+from .progress import next_bit
+
+
+class ReorderError(ValueError):
+    """
+    Переданный порядок не совпадает с набором лекций курса.
+    """
+
+
+def _lock_course(course):
+    # Сериализует изменения порядка в пределах курса (на SQLite запись и так последовательна)
+    Course.objects.select_for_update().filter(pk=course.pk).values_list('pk').first()
+
+
+def next_order(course):
+    """
+    Выражение "максимальный order в курсе + 1", вычисляемое самим INSERT,
+    поэтому между чтением максимума и вставкой нет промежутка.
+    """
+    max_order = Lecture.objects.filter(course=course).values('course').annotate(value=Max('order')).values('value')
+    return Coalesce(Subquery(max_order), Value(0)) + 1
+
+
+def append_lecture(lecture):
+    """
+    Сохраняет новую лекцию последней в её курсе.
+    """
+    with transaction.atomic():
+        _lock_course(lecture.course)
+        lecture.order = next_order(lecture.course)
+        lecture.progress_bit = next_bit(lecture.course.pk)
+        lecture.save()
+    lecture.refresh_from_db(fields=['order', 'progress_bit'])
+    return lecture
+
+
+def reorder_lectures(course, lecture_ids, batch_size=500):
+    """
+    Задаёт порядок лекций курса: lecture_ids - id всех лекций курса в нужном порядке.
+    Все значения записываются одним UPDATE ... CASE на пачку в одной транзакции.
+    """
+    lecture_ids = [int(lecture_id) for lecture_id in lecture_ids]
+    with transaction.atomic():
+        _lock_course(course)
+        lectures = {lecture.pk: lecture for lecture in Lecture.objects.filter(course=course).only('id', 'order')}
+        if len(lecture_ids) != len(set(lecture_ids)) or set(lecture_ids) != set(lectures):
+            raise ReorderError("Список должен содержать каждую лекцию курса ровно один раз")
+        changed = []
+        for position, lecture_id in enumerate(lecture_ids, start=1):
+            lecture = lectures[lecture_id]
+            if lecture.order != position:
+                lecture.order = position
+                changed.append(lecture)
+        Lecture.objects.bulk_update(changed, ['order'], batch_size=batch_size)
+        if changed:
+            # bulk_update не отправляет сигналы: страница курса изменилась
+            touch(Course, course.pk)
+    if changed:
+        bump_version(f'course:{course.slug}')
+    return len(changed)
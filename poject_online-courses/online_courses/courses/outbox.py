@@ -0,0 +1,111 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import OutgoingEmail
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = getattr(settings, 'COURSES_OUTBOX_BATCH_SIZE', 100)
+MAX_ATTEMPTS = getattr(settings, 'COURSES_OUTBOX_MAX_ATTEMPTS', 5)
+# Задержка перед повтором: BACKOFF_BASE * 2 ** (попытка - 1), но не больше BACKOFF_MAX секунд
+BACKOFF_BASE = getattr(settings, 'COURSES_OUTBOX_BACKOFF_BASE', 60)
+BACKOFF_MAX = getattr(settings, 'COURSES_OUTBOX_BACKOFF_MAX', 60 * 60)
+# На это время выбранные письма скрываются от других обработчиков
+LEASE_SECONDS = getattr(settings, 'COURSES_OUTBOX_LEASE', 5 * 60)
+
+
+def enqueue(subject, body, recipients, from_email=None):
+    """
+    Ставит письмо в очередь. Письмо сохраняется в текущей транзакции,
+    поэтому оно не уйдёт, если транзакция будет отменена.
+    """
+    return OutgoingEmail.objects.create(
+        subject=subject, body=body, to=list(recipients),
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+    )
+
+
+def enqueue_many(messages, batch_size=BATCH_SIZE):
+    """
+    Ставит в очередь несколько писем одним bulk_create.
+    messages - последовательность (subject, body, recipients).
+    """
+    return OutgoingEmail.objects.bulk_create([
+        OutgoingEmail(subject=subject, body=body, to=list(recipients), from_email=settings.DEFAULT_FROM_EMAIL)
+        for subject, body, recipients in messages
+    ], batch_size=batch_size)
+
+
+def backoff(attempts):
+    return timedelta(seconds=min(BACKOFF_BASE * 2 ** (attempts - 1), BACKOFF_MAX))
+
+
+def claim(batch_size=BATCH_SIZE):
+    """
+    Выбирает письма, готовые к отправке, и откладывает их на LEASE_SECONDS,
+    чтобы параллельный обработчик не отправил их повторно.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        due = OutgoingEmail.objects.filter(status=OutgoingEmail.PENDING, next_attempt_at__lte=now).order_by('next_attempt_at', 'id')
+        if connection.features.has_select_for_update_skip_locked:
+            due = due.select_for_update(skip_locked=True)
+        messages = list(due[:batch_size])
+        OutgoingEmail.objects.filter(pk__in=[message.pk for message in messages]).update(
+            next_attempt_at=now + timedelta(seconds=LEASE_SECONDS)
+        )
+    return messages
+
+
+def drain(batch_size=BATCH_SIZE, max_attempts=MAX_ATTEMPTS):
+    """
+    Отправляет одну пачку писем через одно соединение с почтовым сервером.
+    Возвращает (отправлено, не отправлено).
+    """
+    messages = claim(batch_size)
+    if not messages:
+        return 0, 0
+
+    sent, failed = [], []
+    mail_connection = get_connection()
+    try:
+        mail_connection.open()
+        for message in messages:
+            try:
+                EmailMessage(message.subject, message.body, message.from_email, message.to, connection=mail_connection).send()
+            except Exception as exc:
+                logger.warning("Не удалось отправить письмо %s: %s", message.pk, exc)
+                message.last_error = str(exc)
+                failed.append(message)
+            else:
+                sent.append(message)
+    except Exception as exc:
+        # Сервер недоступен: все невыбранные письма считаются неотправленными
+        logger.warning("Нет соединения с почтовым сервером: %s", exc)
+        done = {message.pk for message in sent + failed}
+        for message in messages:
+            if message.pk not in done:
+                message.last_error = str(exc)
+                failed.append(message)
+    finally:
+        mail_connection.close()
+
+    now = timezone.now()
+    if sent:
+        OutgoingEmail.objects.filter(pk__in=[message.pk for message in sent]).update(
+            status=OutgoingEmail.SENT, sent_at=now, last_error='',
+        )
+    for message in failed:
+        message.attempts += 1
+        if message.attempts >= max_attempts:
+            message.status = OutgoingEmail.FAILED
+        else:
+            message.next_attempt_at = now + backoff(message.attempts)
+    if failed:
+        OutgoingEmail.objects.bulk_update(failed, ['attempts', 'status', 'next_attempt_at', 'last_error'])
+    return len(sent), len(failed)
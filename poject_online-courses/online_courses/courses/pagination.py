@@ -0,0 +1,201 @@
+import base64
+import binascii
+import json
+from collections.abc import Sequence
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+
+class InvalidCursor(Exception):
+    """
+    Курсор не удалось разобрать (повреждён или подделан).
+    """
+
+
+class CursorPage(Sequence):
+    """
+    Страница курсорной пагинации.
+
+    В отличие от django.core.paginator.Page не знает своего номера и общего
+    количества страниц, зато переход вперёд и назад стоит одинаково
+    на любой глубине.
+    """
+    def __init__(self, object_list, paginator, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return f"<CursorPage ({len(self.object_list)} объектов)>"
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginator:
+    """
+    Пагинатор по ключу (keyset/cursor pagination).
+
+    Вместо OFFSET использует условие по последнему показанному ключу
+    сортировки, например (created_at, id), поэтому при наличии составного
+    индекса любая страница читается за одно обращение к индексу.
+    COUNT(*) выполняется только при явном обращении к атрибуту count.
+
+    Все поля ordering должны сортироваться в одном направлении,
+    последнее поле должно быть уникальным (обычно id).
+    """
+    def __init__(self, object_list, per_page, ordering=('-created_at', '-id')):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+        self.ordering = tuple(ordering)
+        self.descending = self.ordering[0].startswith('-')
+        self.fields = [name.lstrip('-') for name in self.ordering]
+
+    @cached_property
+    def count(self):
+        """
+        Общее количество объектов. Вычисляется лениво, только по запросу.
+        """
+        return self.object_list.count()
+
+    def encode_cursor(self, obj, reverse=False):
+        """
+        Кодирует ключ сортировки объекта в непрозрачную строку для URL.
+        """
+        values = []
+        for name in self.fields:
+            value = getattr(obj, name)
+            values.append(value.isoformat() if hasattr(value, 'isoformat') else value)
+        payload = json.dumps({'v': values, 'r': reverse}, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        """
+        Разбирает курсор и возвращает пару (значения ключа, направление назад).
+        """
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            raw_values = payload['v']
+            reverse = bool(payload.get('r'))
+            if len(raw_values) != len(self.fields):
+                raise InvalidCursor(cursor)
+            model = self.object_list.model
+            values = [
+                model._meta.get_field(name).to_python(value)
+                for name, value in zip(self.fields, raw_values)
+            ]
+        except (InvalidCursor, ValidationError, binascii.Error, ValueError, TypeError, KeyError) as exc:
+            raise InvalidCursor(cursor) from exc
+        if any(value is None for value in values):
+            raise InvalidCursor(cursor)
+        return values, reverse
+
+    def _seek_filter(self, values, forward):
+        """
+        Строит условие "строго после ключа" в заданном направлении:
+        (a < x) OR (a = x AND b < y) OR ... для убывающей сортировки.
+        """
+        lookup = 'lt' if self.descending == forward else 'gt'
+        condition = Q()
+        for i, name in enumerate(self.fields):
+            branch = Q(**{f'{name}__{lookup}': values[i]})
+            for prev_name, prev_value in zip(self.fields[:i], values[:i]):
+                branch &= Q(**{prev_name: prev_value})
+            condition |= branch
+        return condition
+
+    def _reversed_ordering(self):
+        return [name[1:] if name.startswith('-') else f'-{name}' for name in self.ordering]
+
+    def _page_query(self, cursor):
+        """
+        Возвращает срез запроса на per_page + 1 строк и направление для курсора.
+        """
+        if not cursor:
+            return self.object_list.order_by(*self.ordering)[:self.per_page + 1], None
+        values, reverse = self.decode_cursor(cursor)
+        queryset = self.object_list.filter(self._seek_filter(values, forward=not reverse))
+        ordering = self._reversed_ordering() if reverse else self.ordering
+        return queryset.order_by(*ordering)[:self.per_page + 1], reverse
+
+    def _finish_page(self, rows, reverse):
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if reverse is None:
+            # Первая страница
+            return self._build_page(rows, has_next=has_more, has_previous=False)
+        if reverse:
+            return self._build_page(rows[::-1], has_next=True, has_previous=has_more)
+        return self._build_page(rows, has_next=has_more, has_previous=True)
+
+    def page(self, cursor=None):
+        """
+        Возвращает страницу, начинающуюся сразу после курсора.
+        Без курсора возвращает первую страницу.
+        """
+        queryset, reverse = self._page_query(cursor)
+        return self._finish_page(list(queryset), reverse)
+
+    async def apage(self, cursor=None):
+        """
+        Асинхронный вариант page() для асинхронных представлений.
+        """
+        queryset, reverse = self._page_query(cursor)
+        return self._finish_page([obj async for obj in queryset], reverse)
+
+    def get_page(self, cursor=None):
+        """
+        Как page(), но при повреждённом курсоре возвращает первую страницу,
+        по аналогии с Paginator.get_page.
+        """
+        try:
+            return self.page(cursor)
+        except InvalidCursor:
+            return self.page()
+
+    async def aget_page(self, cursor=None):
+        """
+        Асинхронный вариант get_page().
+        """
+        try:
+            return await self.apage(cursor)
+        except InvalidCursor:
+            return await self.apage()
+
+    def _build_page(self, rows, has_next, has_previous):
+        next_cursor = previous_cursor = None
+        if rows and has_next:
+            next_cursor = self.encode_cursor(rows[-1])
+        if rows and has_previous:
+            previous_cursor = self.encode_cursor(rows[0], reverse=True)
+        return CursorPage(rows, self, next_cursor, previous_cursor)
+
+
+async def aget_page(paginator, number, count=None):
+    """
+    Асинхронный вариант Paginator.get_page для обычной постраничной навигации.
+
+    Количество объектов берётся из count (например, хранимого счётчика)
+    или считается через acount(), а объекты страницы загружаются асинхронной
+    итерацией, поэтому запросы не выполняются синхронно внутри цикла событий.
+    """
+    paginator.__dict__['count'] = await paginator.object_list.acount() if count is None else count
+    page = paginator.get_page(number)
+    page.object_list = [obj async for obj in page.object_list]
+    return page
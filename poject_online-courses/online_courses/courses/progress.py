@@ -0,0 +1,154 @@
+from django.db import connection, transaction
+from django.db.models import Max, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from .models import Course, CourseProgress, Lecture
+
+# Прогресс по курсу - одна строка на пользователя и курс (CourseProgress) с битовой
+# маской пройденных лекций. Бит лекции (Lecture.progress_bit) выдаётся при создании
+# и не меняется при перестановке; при удалении лекции её бит снимается у всех
+# после фиксации транзакции (см. signals.py), потому что это обходит весь прогресс курса.
+BATCH_SIZE = 500
+
+
+def is_set(bits, index):
+    byte = index // 8
+    return byte < len(bits) and bool(bits[byte] >> (index % 8) & 1)
+
+
+def set_bit(bits, index):
+    result = bytearray(bits)
+    byte = index // 8
+    if byte >= len(result):
+        result.extend(bytes(byte + 1 - len(result)))
+    result[byte] |= 1 << (index % 8)
+    return bytes(result)
+
+
+def clear_bit(bits, index):
+    result = bytearray(bits)
+    byte = index // 8
+    if byte < len(result):
+        result[byte] &= ~(1 << (index % 8)) & 0xFF
+    return bytes(result)
+
+
+def next_bit(course_id):
+    """
+    Выражение "максимальный бит в курсе + 1", вычисляемое самим INSERT (как next_order()).
+    """
+    max_bit = Lecture.objects.filter(course_id=course_id).values('course').annotate(value=Max('progress_bit')).values('value')
+    return Coalesce(Subquery(max_bit), Value(-1)) + 1
+
+
+def allocate_bit(course_id):
+    """
+    Бит для лекции, сохраняемой без append_lecture() (например, из админки).
+    Возвращает выражение next_bit(): максимум вычисляет сам INSERT или UPDATE, поэтому
+    между чтением и записью нет промежутка. Внутри транзакции строка курса блокируется
+    до её конца, как в ordering.append_lecture() (на SQLite запись и так последовательна).
+    """
+    if connection.in_atomic_block:
+        Course.objects.select_for_update().filter(pk=course_id).values_list('pk').first()
+    return next_bit(course_id)
+
+
+def mark_complete(user, lecture):
+    """
+    Отмечает лекцию пройденной. Возвращает True, если отметки раньше не было.
+    """
+    with transaction.atomic():
+        progress, _ = CourseProgress.objects.select_for_update().get_or_create(user=user, course_id=lecture.course_id)
+        bits = bytes(progress.completed)
+        if is_set(bits, lecture.progress_bit):
+            return False
+        progress.completed = set_bit(bits, lecture.progress_bit)
+        progress.completed_count += 1
+        progress.save(update_fields=['completed', 'completed_count', 'updated_at'])
+    return True
+
+
+def _completed_bits(user, lecture):
+    return CourseProgress.objects.filter(user=user, course_id=lecture.course_id).values_list('completed', flat=True)
+
+
+def is_complete(user, lecture):
+    """
+    Отмечена ли лекция пройденной пользователем. Для анонимного пользователя - False.
+    """
+    if not user.is_authenticated:
+        return False
+    bits = _completed_bits(user, lecture).first()
+    return bits is not None and is_set(bytes(bits), lecture.progress_bit)
+
+
+async def ais_complete(user, lecture):
+    """
+    Асинхронный вариант is_complete().
+    """
+    if not user.is_authenticated:
+        return False
+    bits = await _completed_bits(user, lecture).afirst()
+    return bits is not None and is_set(bytes(bits), lecture.progress_bit)
+
+
+def percent(completed_count, lecture_count):
+    """
+    Процент пройденных лекций курса.
+    """
+    if not lecture_count:
+        return 0
+    return min(100, round(100 * completed_count / lecture_count))
+
+
+def _progress_rows(user, courses):
+    return CourseProgress.objects.filter(user=user, course__in=[course.pk for course in courses]).values_list('course_id', 'completed_count')
+
+
+def attach_percent(user, courses):
+    """
+    Добавляет каждому курсу атрибут progress_percent одним запросом на всю страницу.
+    Для анонимного пользователя ничего не делает.
+    """
+    if not user.is_authenticated or not courses:
+        return courses
+    counts = dict(_progress_rows(user, courses))
+    for course in courses:
+        course.progress_percent = percent(counts.get(course.pk, 0), course.lecture_count)
+    return courses
+
+
+async def aattach_percent(user, courses):
+    """
+    Асинхронный вариант attach_percent().
+    """
+    if not user.is_authenticated or not courses:
+        return courses
+    counts = {course_id: count async for course_id, count in _progress_rows(user, courses)}
+    for course in courses:
+        course.progress_percent = percent(counts.get(course.pk, 0), course.lecture_count)
+    return courses
+
+
+def release_bit(course_id, bit, batch_size=BATCH_SIZE):
+    """
+    Снимает бит удалённой или перенесённой лекции у всех пользователей курса,
+    чтобы он не засчитывался и мог достаться новой лекции.
+    Возвращает количество изменённых строк прогресса.
+    """
+    rows = CourseProgress.objects.filter(course_id=course_id, completed_count__gt=0).only('id', 'completed', 'completed_count')
+    changed = []
+    total = 0
+    for progress in rows.iterator(chunk_size=batch_size):
+        bits = bytes(progress.completed)
+        if not is_set(bits, bit):
+            continue
+        progress.completed = clear_bit(bits, bit)
+        progress.completed_count -= 1
+        changed.append(progress)
+        if len(changed) >= batch_size:
+            CourseProgress.objects.bulk_update(changed, ['completed', 'completed_count'])
+            total += len(changed)
+            changed = []
+    CourseProgress.objects.bulk_update(changed, ['completed', 'completed_count'])
+    return total + len(changed)
@@ -0,0 +1,134 @@
+import csv
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.password_validation import validate_password
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from . import outbox
+
+User = get_user_model()
+
+# Массовое создание учётных записей из CSV (команда provision_users).
+# Пароли хэшируются пулом процессов: PBKDF2 занимает процессор целиком,
+# а потоки упёрлись бы в GIL. Пользователи сохраняются через bulk_create,
+# который не отправляет post_save, поэтому приветственные письма пачки
+# ставятся в очередь одним outbox.enqueue_many() вместо user_registered.
+BATCH_SIZE = getattr(settings, 'COURSES_PROVISION_BATCH_SIZE', 500)
+COLUMNS = ('username', 'email', 'password', 'first_name', 'last_name')
+
+WELCOME_SUBJECT = "Добро пожаловать на платформу!"
+
+
+def welcome_email(username, email):
+    """
+    Приветственное письмо новому пользователю: (subject, body, recipients).
+    """
+    return WELCOME_SUBJECT, f"Здравствуйте, {username}! Спасибо за регистрацию.", [email]
+
+
+def read_rows(lines):
+    """
+    Генератор строк CSV с заголовком: пары (номер строки, словарь полей из COLUMNS).
+    Обязателен только столбец username; пустые строки пропускаются.
+    """
+    reader = csv.DictReader(lines)
+    if not reader.fieldnames or 'username' not in reader.fieldnames:
+        raise ValueError("В заголовке CSV нет столбца username")
+    for row in reader:
+        values = {column: (row.get(column) or '').strip() for column in COLUMNS}
+        if any(values.values()):
+            yield reader.line_num, values
+
+
+def _build_users(rows, seen, errors, validate):
+    """
+    Проверяет строки пачки и возвращает пары (пользователь, пароль).
+    Ошибки добавляются в errors как (номер строки, сообщение).
+    """
+    users = []
+    for line, values in rows:
+        username = User.normalize_username(values['username'])
+        if not username:
+            errors.append((line, "не указано имя пользователя"))
+            continue
+        if username in seen:
+            errors.append((line, f"пользователь {username} уже встречался в файле"))
+            continue
+        seen.add(username)
+        user = User(
+            username=username, email=User.objects.normalize_email(values['email']),
+            first_name=values['first_name'], last_name=values['last_name'],
+        )
+        try:
+            User.username_validator(username)
+            if validate and values['password']:
+                # Те же проверки, что в UserCreationForm
+                validate_password(values['password'], user)
+        except ValidationError as exc:
+            errors.append((line, f"{username}: {' '.join(exc.messages)}"))
+            continue
+        users.append((user, values['password']))
+    return users
+
+
+def _save_batch(users, hash_passwords):
+    """
+    Хэширует пароли пачки, сохраняет новых пользователей и ставит в очередь
+    приветственные письма. Возвращает (создано, уже существовали).
+    """
+    existing = set(User.objects.filter(username__in=[user.username for user, _ in users]).values_list('username', flat=True))
+    users = [(user, password) for user, password in users if user.username not in existing]
+    # Без пароля - неиспользуемый пароль, как у set_unusable_password(); хэшировать нечего
+    hashes = iter(hash_passwords([password for _, password in users if password]))
+    for user, password in users:
+        user.password = next(hashes) if password else make_password(None)
+    with transaction.atomic():
+        User.objects.bulk_create([user for user, _ in users])
+        outbox.enqueue_many(welcome_email(user.username, user.email) for user, _ in users if user.email)
+    return len(users), len(existing)
+
+
+def provision(rows, batch_size=BATCH_SIZE, workers=None, validate=True):
+    """
+    Создаёт пользователей из строк read_rows() пачками по batch_size.
+    Каждая пачка сохраняется отдельной транзакцией; пользователи, которые уже есть
+    в базе, пропускаются. workers - число процессов для хэширования
+    (по умолчанию по числу ядер, 1 - без пула).
+    Возвращает (создано, пропущено, список ошибок (номер строки, сообщение)).
+    """
+    workers = workers or os.cpu_count() or 1
+    created = skipped = 0
+    errors = []
+    seen = set()
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+
+    def hash_passwords(passwords):
+        if pool is None or len(passwords) < 2:
+            return [make_password(password) for password in passwords]
+        return list(pool.map(make_password, passwords, chunksize=max(1, len(passwords) // (workers * 4))))
+
+    def flush(batch):
+        nonlocal created, skipped
+        users = _build_users(batch, seen, errors, validate)
+        if users:
+            batch_created, batch_skipped = _save_batch(users, hash_passwords)
+            created += batch_created
+            skipped += batch_skipped
+
+    try:
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= batch_size:
+                flush(batch)
+                batch = []
+        flush(batch)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    return created, skipped, errors
@@ -0,0 +1,118 @@
+from functools import reduce
+from operator import or_
+
+from django.db import transaction
+from django.db.models import Case, Count, F, Q, Sum, Value, When
+
+from .models import ChoiceStats, LectureQuizStats, QuestionStats, QuizAnswer, QuizAttempt, Test
+
+
+def ensure_question_rows(test):
+    """
+    Создаёт строки статистики для вопроса и всех его вариантов ответа.
+    Существующие строки не трогает, поэтому вызывается после каждого сохранения теста.
+    """
+    QuestionStats.objects.get_or_create(test=test)
+    ChoiceStats.objects.bulk_create(
+        [ChoiceStats(test=test, choice=str(choice)) for choice in test.choices or []],
+        ignore_conflicts=True,
+    )
+
+
+def create_question_rows(tests, batch_size=500):
+    """
+    Создаёт пустую статистику для новых вопросов, добавленных через bulk_create
+    (сигнал post_save в этом случае не отправляется).
+    """
+    QuestionStats.objects.bulk_create([QuestionStats(test=test) for test in tests], batch_size=batch_size)
+    ChoiceStats.objects.bulk_create([
+        ChoiceStats(test=test, choice=choice)
+        for test in tests for choice in dict.fromkeys(str(choice) for choice in test.choices or [])
+    ], batch_size=batch_size)
+
+
+def record(lecture_id, score, answers):
+    """
+    Учитывает проверенную попытку в агрегатах.
+
+    answers - список (id теста, выбранный ответ, верно ли) из grading.grade.
+    Выполняет не более трёх UPDATE независимо от числа вопросов.
+    """
+    test_ids = [test_id for test_id, _, _ in answers]
+    correct_ids = [test_id for test_id, _, is_correct in answers if is_correct]
+    selected = [Q(test_id=test_id, choice=choice) for test_id, choice, _ in answers if choice]
+
+    question_increments = {'attempts': F('attempts') + 1}
+    if correct_ids:
+        question_increments['correct'] = F('correct') + Case(When(test_id__in=correct_ids, then=Value(1)), default=Value(0))
+    QuestionStats.objects.filter(test_id__in=test_ids).update(**question_increments)
+    if selected:
+        # В одной попытке на вопрос приходится один ответ, поэтому каждая строка увеличится на 1
+        ChoiceStats.objects.filter(reduce(or_, selected)).update(count=F('count') + 1)
+
+    increments = {
+        'attempts': F('attempts') + 1,
+        'total_score': F('total_score') + score,
+        'total_questions': F('total_questions') + len(answers),
+    }
+    if not LectureQuizStats.objects.filter(lecture_id=lecture_id).update(**increments):
+        # Первая попытка по лекции; ignore_conflicts - строку могла создать параллельная транзакция
+        LectureQuizStats.objects.bulk_create([LectureQuizStats(lecture_id=lecture_id)], ignore_conflicts=True)
+        LectureQuizStats.objects.filter(lecture_id=lecture_id).update(**increments)
+
+
+@transaction.atomic
+def rebuild(lecture_ids=None):
+    """
+    Пересчитывает все агрегаты по сохранённым попыткам.
+    lecture_ids ограничивает пересчёт отдельными лекциями.
+    """
+    tests = Test.objects.all()
+    attempts = QuizAttempt.objects.all()
+    answers = QuizAnswer.objects.all()
+    lecture_stats = LectureQuizStats.objects.all()
+    if lecture_ids is not None:
+        tests = tests.filter(lecture_id__in=lecture_ids)
+        attempts = attempts.filter(lecture_id__in=lecture_ids)
+        answers = answers.filter(test__lecture_id__in=lecture_ids)
+        lecture_stats = lecture_stats.filter(lecture_id__in=lecture_ids)
+
+    QuestionStats.objects.filter(test__in=tests).delete()
+    ChoiceStats.objects.filter(test__in=tests).delete()
+    lecture_stats.delete()
+
+    question_totals = {
+        row['test_id']: row
+        for row in answers.values('test_id').annotate(
+            attempts=Count('id'), correct=Count('id', filter=Q(is_correct=True))
+        )
+    }
+    choice_totals = {
+        (row['test_id'], row['selected_answer']): row['count']
+        for row in answers.exclude(selected_answer='').values('test_id', 'selected_answer').annotate(count=Count('id'))
+    }
+
+    question_rows = []
+    choice_rows = []
+    for test in tests.only('id', 'choices').iterator():
+        totals = question_totals.get(test.id, {})
+        question_rows.append(QuestionStats(
+            test_id=test.id, attempts=totals.get('attempts', 0), correct=totals.get('correct', 0),
+        ))
+        for choice in dict.fromkeys(str(choice) for choice in test.choices or []):
+            choice_rows.append(ChoiceStats(
+                test_id=test.id, choice=choice, count=choice_totals.get((test.id, choice), 0),
+            ))
+    QuestionStats.objects.bulk_create(question_rows, batch_size=500)
+    ChoiceStats.objects.bulk_create(choice_rows, batch_size=500)
+
+    LectureQuizStats.objects.bulk_create([
+        LectureQuizStats(
+            lecture_id=row['lecture_id'], attempts=row['attempts'],
+            total_score=row['total_score'], total_questions=row['total_questions'],
+        )
+        for row in attempts.values('lecture_id').annotate(
+            attempts=Count('id'), total_score=Sum('score'), total_questions=Sum('total'),
+        )
+    ], batch_size=500)
+    return len(question_rows)
@@ -0,0 +1,87 @@
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+
+PRIMARY = 'default'
+REPLICA = 'replica'
+
+# Сколько секунд после изменяющего запроса пользователь читает с основной базы,
+# чтобы сразу видеть свои изменения, даже если реплика отстаёт
+STICKY_SECONDS = getattr(settings, 'COURSES_REPLICA_STICKY_SECONDS', 10)
+STICKY_COOKIE = 'use_primary_db'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# База для чтения в текущем запросе. Вне HTTP-запросов (команды, фоновые потоки)
+# чтение всегда идёт с основной базы.
+_read_alias = ContextVar('courses_read_alias', default=PRIMARY)
+
+
+class ReplicaRouter:
+    """
+    Направляет чтение безопасных запросов (GET/HEAD) на реплику, а запись - на основную базу.
+
+    Реплика используется, только если в DATABASES есть псевдоним 'replica'.
+    Внутри транзакции на основной базе чтение тоже идёт с неё.
+    """
+    def db_for_read(self, model, **hints):
+        if _read_alias.get() == REPLICA and not connections[PRIMARY].in_atomic_block:
+            return REPLICA
+        return PRIMARY
+
+    def db_for_write(self, model, **hints):
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплика содержит те же данные, что и основная база
+        if {obj1._state.db, obj2._state.db} <= {PRIMARY, REPLICA}:
+            return True
+        return None
+
+
+class ReplicaStickinessMiddleware:
+    """
+    Выбирает базу для чтения на время запроса.
+
+    Изменяющие запросы (POST и т.п.) читают с основной базы и ставят cookie,
+    из-за которой следующие STICKY_SECONDS секунд чтение тоже идёт с основной базы
+    (read-your-writes). Остальные запросы читают с реплики.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = _read_alias.set(self.read_alias(request))
+        try:
+            response = self.get_response(request)
+        finally:
+            _read_alias.reset(token)
+        return self.process_response(request, response)
+
+    async def __acall__(self, request):
+        token = _read_alias.set(self.read_alias(request))
+        try:
+            response = await self.get_response(request)
+        finally:
+            _read_alias.reset(token)
+        return self.process_response(request, response)
+
+    def read_alias(self, request):
+        if REPLICA not in settings.DATABASES:
+            return PRIMARY
+        if request.method not in SAFE_METHODS or STICKY_COOKIE in request.COOKIES:
+            return PRIMARY
+        return REPLICA
+
+    def process_response(self, request, response):
+        if request.method not in SAFE_METHODS and REPLICA in settings.DATABASES:
+            response.set_cookie(STICKY_COOKIE, '1', max_age=STICKY_SECONDS, httponly=True, samesite='Lax')
+        return response
@@ -0,0 +1,8 @@
+from django.urls import path
+
+from .consumers import LectureCommentsConsumer
+
+websocket_urlpatterns = [
+    # Новые комментарии к лекции в реальном времени
+    path('ws/lecture/<int:lecture_id>/comments/', LectureCommentsConsumer.as_asgi()),
+]
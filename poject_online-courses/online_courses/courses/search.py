@@ -0,0 +1,246 @@
+import re
+
+from django.db import connection
+from django.db.models.expressions import RawSQL
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import Comment, Course, Lecture, Test
+
+# Полнотекстовый индекс SQLite FTS5.
+# rowid кодирует тип и id объекта, поэтому обновление и удаление записи
+# выполняются по первичному ключу, без просмотра всей таблицы.
+TABLE = 'courses_search'
+KINDS = {'course': 0, 'lecture': 1, 'comment': 2, 'test': 3}
+MODELS = {'course': Course, 'lecture': Lecture, 'comment': Comment, 'test': Test}
+BATCH_SIZE = 1000
+
+CREATE_TABLE_SQL = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} USING fts5("
+    "kind UNINDEXED, object_id UNINDEXED, target UNINDEXED, title, body, extra, "
+    "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+)
+DROP_TABLE_SQL = f"DROP TABLE IF EXISTS {TABLE}"
+
+# Веса столбцов для bm25: заголовок важнее текста, текст важнее служебных полей
+RANK_SQL = f"bm25({TABLE}, 0, 0, 0, 10.0, 1.0, 0.5)"
+
+# Маркеры подсветки заменяются на <mark> уже после экранирования HTML
+HIGHLIGHT_START, HIGHLIGHT_END = '\x02', '\x03'
+TOKEN_RE = re.compile(r'\w+')
+
+
+def is_available():
+    """
+    Индекс поддерживается только на SQLite.
+    """
+    return connection.vendor == 'sqlite'
+
+
+def _rowid(kind, object_id):
+    return object_id * len(KINDS) + KINDS[kind]
+
+
+def kind_of(obj):
+    for kind, model in MODELS.items():
+        if isinstance(obj, model):
+            return kind
+    raise ValueError(f"Объект {obj!r} не индексируется")
+
+
+def document(obj):
+    """
+    Возвращает поля записи индекса: (target, title, body, extra).
+    target - то, что нужно для построения ссылки на результат.
+    """
+    if isinstance(obj, Course):
+        return obj.slug, obj.title, obj.description, obj.author.username
+    if isinstance(obj, Lecture):
+        return str(obj.id), obj.title, '', obj.course.title
+    if isinstance(obj, Comment):
+        return str(obj.lecture_id), obj.lecture.title, obj.text, obj.author.username
+    if isinstance(obj, Test):
+        return str(obj.lecture_id), obj.lecture.title, obj.question, ''
+    raise ValueError(f"Объект {obj!r} не индексируется")
+
+
+def _rows(kind, objects):
+    for obj in objects:
+        yield (_rowid(kind, obj.pk), kind, obj.pk, *document(obj))
+
+
+def _insert(cursor, rows):
+    cursor.executemany(
+        f"INSERT INTO {TABLE} (rowid, kind, object_id, target, title, body, extra) "
+        "VALUES (%s, %s, %s, %s, %s, %s, %s)",
+        rows,
+    )
+
+
+def index_object(obj):
+    """
+    Добавляет или обновляет объект в индексе.
+    """
+    if not is_available():
+        return
+    kind = kind_of(obj)
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {TABLE} WHERE rowid = %s", [_rowid(kind, obj.pk)])
+        _insert(cursor, list(_rows(kind, [obj])))
+
+
+def index_new_objects(kind, objects):
+    """
+    Добавляет в индекс новые объекты одним запросом, например после bulk_create,
+    который не отправляет сигналы post_save.
+    """
+    if not is_available() or not objects:
+        return
+    with connection.cursor() as cursor:
+        _insert(cursor, list(_rows(kind, objects)))
+
+
+def remove_object(obj):
+    """
+    Удаляет объект из индекса.
+    """
+    if not is_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {TABLE} WHERE rowid = %s", [_rowid(kind_of(obj), obj.pk)])
+
+
+def remove_objects(kind, object_ids, batch_size=BATCH_SIZE):
+    """
+    Удаляет из индекса объекты одного типа одним запросом на batch_size объектов,
+    например после массового удаления, которое не отправляет сигналы post_delete.
+    """
+    if not is_available() or not object_ids:
+        return
+    rowids = [_rowid(kind, pk) for pk in object_ids]
+    with connection.cursor() as cursor:
+        for start in range(0, len(rowids), batch_size):
+            batch = rowids[start:start + batch_size]
+            cursor.execute(f"DELETE FROM {TABLE} WHERE rowid IN ({', '.join(['%s'] * len(batch))})", batch)
+
+
+def update_parent_title(parent, batch_size=BATCH_SIZE):
+    """
+    Записывает новое название курса или лекции в записи потомков, которые хранят его копию
+    (лекции курса; комментарии и тесты лекции). Вызывается при переименовании родителя.
+    Читаются только id потомков, записи обновляются одним UPDATE на batch_size объектов.
+    """
+    if not is_available():
+        return
+    if isinstance(parent, Course):
+        children = [('lecture', 'extra', Lecture.objects.filter(course=parent))]
+    else:
+        children = [('comment', 'title', Comment.objects.filter(lecture=parent)), ('test', 'title', Test.objects.filter(lecture=parent))]
+    with connection.cursor() as cursor:
+        for kind, column, queryset in children:
+            rowids = [_rowid(kind, pk) for pk in queryset.values_list('id', flat=True)]
+            for start in range(0, len(rowids), batch_size):
+                batch = rowids[start:start + batch_size]
+                cursor.execute(
+                    f"UPDATE {TABLE} SET {column} = %s WHERE rowid IN ({', '.join(['%s'] * len(batch))})",
+                    [parent.title, *batch],
+                )
+
+
+def remove_lecture_children(lectures):
+    """
+    Удаляет из индекса комментарии и тесты лекций (queryset) перед их каскадным удалением.
+    """
+    if not is_available():
+        return
+    remove_objects('comment', list(Comment.objects.filter(lecture__in=lectures).values_list('id', flat=True)))
+    remove_objects('test', list(Test.objects.filter(lecture__in=lectures).values_list('id', flat=True)))
+
+
+def _querysets():
+    return {
+        'course': Course.objects.select_related('author'),
+        'lecture': Lecture.objects.select_related('course'),
+        'comment': Comment.objects.select_related('author', 'lecture'),
+        'test': Test.objects.select_related('lecture'),
+    }
+
+
+def rebuild(batch_size=BATCH_SIZE):
+    """
+    Перестраивает индекс целиком. Возвращает количество проиндексированных объектов по типам.
+    """
+    counts = {}
+    with connection.cursor() as cursor:
+        cursor.execute(DROP_TABLE_SQL)
+        cursor.execute(CREATE_TABLE_SQL)
+        for kind, queryset in _querysets().items():
+            counts[kind] = 0
+            batch = []
+            for row in _rows(kind, queryset.iterator(chunk_size=batch_size)):
+                batch.append(row)
+                if len(batch) >= batch_size:
+                    _insert(cursor, batch)
+                    counts[kind] += len(batch)
+                    batch = []
+            if batch:
+                _insert(cursor, batch)
+                counts[kind] += len(batch)
+        # Слияние сегментов индекса после массовой загрузки
+        cursor.execute(f"INSERT INTO {TABLE}({TABLE}) VALUES ('optimize')")
+    return counts
+
+
+def build_match(query):
+    """
+    Превращает пользовательский ввод в безопасный запрос FTS5:
+    каждое слово ищется как префикс, все слова должны присутствовать.
+    """
+    tokens = TOKEN_RE.findall(query or '')
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+
+def _highlight(text):
+    return mark_safe(
+        escape(text).replace(HIGHLIGHT_START, '<mark>').replace(HIGHLIGHT_END, '</mark>')
+    )
+
+
+def search(query, kinds=None, limit=20):
+    """
+    Ищет по индексу и возвращает результаты, упорядоченные по релевантности.
+    Каждый результат - словарь с ключами kind, object_id, target, title, snippet.
+    """
+    match = build_match(query)
+    if not match or not is_available():
+        return []
+    sql = (
+        f"SELECT kind, object_id, target, title, "
+        f"snippet({TABLE}, 4, %s, %s, '…', 16) "
+        f"FROM {TABLE} WHERE {TABLE} MATCH %s"
+    )
+    params = [HIGHLIGHT_START, HIGHLIGHT_END, match]
+    if kinds:
+        sql += f" AND kind IN ({', '.join(['%s'] * len(kinds))})"
+        params += list(kinds)
+    sql += f" ORDER BY {RANK_SQL} LIMIT %s"
+    params.append(limit)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+    return [
+        {'kind': kind, 'object_id': object_id, 'target': target, 'title': title, 'snippet': _highlight(snippet)}
+        for kind, object_id, target, title, snippet in rows
+    ]
+
+
+def matching_ids(kind, query):
+    """
+    Подзапрос с id объектов заданного типа, подходящих под запрос.
+    Используется как queryset.filter(pk__in=matching_ids(...)), чтобы фильтрация
+    оставалась в базе данных.
+    """
+    return RawSQL(
+        f"SELECT object_id FROM {TABLE} WHERE {TABLE} MATCH %s AND kind = %s",
+        [build_match(query), kind],
+    )
@@ -1,16 +1,242 @@
 from django.dispatch import receiver
-from django.db.models.signals import post_save
+from django.db.models.signals import post_init, pre_save, post_save, pre_delete, post_delete
 from django.contrib.auth import get_user_model
-from django.core.mail import send_mail  
-from django.conf import settings  
+from django.db import transaction
+from django.utils import timezone
+from . import archive
+from . import leaderboard
+from . import outbox
+from . import progress
+from .auth import forget_user
+from .cache import bump_version
+from .conditional import touch
+from .counters import adjust
+from .consumers import broadcast_comment
+from .grading import invalidate_answer_key
+from .quiz_stats import ensure_question_rows
+from . import search
+from .images import delete_renditions, schedule_generation
+from .provisioning import welcome_email
+from .models import Course, Lecture, Comment, Test
 User = get_user_model()
 
 @receiver(post_save, sender=User)
 def user_registered(sender, instance, created, **kwargs):
     if created:
         # Уведомление о регистрации нового пользователя
-        subject = "Добро пожаловать на платформу!"
-        message = f"Здравствуйте, {instance.username}! Спасибо за регистрацию."
-        recipient_list = [instance.email]
+        if instance.email:
+            # Письмо только ставится в очередь, отправляет его команда send_outbox
+            outbox.enqueue(*welcome_email(instance.username, instance.email))
 
-        send_mail(subject, message, settings.DEFAULT_FROM_EMAIL, recipient_list)
+@receiver([post_save, post_delete], sender=User)
+def user_changed(sender, instance, **kwargs):
+    # Пароль, права и профиль в кэше (см. auth.py) должны совпадать с базой
+    forget_user(instance.pk)
+
+@receiver(pre_delete, sender=User)
+def user_leaving_leaderboard(sender, instance, **kwargs):
+    # Строки рейтинга удалятся каскадно, а количество участников в корзинах нужно уменьшить
+    leaderboard.forget_user(instance)
+
+@receiver(pre_delete, sender=User)
+def user_leaving_archive(sender, instance, **kwargs):
+    # Комментарии в Comment удалятся каскадно, архивные нужно убрать из блоков
+    archive.forget_author(instance)
+
+@receiver([post_save, post_delete], sender=Course)
+def course_changed(sender, instance, **kwargs):
+    # Курс виден и в списке, и на своей странице: сбрасываем общую версию
+    bump_version('courses')
+
+@receiver(post_init, sender=Course)
+def remember_image(sender, instance, **kwargs):
+    # Имя файла при загрузке; у объектов из only()/defer() без image поле не читаем
+    if 'image' in instance.__dict__:
+        image = instance.__dict__['image']
+        instance._image_name = getattr(image, 'name', image) or ''
+
+@receiver(post_save, sender=Course)
+def course_image_changed(sender, instance, created=False, **kwargs):
+    image_name = instance.image.name if instance.image else ''
+    previous = instance.__dict__.pop('_image_name', None)
+    instance._image_name = image_name
+    if not created and previous == image_name:
+        # Изображение не менялось: сохранение названия или описания копии не трогает
+        return
+    # Уменьшенные копии изображения создаются в фоне после фиксации транзакции
+    transaction.on_commit(lambda: schedule_generation(instance))
+
+@receiver(post_delete, sender=Course)
+def course_image_deleted(sender, instance, **kwargs):
+    # Уменьшенные копии удалённого курса больше не нужны
+    renditions, course_id = instance.image_renditions, instance.pk
+    transaction.on_commit(lambda: delete_renditions(renditions, course_id=course_id))
+
+@receiver([post_save, post_delete], sender=Lecture)
+def lecture_changed(sender, instance, **kwargs):
+    # Лекции выводятся только на странице своего курса
+    try:
+        slug = instance.course.slug
+    except Course.DoesNotExist:
+        return
+    bump_version(f'course:{slug}')
+    # Лекцию перенесли в другой курс: список лекций прежнего курса тоже устарел.
+    # Этот приёмник подключён раньше счётчиков, поэтому _counted_parent_id ещё указывает на прежний курс.
+    previous_id = instance.__dict__.get('_counted_parent_id')
+    if previous_id not in (None, instance.course_id):
+        previous_slug = Course.objects.filter(pk=previous_id).values_list('slug', flat=True).first()
+        if previous_slug is not None:
+            bump_version(f'course:{previous_slug}')
+
+@receiver([post_save, post_delete], sender=Test)
+def test_changed(sender, instance, raw=False, **kwargs):
+    # Ключ ответов лекции нужно собрать заново
+    invalidate_answer_key(instance.lecture_id)
+    if not raw:
+        # Страница лекции изменилась (см. conditional.py)
+        touch(Lecture, instance.lecture_id)
+
+@receiver(post_save, sender=Test)
+def test_saved(sender, instance, **kwargs):
+    # Строки статистики должны существовать до первой попытки
+    ensure_question_rows(instance)
+
+@receiver(post_save, sender=Comment)
+def comment_posted(sender, instance, created, **kwargs):
+    # Новый комментарий отправляем открытым страницам лекции после фиксации транзакции
+    if created:
+        transaction.on_commit(lambda: broadcast_comment(instance))
+
+@receiver(post_save, sender=Course)
+@receiver(post_save, sender=Lecture)
+@receiver(post_save, sender=Comment)
+@receiver(post_save, sender=Test)
+def search_index_update(sender, instance, created=False, **kwargs):
+    # Поддерживаем полнотекстовый индекс в актуальном состоянии
+    search.index_object(instance)
+    # Записи потомков хранят копию названия курса или лекции
+    indexed_title = instance.__dict__.pop('_indexed_title', None)
+    if not created and indexed_title is not None and indexed_title != instance.title:
+        search.update_parent_title(instance)
+    if sender in (Course, Lecture):
+        instance._indexed_title = instance.title
+
+@receiver(post_init, sender=Course)
+@receiver(post_init, sender=Lecture)
+def remember_title(sender, instance, **kwargs):
+    # Как в remember_parent: у объектов из only()/defer() без title поле не читаем
+    instance._indexed_title = instance.__dict__.get('title')
+
+# Модели, при каскадном удалении вместе с которыми запись индекса уже удалена заранее
+SEARCH_PARENTS = {Lecture: (Course,), Comment: (Course, Lecture), Test: (Course, Lecture)}
+
+def _deleted_with(origin, *models):
+    """
+    True, если объект удаляется каскадом вместе с объектом (или queryset) одной из моделей.
+    """
+    return isinstance(origin, models) or getattr(origin, 'model', None) in models
+
+@receiver(post_delete, sender=Course)
+@receiver(post_delete, sender=Lecture)
+@receiver(post_delete, sender=Comment)
+@receiver(post_delete, sender=Test)
+def search_index_remove(sender, instance, origin=None, **kwargs):
+    # Потомков удаляемых курса и лекции убирает из индекса search_children_remove одним запросом
+    if _deleted_with(origin, *SEARCH_PARENTS.get(sender, ())):
+        return
+    search.remove_object(instance)
+
+@receiver(pre_delete, sender=Course)
+@receiver(pre_delete, sender=Lecture)
+def search_children_remove(sender, instance, origin=None, **kwargs):
+    if sender is Lecture:
+        if not _deleted_with(origin, Course):
+            search.remove_lecture_children(Lecture.objects.filter(pk=instance.pk))
+        return
+    lectures = Lecture.objects.filter(course=instance)
+    search.remove_objects('lecture', list(lectures.values_list('id', flat=True)))
+    search.remove_lecture_children(lectures)
+
+@receiver(post_init, sender=Lecture)
+@receiver(post_init, sender=Comment)
+def remember_parent(sender, instance, **kwargs):
+    # Родитель на момент загрузки нужен, чтобы перенести счётчик при смене курса или лекции.
+    # Читаем из __dict__: у объектов из only()/defer() обращение к полю выполнило бы запрос.
+    instance._counted_parent_id = instance.__dict__.get('course_id' if sender is Lecture else 'lecture_id')
+
+def _count_parent_change(parent_model, field, instance, parent_id, created, raw):
+    """
+    Увеличивает счётчик родителя для нового объекта или переносит его при смене родителя.
+    Тем же UPDATE родитель отмечается изменённым (updated_at, см. conditional.py);
+    если счётчик не менялся, updated_at обновляется отдельно.
+    Возвращает True, если счётчики изменились.
+    """
+    if raw:
+        return False
+    now = timezone.now()
+    if created:
+        adjust(parent_model, parent_id, field, 1, updated_at=now)
+    elif instance._counted_parent_id is not None and instance._counted_parent_id != parent_id:
+        adjust(parent_model, instance._counted_parent_id, field, -1, updated_at=now)
+        adjust(parent_model, parent_id, field, 1, updated_at=now)
+    else:
+        touch(parent_model, parent_id, now)
+        return False
+    instance._counted_parent_id = parent_id
+    return True
+
+@receiver(post_save, sender=Lecture)
+def lecture_counted(sender, instance, created, raw=False, **kwargs):
+    if _count_parent_change(Course, 'lecture_count', instance, instance.course_id, created, raw):
+        # Количество лекций выводится в списке курсов
+        bump_version('courses')
+
+@receiver(post_delete, sender=Lecture)
+def lecture_uncounted(sender, instance, origin=None, **kwargs):
+    if _deleted_with(origin, Course):
+        return
+    if adjust(Course, instance.course_id, 'lecture_count', -1, updated_at=timezone.now()):
+        bump_version('courses')
+
+@receiver(pre_save, sender=Lecture)
+def lecture_progress_bit(sender, instance, raw=False, **kwargs):
+    # Новая или перенесённая в другой курс лекция получает свободный бит в отметках прохождения.
+    # append_lecture() задаёт бит сам, выражением внутри INSERT.
+    if raw:
+        return
+    moved = not instance._state.adding and instance._counted_parent_id not in (None, instance.course_id)
+    if moved:
+        instance._released_bit = (instance._counted_parent_id, instance.progress_bit)
+    if instance.progress_bit is None or moved:
+        instance.progress_bit = progress.allocate_bit(instance.course_id)
+        instance._allocated_bit = True
+
+@receiver(post_save, sender=Lecture)
+def lecture_progress_moved(sender, instance, **kwargs):
+    if instance.__dict__.pop('_allocated_bit', False):
+        # Бит вычислило выражение allocate_bit() при записи (append_lecture() перечитывает его сам)
+        instance.refresh_from_db(fields=['progress_bit'])
+    released = instance.__dict__.pop('_released_bit', None)
+    if released is not None and released[1] is not None:
+        # Снятие бита обходит весь прогресс курса: выполняем его вне транзакции сохранения
+        transaction.on_commit(lambda: progress.release_bit(*released))
+
+@receiver(post_delete, sender=Lecture)
+def lecture_progress_released(sender, instance, origin=None, **kwargs):
+    # При удалении всего курса строки прогресса удаляются вместе с ним
+    if _deleted_with(origin, Course):
+        return
+    if instance.progress_bit is not None:
+        course_id, bit = instance.course_id, instance.progress_bit
+        transaction.on_commit(lambda: progress.release_bit(course_id, bit))
+
+@receiver(post_save, sender=Comment)
+def comment_counted(sender, instance, created, raw=False, **kwargs):
+    _count_parent_change(Lecture, 'comment_count', instance, instance.lecture_id, created, raw)
+
+@receiver(post_delete, sender=Comment)
+def comment_uncounted(sender, instance, origin=None, **kwargs):
+    # Счётчик удаляемой вместе с комментариями лекции обновлять незачем
+    if _deleted_with(origin, Course, Lecture):
+        return
+    adjust(Lecture, instance.lecture_id, 'comment_count', -1, updated_at=timezone.now())
@@ -0,0 +1,17 @@
+'use strict';
+{
+    // Фильтр списка с автодополнением (courses/admin_tools.py): при выборе значения
+    // переходит на ту же страницу с параметром фильтра, сбрасывая номер страницы
+    const $ = django.jQuery;
+    $(document).on('change', 'select.autocomplete-filter', function() {
+        const url = new URL(window.location.href);
+        const parameter = this.dataset.filterParameter;
+        url.searchParams.delete('p');
+        if (this.value) {
+            url.searchParams.set(parameter, this.value);
+        } else {
+            url.searchParams.delete(parameter);
+        }
+        window.location.href = url.toString();
+    });
+}
@@ -1,3 +1,1263 @@
-from django.test import TestCase
+import base64
+import importlib
+import json
+import os
+import re
+import shutil
+import tempfile
+import time
+from datetime import timedelta
+from io import BytesIO, StringIO
+from smtplib import SMTPException
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+from django.apps import apps
+from django.contrib.auth import authenticate, get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.models import AnonymousUser
+from django.core import mail
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.mail.backends import locmem
+from django.core.management import CommandError, call_command
+from django.core.paginator import Paginator
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test import AsyncRequestFactory, Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from . import archive, auth, counters, images, instrumentation, leaderboard, outbox, progress, provisioning, search, transfer, urls
+from .cloning import clone_course
+from .grading import record_attempt
+from .management.commands.benchmark_views import percentile
+from .models import Comment, Course, CourseProgress, Lecture, OutgoingEmail, QuestionStats, Test
+from .pagination import CursorPaginator, InvalidCursor
+from .views import AsyncCourseDetailView
+
+User = get_user_model()
+
+# Количество запросов к каждому URL; первый выполняется с пустым кэшем
+REPEAT = int(os.environ.get('COURSES_BENCHMARK_REPEAT', 5))
+
+# Записанное число SQL-запросов для каждого сценария (максимум по всем повторам,
+# то есть с холодным кэшем). Тест падает, если число запросов стало больше.
+# После намеренного изменения обновите значение по отчёту, который печатает набор.
+QUERY_BASELINES = {
+    'course_list': 4,
+    'login': 0,
+    'logout': 3,
+    'register': 0,
+    'course_create': 1,
+    'course_detail': 4,
+    'course_detail_not_modified': 1,
+    'course_clone': 2,
+    'course_clone_post': 17,
+    'course_export': 7,
+    'course_leaderboard': 4,
+    'lecture_create': 1,
+    'lecture_create_post': 9,
+    'lecture_reorder': 8,
+    'lecture_detail': 5,
+    'lecture_detail_not_modified': 1,
+    'lecture_comment': 6,
+    'lecture_complete': 10,
+    'test_create': 2,
+    'test_create_post': 10,
+    'test_detail': 3,
+    'test_detail_post': 18,
+    'test_history': 3,
+    'test_list': 5,
+    'test_export': 3,
+    'test_export_json': 2,
+    'test_edit': 3,
+    'test_delete': 9,
+    'search': 2,
+    'cache_stats': 1,
+    'media': 0,
+}
+
+
+class ViewBenchmarkTests(TestCase):
+    """
+    Замеры страниц на синтетических данных (команда seed_benchmark).
+
+    Каждый URL из courses/urls.py запрашивается REPEAT раз через тестовый клиент.
+    Для каждого сценария печатаются p50/p95/p99 задержки и число SQL-запросов,
+    а тест падает, если запросов стало больше записанного в QUERY_BASELINES.
+    """
+    results = {}
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command(
+            'seed_benchmark', users=30, courses=8, lectures=10, tests=3, comments=2000, seed=1, stdout=StringIO(),
+        )
+        cls.user = User.objects.create_user('bench_staff', password='benchmark', is_staff=True)
+        cls.course = Course.objects.order_by('id').first()
+        # Самая комментируемая лекция - худший случай для страницы лекции
+        cls.lecture = Lecture.objects.annotate(comment_total=Count('comments')).order_by('-comment_total', 'id').first()
+        cls.test = cls.lecture.tests.order_by('id').first()
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.media_root = tempfile.mkdtemp()
+        with open(os.path.join(cls.media_root, 'lecture.mp4'), 'wb') as video:
+            video.write(os.urandom(256 * 1024))
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+        super().tearDownClass()
+        if cls.results:
+            print(f"\n{'сценарий':<28}{'p50, мс':>10}{'p95, мс':>10}{'p99, мс':>10}{'запросов':>10}{'базовое':>10}")
+            for name, (latencies, queries) in sorted(cls.results.items()):
+                print(
+                    f"{name:<28}{percentile(latencies, 50) * 1000:>10.2f}{percentile(latencies, 95) * 1000:>10.2f}"
+                    f"{percentile(latencies, 99) * 1000:>10.2f}{queries:>10}{QUERY_BASELINES.get(name, '-'):>10}"
+                )
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def measure(self, name, url, method='get', data=None, status=200, client=None, **extra):
+        """
+        Выполняет запрос REPEAT раз, сохраняет задержки и максимальное число SQL-запросов
+        и сравнивает его с записанным значением. url может быть функцией от номера повтора.
+        """
+        client = client or self.client
+        latencies = []
+        queries = 0
+        for run in range(REPEAT):
+            target = url(run) if callable(url) else url
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                response = getattr(client, method)(target, data, **extra)
+                if response.streaming:
+                    b''.join(response.streaming_content)
+                latencies.append(time.perf_counter() - started)
+            self.assertEqual(response.status_code, status, f"{name}: {target}")
+            queries = max(queries, len(captured))
+        self.results[name] = (latencies, queries)
+        self.assertLessEqual(
+            queries, QUERY_BASELINES[name],
+            f"{name}: {queries} SQL-запросов при записанных {QUERY_BASELINES[name]}",
+        )
+        return response
+
+    def test_all_urls_covered(self):
+        names = {pattern.name for pattern in urls.urlpatterns}
+        missing = {name for name in names if not hasattr(self, f'test_{name}')}
+        self.assertFalse(missing, f"Нет сценария для URL: {', '.join(sorted(missing))}")
+
+    def test_course_list(self):
+        self.measure('course_list', reverse('course_list'))
+
+    def test_login(self):
+        self.measure('login', reverse('login'), client=Client())
+
+    def test_logout(self):
+        client = Client()
+        client.force_login(self.user)
+        self.measure('logout', reverse('logout'), method='post', status=302, client=client)
+
+    def test_register(self):
+        self.measure('register', reverse('register'), client=Client())
+
+    def test_course_create(self):
+        self.measure('course_create', reverse('course_create'))
+
+    def test_course_detail(self):
+        url = reverse('course_detail', args=[self.course.slug])
+        response = self.measure('course_detail', url)
+        self.measure('course_detail_not_modified', url, status=304, HTTP_IF_NONE_MATCH=response['ETag'])
+
+    def test_course_clone(self):
+        url = reverse('course_clone', args=[self.course.slug])
+        self.measure('course_clone', url)
+        self.measure('course_clone_post', url, method='post', data={'title': 'Копия'}, status=302)
+
+    def test_course_export(self):
+        self.measure('course_export', reverse('course_export', args=[self.course.slug]))
+
+    def test_course_leaderboard(self):
+        self.measure('course_leaderboard', reverse('course_leaderboard', args=[self.course.slug]))
+
+    def test_lecture_create(self):
+        url = reverse('lecture_create', args=[self.course.slug])
+        self.measure('lecture_create', url)
+        self.measure('lecture_create_post', url, method='post', data={'title': 'Новая лекция'}, status=302)
+
+    def test_lecture_reorder(self):
+        lecture_ids = list(self.course.lectures.order_by('-order').values_list('id', flat=True))
+        self.measure(
+            'lecture_reorder', reverse('lecture_reorder', args=[self.course.slug]), method='post',
+            data=json.dumps({'lectures': lecture_ids}), content_type='application/json',
+        )
+
+    def test_lecture_detail(self):
+        url = reverse('lecture_detail', args=[self.lecture.id])
+        response = self.measure('lecture_detail', url)
+        self.measure('lecture_detail_not_modified', url, status=304, HTTP_IF_NONE_MATCH=response['ETag'])
+
+    def test_lecture_comment(self):
+        self.measure(
+            'lecture_comment', reverse('lecture_comment', args=[self.lecture.id]),
+            method='post', data={'text': 'Комментарий'}, status=302,
+        )
+
+    def test_lecture_complete(self):
+        self.measure('lecture_complete', reverse('lecture_complete', args=[self.lecture.id]), method='post', status=302)
+
+    def test_test_create(self):
+        url = reverse('test_create', args=[self.lecture.id])
+        self.measure('test_create', url)
+        self.measure(
+            'test_create_post', url, method='post', status=302,
+            data={'question': 'Вопрос?', 'correct_answer': 'да', 'choices': '["да", "нет"]'},
+        )
+
+    def test_test_list(self):
+        self.measure('test_list', reverse('test_list', args=[self.lecture.id]))
+
+    def test_test_export(self):
+        url = reverse('test_export', args=[self.lecture.id])
+        self.measure('test_export', url, data={'format': 'csv'})
+        self.measure('test_export_json', url, data={'format': 'json'})
+
+    def test_test_detail(self):
+        url = reverse('test_detail', args=[self.lecture.id])
+        self.measure('test_detail', url)
+        answers = {f'question_{test.id}': test.correct_answer for test in self.lecture.tests.all()}
+        self.measure('test_detail_post', url, method='post', data=answers)
+
+    def test_test_history(self):
+        self.measure('test_history', reverse('test_history', args=[self.lecture.id]))
+
+    def test_test_edit(self):
+        self.measure('test_edit', reverse('test_edit', args=[self.test.id]))
+
+    def test_test_delete(self):
+        # Каждый повтор удаляет отдельный тест
+        tests = [self.lecture.tests.create(question=f'Вопрос {run}?', correct_answer='да', choices=['да', 'нет']) for run in range(REPEAT)]
+        self.measure('test_delete', lambda run: reverse('test_delete', args=[tests[run].id]), method='post', status=302)
+
+    def test_search(self):
+        self.measure('search', reverse('search'), data={'q': 'python модель'})
+
+    def test_cache_stats(self):
+        self.measure('cache_stats', reverse('cache_stats'))
+
+    def test_media(self):
+        with override_settings(MEDIA_ROOT=self.media_root):
+            self.measure('media', reverse('media', args=['lecture.mp4']), client=Client(), HTTP_RANGE='bytes=0-65535', status=206)
+
+
+class PageCacheTests(TestCase):
+    """
+    Закэшированные страницы курсов сбрасываются после изменений (версии в cache.py).
+    """
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user('cache_author')
+        cls.course = Course.objects.create(title='Первый курс', slug='cache-first', description='Описание', author=author)
+        cls.other = Course.objects.create(title='Второй курс', slug='cache-second', description='Описание', author=author)
+        cls.lecture = Lecture.objects.create(course=cls.course, title='Переносимая лекция', order=1)
+
+    def setUp(self):
+        cache.clear()
+
+    def cached_get(self, url, queries=0):
+        self.client.get(url)
+        # Повторный запрос анонимного пользователя отдаётся из кэша; у страницы курса
+        # остаётся только чтение updated_at для ETag (см. conditional.py)
+        with self.assertNumQueries(queries):
+            return self.client.get(url)
+
+    def test_course_list_after_rename(self):
+        url = reverse('course_list')
+        self.assertContains(self.cached_get(url), 'Первый курс')
+        course = Course.objects.get(pk=self.course.pk)
+        course.title = 'Переименованный курс'
+        course.save()
+        response = self.client.get(url)
+        self.assertContains(response, 'Переименованный курс')
+        self.assertNotContains(response, 'Первый курс')
+
+    def test_lecture_move_invalidates_both_courses(self):
+        first, second = reverse('course_detail', args=[self.course.slug]), reverse('course_detail', args=[self.other.slug])
+        self.assertContains(self.cached_get(first, queries=1), 'Переносимая лекция')
+        self.assertNotContains(self.cached_get(second, queries=1), 'Переносимая лекция')
+        lecture = Lecture.objects.get(pk=self.lecture.pk)
+        lecture.course = self.other
+        lecture.save()
+        self.assertNotContains(self.client.get(first), 'Переносимая лекция')
+        self.assertContains(self.client.get(second), 'Переносимая лекция')
+
+
+class ImageRenditionTests(TestCase):
+    """
+    Уменьшенные копии изображений курса: генерация при смене файла и удаление старых файлов.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('image_author')
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        patcher = mock.patch.object(images, 'GENERATE_IN_BACKGROUND', False)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def upload(self, name, color):
+        buffer = BytesIO()
+        Image.new('RGB', (1200, 800), color).save(buffer, 'PNG')
+        return SimpleUploadedFile(name, buffer.getvalue())
+
+    def create_course(self, slug='image-course'):
+        with self.captureOnCommitCallbacks(execute=True):
+            course = Course.objects.create(title='Курс', slug=slug, description='Описание', author=self.author, image=self.upload('photo.png', 'red'))
+        return Course.objects.get(pk=course.pk)
+
+    def assertFilesExist(self, course, exist=True):
+        names = images.rendition_files(course.image_renditions)
+        self.assertTrue(names)
+        for name in names:
+            self.assertEqual(default_storage.exists(name), exist, name)
+
+    def test_generated_once_per_image(self):
+        course = self.create_course()
+        self.assertTrue(course.image_sources)
+        self.assertFilesExist(course)
+        with mock.patch.object(images, 'generate_for_course') as generate, self.captureOnCommitCallbacks(execute=True):
+            course.description = 'Новое описание'
+            course.save()
+        generate.assert_not_called()
+
+    def test_replaced_image_files_deleted(self):
+        course = self.create_course()
+        with self.captureOnCommitCallbacks(execute=True):
+            course.image = self.upload('other.png', 'blue')
+            course.save()
+        replaced = Course.objects.get(pk=course.pk)
+        self.assertEqual(replaced.image_renditions['source'], replaced.image.name)
+        self.assertFilesExist(replaced)
+        self.assertFilesExist(course, exist=False)
+
+    def test_deleted_course_files_deleted(self):
+        course = self.create_course()
+        with self.captureOnCommitCallbacks(execute=True):
+            Course.objects.get(pk=course.pk).delete()
+        self.assertFilesExist(course, exist=False)
+
+    def test_deleted_clone_keeps_shared_files(self):
+        course = self.create_course()
+        with self.captureOnCommitCallbacks(execute=True):
+            copy = clone_course(course)
+        with self.captureOnCommitCallbacks(execute=True):
+            Course.objects.get(pk=copy.pk).delete()
+        course.refresh_from_db()
+        self.assertTrue(course.image_sources)
+        self.assertFilesExist(course)
+
+
+class CloneCourseTests(TestCase):
+    """
+    Копирование курса: лекции, тесты и комментарии с новыми связями за постоянное число запросов.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('clone_author')
+        cls.course = cls.make_course('clone-source', lectures=2)
+
+    @classmethod
+    def make_course(cls, slug, lectures):
+        course = Course.objects.create(title='Исходный курс', slug=slug, description='Описание', author=cls.author)
+        for i in range(lectures):
+            lecture = Lecture.objects.create(course=course, title=f'Лекция {i}', order=i + 1, video_url=f'https://example.com/{i}')
+            for j in range(2):
+                Test.objects.create(lecture=lecture, question=f'Вопрос {i}.{j}?', correct_answer='да', choices=['да', 'нет'])
+            Comment.objects.create(lecture=lecture, author=cls.author, text=f'Комментарий {i}')
+        return course
+
+    def test_copies_lectures_and_tests(self):
+        copy = clone_course(self.course, include_comments=True)
+        self.assertNotEqual(copy.pk, self.course.pk)
+        self.assertEqual(copy.slug, 'clone-source-copy')
+        self.assertEqual(copy.image_renditions, {})
+
+        fields = ('title', 'video_url', 'order', 'progress_bit')
+        originals = list(self.course.lectures.order_by('order').values_list(*fields))
+        self.assertEqual(list(copy.lectures.order_by('order').values_list(*fields)), originals)
+        self.assertEqual(Course.objects.get(pk=copy.pk).lecture_count, len(originals))
+
+        for lecture in copy.lectures.all():
+            # Связи указывают на новые лекции, а не на лекции оригинала
+            source = self.course.lectures.get(order=lecture.order)
+            self.assertEqual(
+                list(lecture.tests.order_by('id').values_list('question', 'correct_answer', 'choices')),
+                list(source.tests.order_by('id').values_list('question', 'correct_answer', 'choices')),
+            )
+            self.assertEqual(list(lecture.comments.values_list('text', flat=True)), [f'Комментарий {lecture.order - 1}'])
+            self.assertEqual(lecture.comment_count, 1)
+        new_tests = Test.objects.filter(lecture__course=copy)
+        self.assertEqual(new_tests.count(), 4)
+        self.assertEqual(QuestionStats.objects.filter(test__in=new_tests).count(), 4)
+        self.assertEqual(Test.objects.filter(lecture__course=self.course).count(), 4)
+
+    def test_without_comments(self):
+        copy = clone_course(self.course)
+        self.assertFalse(Comment.objects.filter(lecture__course=copy).exists())
+
+    def test_query_count_does_not_grow(self):
+        larger = self.make_course('clone-larger', lectures=6)
+        with CaptureQueriesContext(connection) as small:
+            clone_course(self.course, include_comments=True)
+        with CaptureQueriesContext(connection) as large:
+            clone_course(larger, include_comments=True)
+        self.assertEqual(len(large), len(small))
+
+
+class SearchIndexTests(TestCase):
+    """
+    Полнотекстовый индекс обновляется вместе с объектами; миграция 0016 заполняет его для старых данных.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('search_author')
+        cls.course = Course.objects.create(title='Астрономия', slug='search-course', description='Звёзды и планеты', author=cls.author)
+        cls.lecture = Lecture.objects.create(course=cls.course, title='Телескопы', order=1)
+        cls.comment = Comment.objects.create(lecture=cls.lecture, author=cls.author, text='Рефрактор или рефлектор')
+        cls.test = Test.objects.create(lecture=cls.lecture, question='Что собирает свет?', correct_answer='линза', choices=['линза', 'зеркало'])
+
+    def found(self, query):
+        return sorted((result['kind'], result['object_id'], result['title']) for result in search.search(query))
+
+    def rows(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT rowid, kind, object_id, target, title, body, extra FROM {search.TABLE} ORDER BY rowid")
+            return cursor.fetchall()
+
+    def test_created_objects_indexed(self):
+        self.assertEqual(self.found('планеты'), [('course', self.course.pk, 'Астрономия')])
+        self.assertEqual(self.found('рефлектор'), [('comment', self.comment.pk, 'Телескопы')])
+        self.assertEqual(self.found('свет'), [('test', self.test.pk, 'Телескопы')])
+
+    def test_rename_updates_children(self):
+        course = Course.objects.get(pk=self.course.pk)
+        course.title = 'Космология'
+        course.save()
+        # Название курса хранится в записи лекции (столбец extra)
+        self.assertEqual(self.found('космология'), [('course', course.pk, 'Космология'), ('lecture', self.lecture.pk, 'Телескопы')])
+        self.assertEqual(self.found('астрономия'), [])
+
+        lecture = Lecture.objects.get(pk=self.lecture.pk)
+        lecture.title = 'Обсерватории'
+        lecture.save()
+        self.assertEqual(self.found('обсерватории'), [
+            ('comment', self.comment.pk, 'Обсерватории'), ('lecture', lecture.pk, 'Обсерватории'), ('test', self.test.pk, 'Обсерватории'),
+        ])
+        self.assertEqual(self.found('телескопы'), [])
+
+    def test_delete_removes_rows(self):
+        Comment.objects.get(pk=self.comment.pk).delete()
+        self.assertEqual(self.found('рефлектор'), [])
+        Lecture.objects.get(pk=self.lecture.pk).delete()
+        self.assertEqual([row[1] for row in self.rows()], ['course'])
+        Course.objects.get(pk=self.course.pk).delete()
+        self.assertEqual(self.rows(), [])
+
+    def test_migration_backfills_existing_objects(self):
+        migration = importlib.import_module('courses.migrations.0016_search_backfill')
+        expected = self.rows()
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {search.TABLE} WHERE kind != 'course'")
+        schema_editor = SimpleNamespace(connection=connection)
+        migration.backfill_search_table(apps, schema_editor)
+        self.assertEqual(self.rows(), expected)
+        # Повторное применение не создаёт дубликатов
+        migration.backfill_search_table(apps, schema_editor)
+        self.assertEqual(self.rows(), expected)
+
+
+class MediaServingTests(TestCase):
+    """
+    Отдача медиафайлов: диапазоны (Range, If-Range), 416 и условные запросы (304).
+    """
+    content = bytes(range(256)) * 4
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        with open(os.path.join(media_root, 'lecture.mp4'), 'wb') as video:
+            video.write(self.content)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.url = reverse('media', args=['lecture.mp4'])
+
+    def get(self, **headers):
+        response = self.client.get(self.url, **headers)
+        self.body = b''.join(response.streaming_content) if response.streaming else response.content
+        return response
+
+    def test_full_file(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.body, self.content)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(response['Content-Type'], 'video/mp4')
+
+    def test_ranges(self):
+        size = len(self.content)
+        for header, start, end in (('bytes=10-19', 10, 19), ('bytes=1000-', 1000, size - 1), ('bytes=-24', size - 24, size - 1), ('bytes=0-5000', 0, size - 1)):
+            with self.subTest(range=header):
+                response = self.get(HTTP_RANGE=header)
+                self.assertEqual(response.status_code, 206)
+                self.assertEqual(self.body, self.content[start:end + 1])
+                self.assertEqual(response['Content-Range'], f'bytes {start}-{end}/{size}')
+                self.assertEqual(response['Content-Length'], str(end - start + 1))
+
+    def test_ignored_range(self):
+        # Несколько диапазонов и другие единицы не поддерживаются: отдаётся весь файл
+        for header in ('bytes=0-1,5-6', 'items=0-1', 'bytes=-'):
+            with self.subTest(range=header):
+                response = self.get(HTTP_RANGE=header)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(self.body, self.content)
+
+    def test_unsatisfiable_range(self):
+        for header in ('bytes=1024-', 'bytes=-0', 'bytes=20-10'):
+            with self.subTest(range=header):
+                response = self.get(HTTP_RANGE=header)
+                self.assertEqual(response.status_code, 416)
+                self.assertEqual(response['Content-Range'], f'bytes */{len(self.content)}')
+
+    def test_if_range(self):
+        full = self.get()
+        response = self.get(HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE=full['ETag'])
+        self.assertEqual(response.status_code, 206)
+        response = self.get(HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE=full['Last-Modified'])
+        self.assertEqual(response.status_code, 206)
+        # Файл изменился: вместо диапазона отдаётся весь файл
+        for stale in ('"0-0"', 'Thu, 01 Jan 1970 00:00:00 GMT'):
+            with self.subTest(if_range=stale):
+                response = self.get(HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE=stale)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(self.body, self.content)
+
+    def test_not_modified(self):
+        full = self.get()
+        self.assertEqual(self.get(HTTP_IF_NONE_MATCH=full['ETag']).status_code, 304)
+        self.assertEqual(self.get(HTTP_IF_MODIFIED_SINCE=full['Last-Modified']).status_code, 304)
+        self.assertEqual(self.get(HTTP_IF_NONE_MATCH='"0-0"').status_code, 200)
+
+    def test_outside_media_root(self):
+        self.assertEqual(self.client.get(reverse('media', args=['../manage.py'])).status_code, 404)
+        self.assertEqual(self.client.get(reverse('media', args=['missing.mp4'])).status_code, 404)
+
+
+class CourseTransferTests(TestCase):
+    """
+    Выгрузка курса в JSON Lines и загрузка обратно (export_course, import_courses).
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('transfer_author')
+        cls.student = User.objects.create_user('transfer_student')
+        cls.course = Course.objects.create(title='Химия', slug='transfer-course', description='Описание', author=cls.author)
+        for i in range(2):
+            lecture = Lecture.objects.create(course=cls.course, title=f'Лекция {i}', order=i + 1, video_url=f'https://example.com/{i}')
+            Test.objects.create(lecture=lecture, question=f'Вопрос {i}?', correct_answer='да', choices=['да', 'нет'])
+            Comment.objects.create(lecture=lecture, author=cls.student, text=f'Старый комментарий {i}')
+            Comment.objects.create(lecture=lecture, author=cls.author, text=f'Комментарий {i}')
+        # Часть комментариев в архиве: они тоже выгружаются
+        Comment.objects.filter(text__startswith='Старый').update(created_at=timezone.now() - timedelta(days=archive.ARCHIVE_AFTER_DAYS + 1))
+        archive.archive_comments()
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        self.path = os.path.join(directory, 'courses.jsonl')
+
+    def export(self, *slugs):
+        call_command('export_course', *slugs, output=self.path, stdout=StringIO())
+        with open(self.path, encoding='utf-8') as source:
+            return list(transfer.read_records(source))
+
+    def load(self, **options):
+        call_command('import_courses', self.path, stdout=StringIO(), **options)
+
+    @staticmethod
+    def normalized(records):
+        # id записей нужны только для связей внутри файла: заменяем их номерами лекций.
+        # Лекции курса выгружаются раньше его тестов и комментариев.
+        numbers = {}
+        result = []
+        for record in records:
+            if record['model'] == 'lecture':
+                numbers[record['id']] = len(numbers)
+            record = {key: value for key, value in record.items() if key not in ('id', 'course')}
+            if 'lecture' in record:
+                record['lecture'] = numbers[record['lecture']]
+            result.append(record)
+        return result
+
+    def test_round_trip(self):
+        records = self.export('transfer-course')
+        self.assertEqual([record['model'] for record in records], ['course', 'lecture', 'lecture', 'test', 'test'] + ['comment'] * 4)
+        Course.objects.get(pk=self.course.pk).delete()
+        self.load()
+
+        course = Course.objects.get(slug='transfer-course')
+        self.assertEqual(course.author, self.author)
+        self.assertEqual(course.lecture_count, 2)
+        lectures = list(course.lectures.order_by('order'))
+        self.assertEqual([lecture.progress_bit for lecture in lectures], [0, 1])
+        self.assertEqual([lecture.comment_count for lecture in lectures], [2, 2])
+        self.assertEqual(self.normalized(self.export('transfer-course')), self.normalized(records))
+        self.assertEqual([result['kind'] for result in search.search('Химия')], ['course', 'lecture', 'lecture'])
+
+    def test_existing_slug(self):
+        self.export('transfer-course')
+        self.load()
+        self.assertTrue(Course.objects.filter(slug='transfer-course-2').exists())
+        self.load(skip_existing=True)
+        self.assertEqual(Course.objects.filter(slug__startswith='transfer-course').count(), 2)
+
+    def test_missing_author_created(self):
+        self.export('transfer-course')
+        User.objects.filter(username='transfer_student').delete()
+        self.load()
+        student = User.objects.get(username='transfer_student')
+        self.assertFalse(student.has_usable_password())
+        self.assertEqual(Comment.objects.filter(author=student).count(), 2)
+
+    def test_invalid_file(self):
+        with open(self.path, 'w', encoding='utf-8') as output:
+            output.write('{"model": "lecture", "id": 1}\n')
+        with self.assertRaises(CommandError):
+            self.load()
+        with self.assertRaises(CommandError):
+            call_command('export_course', 'no-such-course', output=self.path, stdout=StringIO())
+
+
+class CounterTests(TestCase):
+    """
+    Хранимые счётчики, которые ведут сигналы, совпадают с пересчётом recount().
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('counter_author')
+        cls.reader = User.objects.create_user('counter_reader')
+        cls.course = Course.objects.create(title='Курс', slug='counter-course', description='Описание', author=cls.author)
+        cls.other = Course.objects.create(title='Другой курс', slug='counter-other', description='Описание', author=cls.author)
+        cls.lectures = [Lecture.objects.create(course=cls.course, title=f'Лекция {i}', order=i) for i in range(3)]
+        for lecture in cls.lectures:
+            for author in (cls.author, cls.reader):
+                Comment.objects.create(lecture=lecture, author=author, text='Комментарий')
+
+    def assertCounters(self, lecture_counts, comment_counts):
+        self.assertEqual(
+            [Course.objects.get(pk=course.pk).lecture_count for course in (self.course, self.other)], lecture_counts,
+        )
+        self.assertEqual(dict(Lecture.objects.values_list('id', 'comment_count')), comment_counts)
+        # Пересчёт не находит расхождений
+        self.assertEqual(counters.recount(), (0, 0))
+
+    def test_signals_match_recount(self):
+        first, second, third = [lecture.pk for lecture in self.lectures]
+        self.assertCounters([3, 0], {first: 2, second: 2, third: 2})
+
+        comment = Comment.objects.filter(lecture_id=first).first()
+        comment.lecture_id = second
+        comment.save()
+        self.assertCounters([3, 0], {first: 1, second: 3, third: 2})
+
+        lecture = Lecture.objects.get(pk=third)
+        lecture.course = self.other
+        lecture.save()
+        self.assertCounters([2, 1], {first: 1, second: 3, third: 2})
+
+        Comment.objects.filter(lecture_id=second).first().delete()
+        Lecture.objects.get(pk=first).delete()
+        self.assertCounters([1, 1], {second: 2, third: 2})
+
+        # Архивные комментарии остаются в счётчике, удаление автора убирает и их
+        Comment.objects.update(created_at=timezone.now() - timedelta(days=archive.ARCHIVE_AFTER_DAYS + 1))
+        archive.archive_comments()
+        self.assertCounters([1, 1], {second: 2, third: 2})
+        User.objects.get(pk=self.reader.pk).delete()
+        self.assertCounters([1, 1], {second: 1, third: 1})
+
+    def test_recount_fixes_bulk_changes(self):
+        lecture = self.lectures[0]
+        # bulk_create не отправляет сигналы: счётчик расходится до recount()
+        Comment.objects.bulk_create([Comment(lecture=lecture, author=self.author, text='Массовый') for _ in range(5)])
+        self.assertEqual(Lecture.objects.get(pk=lecture.pk).comment_count, 2)
+        self.assertEqual(counters.recount(), (0, 1))
+        self.assertEqual(Lecture.objects.get(pk=lecture.pk).comment_count, 7)
+        self.assertEqual(counters.recount(), (0, 0))
+
+    def test_course_delete(self):
+        Course.objects.get(pk=self.course.pk).delete()
+        self.assertFalse(Lecture.objects.exists())
+        self.assertEqual(Course.objects.get(pk=self.other.pk).lecture_count, 0)
+
+
+class ConditionalGetTests(TestCase):
+    """
+    ETag страниц курса и лекции: 304 без изменений и новый ETag после правки.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('etag_author')
+        cls.course = Course.objects.create(title='Курс', slug='etag-course', description='Описание', author=cls.author)
+        cls.lecture = Lecture.objects.create(course=cls.course, title='Лекция', order=1)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.author)
+
+    def assertChangedAfter(self, url, change):
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        change()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+    def test_course_edit(self):
+        def edit():
+            course = Course.objects.get(pk=self.course.pk)
+            course.description = 'Новое описание'
+            course.save()
+        self.assertChangedAfter(reverse('course_detail', args=[self.course.slug]), edit)
+
+    def test_lecture_added_to_course(self):
+        self.assertChangedAfter(
+            reverse('course_detail', args=[self.course.slug]),
+            lambda: Lecture.objects.create(course=self.course, title='Вторая лекция', order=2),
+        )
+
+    def test_lecture_comment(self):
+        url = reverse('lecture_detail', args=[self.lecture.id])
+        self.assertChangedAfter(url, lambda: self.client.post(reverse('lecture_comment', args=[self.lecture.id]), {'text': 'Комментарий'}))
+
+    def test_lecture_test_edit(self):
+        self.assertChangedAfter(
+            reverse('lecture_detail', args=[self.lecture.id]),
+            lambda: Test.objects.create(lecture=self.lecture, question='Вопрос?', correct_answer='да', choices=['да', 'нет']),
+        )
+
+    def test_lecture_complete(self):
+        url = reverse('lecture_detail', args=[self.lecture.id])
+        self.assertChangedAfter(url, lambda: self.client.post(reverse('lecture_complete', args=[self.lecture.id])))
+        self.assertContains(self.client.get(url), 'Лекция пройдена')
+
+    def test_etag_depends_on_user(self):
+        url = reverse('course_detail', args=[self.course.slug])
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(Client().get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class CachedUserTests(TestCase):
+    """
+    Пользователь сессии берётся из кэша и удаляется из него при сохранении (auth.py).
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('cached_user', password='старый-пароль')
+
+    def setUp(self):
+        cache.clear()
+        auth.forget_user(self.user.pk)
+        self.client.force_login(self.user)
+
+    def request_user(self):
+        return self.client.get(reverse('course_list')).wsgi_request.user
+
+    def user_queries(self):
+        with CaptureQueriesContext(connection) as captured:
+            self.request_user()
+        return [query['sql'] for query in captured if '"auth_user"' in query['sql']]
+
+    def test_user_cached(self):
+        self.assertTrue(self.user_queries())
+        self.assertEqual(self.user_queries(), [])
+
+    def test_save_invalidates(self):
+        self.request_user()
+        user = User.objects.get(pk=self.user.pk)
+        user.first_name = 'Новое имя'
+        user.save()
+        self.assertEqual(self.request_user().first_name, 'Новое имя')
+
+    def test_deactivated_user_logged_out(self):
+        self.request_user()
+        user = User.objects.get(pk=self.user.pk)
+        user.is_active = False
+        user.save()
+        self.assertFalse(self.request_user().is_authenticated)
+
+    def test_password_change_ends_sessions(self):
+        self.request_user()
+        user = User.objects.get(pk=self.user.pk)
+        user.set_password('новый-пароль')
+        user.save()
+        self.assertFalse(self.request_user().is_authenticated)
+
+    def test_session_from_model_backend(self):
+        # Сессии, созданные до перехода на CachedModelBackend, остаются действительными
+        client = Client()
+        client.force_login(self.user, backend='django.contrib.auth.backends.ModelBackend')
+        self.assertTrue(client.get(reverse('course_list')).wsgi_request.user.is_authenticated)
+
+    def test_wrong_password_checked_once(self):
+        with mock.patch.object(ModelBackend, 'authenticate', autospec=True, side_effect=ModelBackend.authenticate) as backend:
+            self.assertIsNone(authenticate(username='cached_user', password='неверный'))
+        self.assertEqual(backend.call_count, 1)
+        self.assertEqual(authenticate(username='cached_user', password='старый-пароль'), self.user)
+
+
+class ProvisionUsersTests(TestCase):
+    """
+    Массовое создание пользователей из CSV (provision_users).
+    """
+    rows = (
+        'username,email,password,first_name,last_name\n'
+        'anna,anna@example.com,Ko4-zhuravl-58,Анна,Петрова\n'
+        'boris,,,Борис,\n'
+        '\n'
+        'anna,anna2@example.com,Ko4-zhuravl-58,,\n'
+        'existing,existing@example.com,Ko4-zhuravl-58,,\n'
+        'vera,vera@example.com,123,,\n'
+        'bad name!,,,,\n'
+        'gleb,gleb@example.com,Ko4-zhuravl-58,,\n'
+    )
+
+    @classmethod
+    def setUpTestData(cls):
+        User.objects.create_user('existing')
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        self.path = os.path.join(directory, 'cohort.csv')
+
+    def provision(self, rows, **options):
+        with open(self.path, 'w', encoding='utf-8') as output:
+            output.write(rows)
+        stdout, stderr = StringIO(), StringIO()
+        call_command('provision_users', self.path, stdout=stdout, stderr=stderr, **options)
+        return stdout.getvalue(), stderr.getvalue()
+
+    def test_creates_users(self):
+        stdout, stderr = self.provision(self.rows, batch_size=2, workers=1)
+        self.assertIn('Создано пользователей: 3, уже существовали: 1, с ошибками: 3.', stdout)
+        self.assertEqual([line.split(':')[0] for line in stderr.splitlines()], ['Строка 5', 'Строка 7', 'Строка 8'])
+
+        anna = User.objects.get(username='anna')
+        self.assertEqual((anna.email, anna.first_name, anna.last_name), ('anna@example.com', 'Анна', 'Петрова'))
+        self.assertTrue(anna.check_password('Ko4-zhuravl-58'))
+        self.assertFalse(User.objects.get(username='boris').has_usable_password())
+        self.assertFalse(User.objects.filter(username__in=['vera', 'bad name!']).exists())
+
+        # Письма только ставятся в очередь и только пользователям с адресом
+        self.assertEqual(
+            sorted(OutgoingEmail.objects.values_list('to', flat=True)), [['anna@example.com'], ['gleb@example.com']],
+        )
+        self.assertEqual(set(OutgoingEmail.objects.values_list('subject', flat=True)), {provisioning.WELCOME_SUBJECT})
+
+    def test_rerun_skips_existing(self):
+        self.provision(self.rows, workers=1)
+        stdout, _ = self.provision(self.rows, workers=1)
+        self.assertIn('Создано пользователей: 0, уже существовали: 4', stdout)
+        self.assertEqual(OutgoingEmail.objects.count(), 2)
+
+    def test_without_validation(self):
+        self.provision(self.rows, workers=1, no_validate=True)
+        self.assertTrue(User.objects.get(username='vera').check_password('123'))
+
+    def test_process_pool(self):
+        rows = 'username,password\n' + ''.join(f'student{i},Ko4-zhuravl-{i}\n' for i in range(4))
+        self.provision(rows, workers=2)
+        for i in range(4):
+            self.assertTrue(User.objects.get(username=f'student{i}').check_password(f'Ko4-zhuravl-{i}'))
+
+    def test_missing_username_column(self):
+        with self.assertRaises(CommandError):
+            self.provision('email,password\na@example.com,secret\n', workers=1)
+
+
+class RequestTimingTests(TestCase):
+    """
+    RequestTimingMiddleware: заголовок Server-Timing и запись медленных запросов в лог.
+    """
+    def setUp(self):
+        cache.clear()
+
+    def configure(self, sample_rate, slow_ms):
+        for name, value in (('SAMPLE_RATE', sample_rate), ('SLOW_MS', slow_ms), ('SEND_HEADER', True)):
+            patcher = mock.patch.object(instrumentation, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def metrics(self, response):
+        # Описание метрики sql само содержит запятую, поэтому делим только перед именем метрики
+        return dict(metric.split(';', 1) for metric in re.split(r', (?=\w+;)', response['Server-Timing']))
+
+    def test_header_without_sampling(self):
+        self.configure(sample_rate=0, slow_ms=10 ** 6)
+        metrics = self.metrics(self.client.get(reverse('course_list')))
+        self.assertEqual(set(metrics), {'total'})
+        self.assertRegex(metrics['total'], r'^dur=\d+\.\d$')
+
+    def test_header_with_sampling(self):
+        self.configure(sample_rate=1, slow_ms=10 ** 6)
+        with CaptureQueriesContext(connection) as queries:
+            metrics = self.metrics(self.client.get(reverse('course_list')))
+        self.assertEqual(set(metrics), {'sql', 'tpl', 'total'})
+        self.assertRegex(metrics['sql'], r'^dur=\d+\.\d;desc="\d+ queries, \d+ duplicates"$')
+        self.assertIn(f'"{len(queries)} queries,', metrics['sql'])
+        self.assertRegex(metrics['tpl'], r'^dur=\d+\.\d$')
+
+    def test_fast_request_not_logged(self):
+        self.configure(sample_rate=1, slow_ms=10 ** 6)
+        with self.assertNoLogs('courses.timing'):
+            self.client.get(reverse('course_list'))
+
+    def test_slow_request_logged(self):
+        # Порог меньше любого реального времени ответа: запрос считается медленным
+        self.configure(sample_rate=0, slow_ms=0.001)
+        with self.assertLogs('courses.timing', 'WARNING') as logs:
+            self.client.get(reverse('course_list'))
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(logs.records[0].levelname, 'WARNING')
+        self.assertEqual((record['method'], record['path'], record['view'], record['status']), ('GET', '/', 'course_list', 200))
+        self.assertFalse(record['sampled'])
+        self.assertNotIn('queries', record)
+
+    def test_zero_threshold_logs_sampled_requests(self):
+        self.configure(sample_rate=1, slow_ms=0)
+        with self.assertLogs('courses.timing', 'INFO') as logs:
+            self.client.get(reverse('course_list'))
+        record = logs.records[0].timing
+        self.assertEqual(logs.records[0].levelname, 'INFO')
+        self.assertTrue(record['sampled'])
+        self.assertIn('queries', record)
+        self.assertIn('duplicates', record)
+
+    def test_zero_threshold_skips_unsampled_requests(self):
+        self.configure(sample_rate=0, slow_ms=0)
+        with self.assertNoLogs('courses.timing'):
+            self.client.get(reverse('course_list'))
+
+class CursorPaginationTests(TestCase):
+    """
+    Курсорная пагинация: переходы вперёд и назад и повреждённые курсоры.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user('cursor_author')
+        course = Course.objects.create(title='Курс', slug='cursor-course', description='Описание', author=author)
+        cls.lecture = Lecture.objects.create(course=course, title='Лекция', order=1)
+        Comment.objects.bulk_create([Comment(lecture=cls.lecture, author=author, text=f'Комментарий {i}') for i in range(7)])
+        # Одинаковое время у всех: порядок задаёт только id
+        Comment.objects.update(created_at=timezone.now())
+        cls.expected = list(Comment.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+
+    def paginator(self):
+        return CursorPaginator(Comment.objects.filter(lecture=self.lecture), 3)
+
+    def test_next_and_previous_round_trip(self):
+        paginator = self.paginator()
+        pages = [paginator.page()]
+        while pages[-1].has_next():
+            pages.append(paginator.page(pages[-1].next_cursor))
+        self.assertEqual([len(page) for page in pages], [3, 3, 1])
+        self.assertEqual([comment.id for page in pages for comment in page], self.expected)
+        self.assertFalse(pages[0].has_previous())
+
+        previous = [pages[-1]]
+        while previous[-1].has_previous():
+            previous.append(paginator.page(previous[-1].previous_cursor))
+        self.assertEqual(
+            [[comment.id for comment in page] for page in previous[::-1]],
+            [[comment.id for comment in page] for page in pages],
+        )
+
+    def test_tampered_cursor(self):
+        paginator = self.paginator()
+        cursor = paginator.page().next_cursor
+
+        def encode(payload):
+            return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+        for tampered in ('не-курсор', cursor[:-2], encode({'v': [1]}), encode({'v': ['вчера', 1]}), encode({'r': True})):
+            with self.subTest(cursor=tampered):
+                with self.assertRaises(InvalidCursor):
+                    paginator.page(tampered)
+                self.assertEqual([comment.id for comment in paginator.get_page(tampered)], self.expected[:3])
+
+
+class LeaderboardTests(TestCase):
+    """
+    Рейтинг курса: места при равных очках и согласованность с rebuild().
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [User.objects.create_user(f'player{i}') for i in range(3)]
+        cls.course = Course.objects.create(title='Курс', slug='leaderboard-course', description='Описание', author=cls.users[0])
+        cls.lectures = [Lecture.objects.create(course=cls.course, title=f'Лекция {i}', order=i) for i in range(2)]
+
+    def places(self):
+        return [(place, entry.user.username, entry.score) for place, entry in leaderboard.top(self.course)]
+
+    def test_tied_scores_share_place(self):
+        first, second, third = self.users
+        record_attempt(self.lectures[0].id, first, 3, [])
+        record_attempt(self.lectures[0].id, second, 3, [])
+        record_attempt(self.lectures[0].id, third, 1, [])
+        self.assertEqual(self.places(), [(1, 'player0', 3), (1, 'player1', 3), (3, 'player2', 1)])
+        self.assertEqual(leaderboard.rank(self.course, second), (1, 3, 3))
+        self.assertEqual(leaderboard.rank(self.course, third), (3, 1, 3))
+        self.assertEqual(leaderboard.top(self.course, limit=2)[-1][0], 1)
+
+        # Повтор без улучшения не меняет очки, улучшение засчитывается разницей
+        record_attempt(self.lectures[0].id, first, 2, [])
+        record_attempt(self.lectures[0].id, third, 3, [])
+        self.assertEqual([place for place, _, _ in self.places()], [1, 1, 1])
+        record_attempt(self.lectures[1].id, third, 2, [])
+        self.assertEqual(leaderboard.rank(self.course, third), (1, 5, 3))
+        self.assertEqual(leaderboard.rank(self.course, first), (2, 3, 3))
+
+        places = self.places()
+        leaderboard.rebuild()
+        self.assertEqual(self.places(), places)
+        self.assertEqual(leaderboard.rank(self.course, first), (2, 3, 3))
+
+    def test_user_outside_leaderboard(self):
+        self.assertIsNone(leaderboard.rank(self.course, self.users[0]))
+        self.assertEqual(leaderboard.top(self.course), [])
+
+
+class ProgressBitTests(TestCase):
+    """
+    Биты прохождения лекций: выдача и освобождение при удалении и переносе лекции.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('student')
+        author = User.objects.create_user('progress_author')
+        cls.course = Course.objects.create(title='Курс', slug='progress-course', description='Описание', author=author)
+        cls.other = Course.objects.create(title='Другой курс', slug='progress-other', description='Описание', author=author)
+        cls.lectures = [Lecture.objects.create(course=cls.course, title=f'Лекция {i}', order=i) for i in range(3)]
+
+    def completed_count(self, course):
+        return CourseProgress.objects.get(user=self.user, course=course).completed_count
+
+    def test_bits_allocated_per_course(self):
+        self.assertEqual([lecture.progress_bit for lecture in self.lectures], [0, 1, 2])
+        self.assertEqual(Lecture.objects.create(course=self.other, title='Первая', order=0).progress_bit, 0)
+
+    def test_bits_allocated_in_transaction(self):
+        with transaction.atomic():
+            lectures = [Lecture.objects.create(course=self.course, title=f'Новая {i}', order=10 + i) for i in range(3)]
+        self.assertEqual([lecture.progress_bit for lecture in lectures], [3, 4, 5])
+        self.assertEqual(Lecture.objects.get(pk=lectures[0].pk).progress_bit, 3)
+
+    def test_mark_complete(self):
+        self.assertTrue(progress.mark_complete(self.user, self.lectures[1]))
+        self.assertFalse(progress.mark_complete(self.user, self.lectures[1]))
+        self.assertTrue(progress.is_complete(self.user, self.lectures[1]))
+        self.assertFalse(progress.is_complete(self.user, self.lectures[0]))
+        self.assertFalse(progress.is_complete(AnonymousUser(), self.lectures[1]))
+        self.assertEqual(self.completed_count(self.course), 1)
+
+    def test_delete_releases_bit(self):
+        for lecture in self.lectures:
+            progress.mark_complete(self.user, lecture)
+        with self.captureOnCommitCallbacks() as callbacks:
+            Lecture.objects.get(pk=self.lectures[2].pk).delete()
+        # Прогресс обходится только после фиксации транзакции удаления
+        self.assertEqual(self.completed_count(self.course), 3)
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.completed_count(self.course), 2)
+        # Освобождённый бит достаётся новой лекции и не засчитывается заранее
+        lecture = Lecture.objects.create(course=self.course, title='Новая', order=3)
+        self.assertEqual(lecture.progress_bit, 2)
+        self.assertFalse(progress.is_complete(self.user, lecture))
+
+    def test_move_releases_bit(self):
+        for lecture in self.lectures[:2]:
+            progress.mark_complete(self.user, lecture)
+        Lecture.objects.create(course=self.other, title='Первая', order=0)
+        lecture = Lecture.objects.get(pk=self.lectures[1].pk)
+        lecture.course = self.other
+        with self.captureOnCommitCallbacks(execute=True):
+            lecture.save()
+        self.assertEqual(lecture.progress_bit, 1)
+        self.assertEqual(self.completed_count(self.course), 1)
+        self.assertFalse(progress.is_complete(self.user, lecture))
+        self.assertFalse(progress.is_set(bytes(CourseProgress.objects.get(user=self.user, course=self.course).completed), 1))
+
+
+class ArchivePaginationTests(TestCase):
+    """
+    Комментарии лекции листаются дальше в архив обоими пагинаторами.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user('archive_author')
+        course = Course.objects.create(title='Курс', slug='archive-course', description='Описание', author=author)
+        cls.lecture = Lecture.objects.create(course=course, title='Лекция', order=1)
+        comments = [Comment.objects.create(lecture=cls.lecture, author=author, text=f'Комментарий {i}') for i in range(10)]
+        now = timezone.now()
+        # Шесть старых комментариев уйдут в архив двумя блоками, четыре останутся в Comment
+        for age, comment in zip(range(10, 0, -1), comments):
+            days = archive.ARCHIVE_AFTER_DAYS + age if age > 4 else age
+            Comment.objects.filter(pk=comment.pk).update(created_at=now - timedelta(days=days))
+        cls.expected = list(Comment.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+        archive.archive_comments(batch_size=4)
+
+    def setUp(self):
+        self.lecture.refresh_from_db()
+        self.comments = self.lecture.comments.select_related('author')
+
+    def test_archived(self):
+        self.assertEqual(Comment.objects.filter(lecture=self.lecture).count(), 4)
+        self.assertEqual(archive.archived_count(self.lecture.pk), 6)
+        self.assertEqual(self.lecture.comment_count, 10)
+
+    def test_cursor_paginator(self):
+        paginator = archive.ArchiveCursorPaginator(self.lecture, self.comments, 3)
+        pages = [paginator.page()]
+        while pages[-1].has_next():
+            pages.append(paginator.page(pages[-1].next_cursor))
+        self.assertEqual([comment.id for page in pages for comment in page], self.expected)
+        # Вторая страница начинается в Comment и продолжается архивом
+        self.assertEqual([getattr(comment, 'archived', False) for comment in pages[1]], [False, True, True])
+
+        previous = [pages[-1]]
+        while previous[-1].has_previous():
+            previous.append(paginator.page(previous[-1].previous_cursor))
+        self.assertEqual([comment.id for page in previous[::-1] for comment in page], self.expected)
+
+    def test_page_paginator(self):
+        paginator = Paginator(archive.ArchivedCommentList(self.lecture, self.comments), 3)
+        self.assertEqual(paginator.num_pages, 4)
+        ids = [comment.id for number in paginator.page_range for comment in paginator.page(number)]
+        self.assertEqual(ids, self.expected)
+
+
+@override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend')
+class OutboxTests(TestCase):
+    """
+    Очередь писем: аренда, повторы с нарастающей задержкой и отказ после MAX_ATTEMPTS.
+    """
+    def setUp(self):
+        self.message = outbox.enqueue('Тема', 'Текст', ['student@example.com'])
+
+    def failing(self):
+        return mock.patch.object(locmem.EmailBackend, 'send_messages', side_effect=SMTPException('сервер недоступен'))
+
+    def make_due(self):
+        OutgoingEmail.objects.update(next_attempt_at=timezone.now())
+
+    def test_drain_sends(self):
+        self.assertEqual(outbox.drain(), (1, 0))
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['student@example.com'])
+        self.message.refresh_from_db()
+        self.assertEqual(self.message.status, OutgoingEmail.SENT)
+        self.assertEqual(outbox.drain(), (0, 0))
+
+    def test_claim_leases_messages(self):
+        self.assertEqual([message.pk for message in outbox.claim()], [self.message.pk])
+        self.assertEqual(outbox.claim(), [])
+        self.message.refresh_from_db()
+        lease = timezone.now() + timedelta(seconds=outbox.LEASE_SECONDS)
+        self.assertAlmostEqual(self.message.next_attempt_at, lease, delta=timedelta(seconds=5))
+        self.assertEqual(outbox.drain(), (0, 0))
+        self.assertEqual(mail.outbox, [])
+
+    def test_retry_with_backoff(self):
+        for attempt in (1, 2):
+            self.make_due()
+            with self.failing(), self.assertLogs(outbox.logger, 'WARNING'):
+                self.assertEqual(outbox.drain(), (0, 1))
+            self.message.refresh_from_db()
+            self.assertEqual(self.message.attempts, attempt)
+            self.assertEqual(self.message.status, OutgoingEmail.PENDING)
+            self.assertEqual(self.message.last_error, 'сервер недоступен')
+            expected = timezone.now() + outbox.backoff(attempt)
+            self.assertAlmostEqual(self.message.next_attempt_at, expected, delta=timedelta(seconds=5))
+            # До истечения задержки письмо не выбирается
+            self.assertEqual(outbox.drain(), (0, 0))
+        self.assertLess(outbox.backoff(1), outbox.backoff(2))
+
+        self.make_due()
+        self.assertEqual(outbox.drain(), (1, 0))
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_gives_up_after_max_attempts(self):
+        for _ in range(2):
+            self.make_due()
+            with self.failing(), self.assertLogs(outbox.logger, 'WARNING'):
+                outbox.drain(max_attempts=2)
+        self.message.refresh_from_db()
+        self.assertEqual(self.message.status, OutgoingEmail.FAILED)
+        self.make_due()
+        self.assertEqual(outbox.drain(), (0, 0))
+
+
+class AsyncCourseDetailTests(TestCase):
+    """
+    Ссылки автора на странице курса в асинхронном представлении (COURSES_ASYNC_VIEWS).
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('async_author')
+        cls.staff = User.objects.create_user('async_staff', is_staff=True)
+        cls.other = User.objects.create_user('async_other')
+        cls.course = Course.objects.create(title='Курс', slug='async-course', description='Описание', author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+
+    async def get(self, user):
+        request = AsyncRequestFactory().get(reverse('course_detail', args=[self.course.slug]))
+        request.user = user
+
+        async def auser():
+            return user
+
+        request.auser = auser
+        return await AsyncCourseDetailView.as_view()(request, slug=self.course.slug)
+
+    async def test_author_and_staff_see_links(self):
+        for user in (self.author, self.staff):
+            with self.subTest(user=user.username):
+                response = await self.get(user)
+                self.assertContains(response, reverse('course_clone', args=[self.course.slug]))
+                self.assertContains(response, reverse('course_export', args=[self.course.slug]))
+
+    async def test_others_do_not_see_links(self):
+        for user in (self.other, AnonymousUser()):
+            with self.subTest(user=str(user)):
+                response = await self.get(user)
+                self.assertNotContains(response, reverse('course_clone', args=[self.course.slug]))
+                self.assertNotContains(response, reverse('course_export', args=[self.course.slug]))
@@ -0,0 +1,267 @@
+import csv
+import json
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+from . import archive, search
+from .cache import bump_version
+from .cloning import fill_pks, unique_slug
+from .counters import recount
+from .models import Comment, Course, Lecture, Test
+from .quiz_stats import create_question_rows
+
+User = get_user_model()
+
+# Обмен курсами в формате JSON Lines: одна запись на строку, сначала курс,
+# затем его лекции, тесты и комментарии. Авторы передаются по username,
+# id записей - только для связей внутри файла. Даты создания назначаются заново.
+BATCH_SIZE = 1000
+
+
+def export_records(courses, include_comments=True, chunk_size=BATCH_SIZE):
+    """
+    Генератор записей для выгрузки курсов. Данные читаются кусками через
+    iterator(), поэтому потребление памяти не зависит от размера курсов.
+    """
+    for course in courses.select_related('author').order_by('id').iterator(chunk_size=chunk_size):
+        yield {
+            'model': 'course', 'id': course.id, 'title': course.title, 'slug': course.slug,
+            'description': course.description, 'author': course.author.username,
+            'image': course.image.name if course.image else '',
+        }
+        lectures = Lecture.objects.filter(course=course).order_by('order', 'id')
+        for row in lectures.values('id', 'title', 'video_url', 'order').iterator(chunk_size=chunk_size):
+            yield {'model': 'lecture', 'course': course.id, **row}
+        tests = Test.objects.filter(lecture__course=course).order_by('id')
+        for row in tests.values('id', 'lecture_id', 'question', 'correct_answer', 'choices').iterator(chunk_size=chunk_size):
+            yield {'model': 'test', 'id': row['id'], 'lecture': row['lecture_id'], 'question': row['question'],
+                   'correct_answer': row['correct_answer'], 'choices': row['choices']}
+        if include_comments:
+            # Архивные комментарии старше оставшихся в Comment, поэтому идут первыми
+            for comment in archive.course_comments(course):
+                yield {'model': 'comment', 'id': comment.id, 'lecture': comment.lecture_id,
+                       'author': comment.author.username, 'text': comment.text}
+            comments = Comment.objects.filter(lecture__course=course).order_by('created_at', 'id')
+            for row in comments.values('id', 'lecture_id', 'author__username', 'text').iterator(chunk_size=chunk_size):
+                yield {'model': 'comment', 'id': row['id'], 'lecture': row['lecture_id'],
+                       'author': row['author__username'], 'text': row['text']}
+
+
+def export_lines(courses, include_comments=True, chunk_size=BATCH_SIZE):
+    """
+    Генератор строк JSON Lines для записи в файл или StreamingHttpResponse.
+    """
+    for record in export_records(courses, include_comments, chunk_size):
+        yield json.dumps(record, ensure_ascii=False, cls=DjangoJSONEncoder) + '\n'
+
+
+def read_records(lines):
+    """
+    Генератор записей из строк JSON Lines. Пустые строки пропускаются.
+    """
+    for number, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as exc:
+            raise ValueError(f"Строка {number}: некорректный JSON ({exc})")
+        if not isinstance(record, dict) or record.get('model') not in ('course', 'lecture', 'test', 'comment'):
+            raise ValueError(f"Строка {number}: неизвестная запись")
+        yield record
+
+
+class Importer:
+    """
+    Загружает записи, накапливая их пачками по batch_size и сохраняя через bulk_create.
+
+    В памяти хранятся только текущие пачки и соответствие id лекций текущего курса,
+    поэтому потребление памяти не растёт с объёмом файла.
+    """
+    def __init__(self, batch_size=BATCH_SIZE, skip_existing=False):
+        self.batch_size = batch_size
+        self.skip_existing = skip_existing
+        self.counts = {'course': 0, 'lecture': 0, 'test': 0, 'comment': 0, 'skipped': 0}
+        self.users = {}
+        self.course = None
+        self.skipping = False
+        self.lecture_map = {}
+        self.pending_lectures = []
+        self.pending_tests = []
+        self.pending_comments = []
+
+    def run(self, records):
+        with transaction.atomic():
+            for record in records:
+                self.add(record)
+            self.flush()
+        if self.counts['course']:
+            bump_version('courses')
+        return self.counts
+
+    def add(self, record):
+        model = record['model']
+        if model == 'course':
+            self.flush()
+            self.start_course(record)
+            return
+        if self.course is None and not self.skipping:
+            raise ValueError(f"Запись {model} {record.get('id')} встречена до записи курса")
+        if self.skipping:
+            return
+        if model == 'lecture':
+            self.pending_lectures.append((record['id'], Lecture(
+                course=self.course, title=record['title'], video_url=record.get('video_url'), order=record.get('order'),
+                # Биты прогресса нумеруются заново в порядке записей курса
+                progress_bit=len(self.lecture_map) + len(self.pending_lectures),
+            )))
+            if len(self.pending_lectures) >= self.batch_size:
+                self.flush_lectures()
+        elif model == 'test':
+            self.pending_tests.append((record['lecture'], Test(
+                question=record['question'], correct_answer=record['correct_answer'], choices=record['choices'],
+            )))
+            if len(self.pending_tests) >= self.batch_size:
+                self.flush_tests()
+        else:
+            self.pending_comments.append((record['lecture'], record['author'], Comment(text=record['text'])))
+            if len(self.pending_comments) >= self.batch_size:
+                self.flush_comments()
+
+    def get_users(self, usernames):
+        """
+        Возвращает пользователей по username; отсутствующие создаются без пароля.
+        """
+        missing = set(usernames) - set(self.users)
+        if missing:
+            found = {user.username: user for user in User.objects.filter(username__in=missing)}
+            new = missing - set(found)
+            if new:
+                User.objects.bulk_create([User(username=username, password=make_password(None)) for username in new])
+                found.update({user.username: user for user in User.objects.filter(username__in=new)})
+            self.users.update(found)
+        return self.users
+
+    def start_course(self, record):
+        self.lecture_map = {}
+        self.skipping = False
+        slug = record['slug']
+        if Course.objects.filter(slug=slug).exists():
+            if self.skip_existing:
+                self.course, self.skipping = None, True
+                self.counts['skipped'] += 1
+                return
+            slug = unique_slug(slug)
+        author = self.get_users([record['author']])[record['author']]
+        # bulk_create, как и для остальных моделей: сигналы post_save здесь не нужны
+        self.course = fill_pks(Course, Course.objects.bulk_create([Course(
+            title=record['title'], slug=slug, description=record['description'],
+            author=author, image=record.get('image') or None,
+        )]), slug=slug)[0]
+        search.index_new_objects('course', [self.course])
+        self.counts['course'] += 1
+
+    def lecture(self, old_id):
+        try:
+            return self.lecture_map[old_id]
+        except KeyError:
+            raise ValueError(f"Лекция {old_id} не найдена в курсе {self.course.slug}")
+
+    def flush_lectures(self):
+        if not self.pending_lectures:
+            return
+        lectures = fill_pks(Lecture, Lecture.objects.bulk_create([lecture for _, lecture in self.pending_lectures]), course=self.course)
+        self.lecture_map.update((old_id, lecture) for (old_id, _), lecture in zip(self.pending_lectures, lectures))
+        search.index_new_objects('lecture', lectures)
+        self.counts['lecture'] += len(lectures)
+        self.pending_lectures = []
+
+    def flush_tests(self):
+        if not self.pending_tests:
+            return
+        self.flush_lectures()
+        for old_lecture_id, test in self.pending_tests:
+            test.lecture = self.lecture(old_lecture_id)
+        tests = fill_pks(Test, Test.objects.bulk_create([test for _, test in self.pending_tests]), lecture__course=self.course)
+        create_question_rows(tests)
+        search.index_new_objects('test', tests)
+        self.counts['test'] += len(tests)
+        self.pending_tests = []
+
+    def flush_comments(self):
+        if not self.pending_comments:
+            return
+        self.flush_lectures()
+        users = self.get_users({username for _, username, _ in self.pending_comments})
+        for old_lecture_id, username, comment in self.pending_comments:
+            comment.lecture = self.lecture(old_lecture_id)
+            comment.author = users[username]
+        comments = fill_pks(Comment, Comment.objects.bulk_create([comment for _, _, comment in self.pending_comments]), lecture__course=self.course)
+        search.index_new_objects('comment', comments)
+        self.counts['comment'] += len(comments)
+        self.pending_comments = []
+
+    def flush(self):
+        self.flush_lectures()
+        self.flush_tests()
+        self.flush_comments()
+        if self.course is not None:
+            recount(Course.objects.filter(pk=self.course.pk))
+
+
+def import_records(records, batch_size=BATCH_SIZE, skip_existing=False):
+    """
+    Загружает курсы из записей JSON Lines. Возвращает количество созданных объектов по типам.
+    """
+    return Importer(batch_size, skip_existing).run(records)
+
+
+# Выгрузка банка вопросов лекции для преподавателей
+QUESTION_FIELDS = ('id', 'question', 'correct_answer', 'choices', 'attempts', 'correct')
+
+
+class _Echo:
+    """
+    Псевдо-файл для csv.writer: write() возвращает строку, а не пишет её.
+    """
+    def write(self, value):
+        return value
+
+
+def question_rows(lecture, chunk_size=BATCH_SIZE):
+    """
+    Генератор словарей с вопросами лекции и их статистикой, читаемых кусками.
+    """
+    tests = Test.objects.filter(lecture=lecture).order_by('id').values(
+        'id', 'question', 'correct_answer', 'choices', 'stats__attempts', 'stats__correct',
+    )
+    for row in tests.iterator(chunk_size=chunk_size):
+        yield {
+            'id': row['id'], 'question': row['question'], 'correct_answer': row['correct_answer'],
+            'choices': row['choices'], 'attempts': row['stats__attempts'] or 0, 'correct': row['stats__correct'] or 0,
+        }
+
+
+def question_csv_lines(lecture, chunk_size=BATCH_SIZE):
+    """
+    Генератор строк CSV; варианты ответов записываются одной ячейкой в формате JSON.
+    """
+    writer = csv.writer(_Echo())
+    yield writer.writerow(QUESTION_FIELDS)
+    for row in question_rows(lecture, chunk_size):
+        row['choices'] = json.dumps(row['choices'], ensure_ascii=False)
+        yield writer.writerow([row[field] for field in QUESTION_FIELDS])
+
+
+def question_json_chunks(lecture, chunk_size=BATCH_SIZE):
+    """
+    Генератор частей JSON-массива: массив собирается клиентом, а не в памяти сервера.
+    """
+    yield '['
+    for number, row in enumerate(question_rows(lecture, chunk_size)):
+        yield (',\n' if number else '\n') + json.dumps(row, ensure_ascii=False)
+    yield '\n]\n'
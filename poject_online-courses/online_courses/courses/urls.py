@@ -1,13 +1,21 @@
-from django.urls import path
+import re
+from django.urls import path, re_path
 from .views import (
     UserRegisterView, UserLoginView, UserLogoutView,
-    CourseListView, CourseDetailView, CourseCreateView,
-    LectureCreateView, LectureDetailView,
-    TestCreateView, TestListView, TestEditView,
+    CourseListView, CourseDetailView, CourseCreateView, CourseCloneView, CourseExportView, CourseLeaderboardView,
+    LectureCreateView, LectureDetailView, LectureReorderView, LectureCompleteView,
+    TestCreateView, TestListView, TestEditView, TestDeleteView, TestExportView,
+    TestDetailView, QuizHistoryView,
+    CacheStatsView, SearchView, MediaFileView,
+    AsyncCourseListView, AsyncCourseDetailView, AsyncLectureDetailView, AsyncTestDetailView,
 )
-from django.conf.urls.static import static
 from django.conf import settings
 
+# Под ASGI страницы чтения обслуживаются асинхронными представлениями
+if getattr(settings, 'COURSES_ASYNC_VIEWS', False):
+    CourseListView, CourseDetailView = AsyncCourseListView, AsyncCourseDetailView
+    LectureDetailView, TestDetailView = AsyncLectureDetailView, AsyncTestDetailView
+
 urlpatterns = [
     # Главная страница со списком курсов
     path('', CourseListView.as_view(), name='course_list'),
@@ -22,8 +30,13 @@ urlpatterns = [
     
     # Динамические маршруты для курсов и лекций
     path('course/<slug:slug>/', CourseDetailView.as_view(), name='course_detail'),  # Страница подробной информации о курсе
+    path('course/<slug:slug>/clone/', CourseCloneView.as_view(), name='course_clone'),  # Копирование курса
+    path('course/<slug:slug>/export/', CourseExportView.as_view(), name='course_export'),  # Выгрузка курса в JSON Lines
+    path('course/<slug:slug>/leaderboard/', CourseLeaderboardView.as_view(), name='course_leaderboard'),  # Рейтинг курса
     path('course/<slug:course_slug>/lecture/create/', LectureCreateView.as_view(), name='lecture_create'),  # Страница создания лекции
+    path('course/<slug:course_slug>/lecture/reorder/', LectureReorderView.as_view(), name='lecture_reorder'),  # Перестановка лекций курса
     path('lecture/<int:lecture_id>/', LectureDetailView.as_view(), name='lecture_detail'),  # Страница подробной информации о лекции
+    path('lecture/<int:lecture_id>/complete/', LectureCompleteView.as_view(), name='lecture_complete'),  # Отметка о прохождении лекции
     
     # Комментарии к лекции
     path('lecture/<int:lecture_id>/comment/', LectureDetailView.as_view(), name='lecture_comment'),  # Обработка комментариев к лекции
@@ -31,8 +44,20 @@ urlpatterns = [
     # Управление тестами
     path('lecture/<int:lecture_id>/test/create/', TestCreateView.as_view(), name='test_create'),  # Страница создания теста
     path('lecture/<int:lecture_id>/test/', TestListView.as_view(), name='test_list'),  # Страница списка тестов
+    path('lecture/<int:lecture_id>/test/export/', TestExportView.as_view(), name='test_export'),  # Выгрузка вопросов в CSV/JSON
+    path('lecture/<int:lecture_id>/test/pass/', TestDetailView.as_view(), name='test_detail'),  # Страница прохождения тестов
+    path('lecture/<int:lecture_id>/test/history/', QuizHistoryView.as_view(), name='test_history'),  # История попыток
     path('test/<int:test_id>/edit/', TestEditView.as_view(), name='test_edit'),  # Страница редактирования теста
+    path('test/<int:test_id>/delete/', TestDeleteView.as_view(), name='test_delete'),  # Удаление теста
+
+    # Поиск
+    path('search/', SearchView.as_view(), name='search'),  # Полнотекстовый поиск
+
+    # Служебные страницы
+    path('cache/stats/', CacheStatsView.as_view(), name='cache_stats'),  # Счётчики кэша страниц
 ]
 
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+# Медиафайлы (изображения курсов, видео лекций) с поддержкой Range и условных запросов
+urlpatterns += [
+    re_path(r'^%s(?P<path>.+)$' % re.escape(settings.MEDIA_URL.lstrip('/')), MediaFileView.as_view(), name='media'),
+]
@@ -1,15 +1,35 @@
 from django.urls import reverse_lazy
-from django.views.generic import CreateView, ListView, DetailView, TemplateView, UpdateView
+from django.views.generic import CreateView, DeleteView, FormView, ListView, DetailView, TemplateView, UpdateView
 from django.contrib.auth.views import LoginView, LogoutView
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.models import User
-from django.shortcuts import render, get_object_or_404, redirect
+from django.shortcuts import render, get_object_or_404, aget_object_or_404, redirect
 from django.contrib.auth.mixins import LoginRequiredMixin
-from .forms import CourseForm, LectureForm, CommentForm, TestForm
-from .models import Course, Lecture, Comment, Test
+from .forms import CourseForm, CourseCloneForm, LectureForm, CommentForm, TestForm
+from .models import Course, Lecture, Comment, Test, QuizAttempt, LectureQuizStats
 from django.views import View
-from django.db.models import Max 
+import json
 from django.core.paginator import Paginator 
+from .pagination import CursorPaginator, aget_page
+from .cache import (
+    VersionedPageCacheMixin, AsyncVersionedPageCacheMixin,
+    get_or_set_fragment, aget_or_set_fragment, get_stats,
+)
+from .archive import ArchiveCursorPaginator, ArchivedCommentList
+from .cloning import clone_course
+from .conditional import ConditionalGetMixin, AsyncConditionalGetMixin, touch
+from .grading import get_answer_key, grade, record_attempt
+from .ordering import append_lecture, reorder_lectures
+from .progress import attach_percent, aattach_percent, ais_complete, is_complete, mark_complete
+from . import archive
+from . import leaderboard
+from . import search
+from . import media
+from . import transfer
+from django.contrib.auth.mixins import UserPassesTestMixin
+from django.http import HttpResponseRedirect, JsonResponse, StreamingHttpResponse
+from django.template.loader import render_to_string
+from asgiref.sync import sync_to_async
 
 # Класс-представление для регистрации пользователя
 class UserRegisterView(CreateView):
@@ -44,15 +64,18 @@ class UserLogoutView(LoginRequiredMixin, LogoutView):
     next_page = reverse_lazy('login') 
 
 # Список курсов
-class CourseListView(ListView):
+class CourseListView(VersionedPageCacheMixin, ListView):
     """
     Представление для отображения списка курсов.
     Поддерживает пагинацию с количеством элементов на странице, равным 6.
+    Для анонимных пользователей страница отдаётся из кэша.
     """
     model = Course
+    cache_name = 'course_list'
     template_name = 'courses/course_list.html'
     context_object_name = 'courses'
     paginate_by = 6  # Установите количество элементов на странице
+    ordering = ['id']  # Стабильный порядок для пагинации
 
     def get_context_data(self, **kwargs):
         """
@@ -60,16 +83,102 @@ class CourseListView(ListView):
         """
         context = super().get_context_data(**kwargs)
         context['page_obj'] = context['paginator'].get_page(self.request.GET.get('page'))
+        # Процент прохождения для всех карточек страницы одним запросом
+        context['courses'] = attach_percent(self.request.user, list(context['courses']))
         return context
 
+    def get_cache_versions(self):
+        return ['courses']
+
 # Детали курса
-class CourseDetailView(DetailView):
+class CourseDetailView(ConditionalGetMixin, VersionedPageCacheMixin, DetailView):
     """
     Представление для отображения деталей конкретного курса.
+    Анонимным пользователям отдаётся закэшированная страница,
+    остальным - закэшированный фрагмент со списком лекций.
+    Если курс не менялся, отвечает 304 по ETag/Last-Modified.
     """
     model = Course
     template_name = 'courses/course_detail.html'
     context_object_name = 'course'
+    cache_name = 'course_detail'
+
+    def get_modified_queryset(self):
+        return Course.objects.filter(slug=self.kwargs['slug'])
+
+    def get_cache_versions(self):
+        return ['courses', f"course:{self.kwargs['slug']}"]
+
+    def get_context_data(self, **kwargs):
+        """
+        Добавляет HTML списка лекций из кэша фрагментов.
+        """
+        context = super().get_context_data(**kwargs)
+        context['lectures_html'] = get_or_set_fragment(
+            'course_lectures',
+            self.get_cache_versions(),
+            lambda: render_to_string('courses/lecture_list.html', {'lectures': self.object.lectures.order_by('order', 'id')}),
+        )
+        return context
+
+# Рейтинг курса по результатам тестов
+class CourseLeaderboardView(View):
+    """
+    Представление для отображения лучших участников курса и места текущего пользователя.
+    """
+    def get(self, request, slug):
+        course = get_object_or_404(Course, slug=slug)
+        return render(request, 'courses/leaderboard.html', {
+            'course': course,
+            'leaders': leaderboard.top(course),
+            'my_rank': leaderboard.rank(course, request.user) if request.user.is_authenticated else None,
+        })
+
+# Полнотекстовый поиск
+class SearchView(TemplateView):
+    """
+    Представление для поиска по курсам, лекциям, комментариям и тестам.
+    Использует полнотекстовый индекс FTS5 с ранжированием и подсветкой совпадений.
+    """
+    template_name = 'courses/search.html'
+    results_limit = 50
+
+    def get_context_data(self, **kwargs):
+        """
+        Добавляет запрос и найденные результаты в контекст.
+        """
+        context = super().get_context_data(**kwargs)
+        query = self.request.GET.get('q', '').strip()
+        kind = self.request.GET.get('kind')
+        kinds = [kind] if kind in search.KINDS else None
+        context['query'] = query
+        context['kind'] = kind
+        context['results'] = search.search(query, kinds=kinds, limit=self.results_limit)
+        # Архивные комментарии в индекс не входят (см. archive.py)
+        context['archive_after_days'] = archive.ARCHIVE_AFTER_DAYS
+        return context
+
+# Раздача медиафайлов
+class MediaFileView(View):
+    """
+    Представление для раздачи изображений курсов и видеофайлов лекций из MEDIA_ROOT.
+    Поддерживает докачку и перемотку видео (Range), условные запросы (304)
+    и передачу файла фронт-прокси через X-Accel-Redirect.
+    """
+    def get(self, request, path):
+        return media.serve(request, path)
+
+# Статистика кэша страниц (только для персонала)
+class CacheStatsView(UserPassesTestMixin, View):
+    """
+    Возвращает счётчики попаданий и промахов кэша в формате JSON.
+    Помогает подобрать размер кэша.
+    """
+    def test_func(self):
+        return self.request.user.is_staff
+
+    def get(self, request):
+        return JsonResponse(get_stats())
 
 # Создание курса (требует аутентификации)
 class CourseCreateView(LoginRequiredMixin, CreateView):
@@ -95,6 +204,60 @@ class CourseCreateView(LoginRequiredMixin, CreateView):
         """
         return reverse_lazy('course_detail', kwargs={'slug': self.object.slug})
 
+# Копирование курса
+class CourseCloneView(LoginRequiredMixin, UserPassesTestMixin, FormView):
+    """
+    Представление для копирования курса с лекциями и тестами (и, по желанию, комментариями).
+    Доступно автору курса и персоналу. Автором копии становится текущий пользователь.
+    """
+    form_class = CourseCloneForm
+    template_name = 'courses/course_clone.html'
+
+    def test_func(self):
+        self.course = get_object_or_404(Course, slug=self.kwargs['slug'])
+        return self.request.user.is_staff or self.course.author_id == self.request.user.id
+
+    def get_initial(self):
+        return {'title': f"{self.course.title} (копия)"}
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['course'] = self.course
+        return context
+
+    def form_valid(self, form):
+        """
+        Копирует курс и перенаправляет на страницу копии.
+        """
+        copy = clone_course(
+            self.course,
+            author=self.request.user,
+            title=form.cleaned_data['title'],
+            slug=form.cleaned_data['slug'] or None,
+            include_comments=form.cleaned_data['include_comments'],
+        )
+        return redirect('course_detail', slug=copy.slug)
+
+# Выгрузка курса
+class CourseExportView(LoginRequiredMixin, UserPassesTestMixin, View):
+    """
+    Отдаёт курс с лекциями, тестами и комментариями файлом JSON Lines.
+    Ответ формируется потоком, без загрузки курса в память.
+    Доступно автору курса и персоналу.
+    """
+    def test_func(self):
+        self.course = get_object_or_404(Course, slug=self.kwargs['slug'])
+        return self.request.user.is_staff or self.course.author_id == self.request.user.id
+
+    def get(self, request, slug):
+        include_comments = request.GET.get('comments', '1') != '0'
+        response = StreamingHttpResponse(
+            transfer.export_lines(Course.objects.filter(pk=self.course.pk), include_comments),
+            content_type='application/x-ndjson; charset=utf-8',
+        )
+        response['Content-Disposition'] = f'attachment; filename="{slug}.jsonl"'
+        return response
+
 # Создание лекции (требует аутентификации)
 class LectureCreateView(LoginRequiredMixin, CreateView):
     """
@@ -112,13 +275,10 @@ class LectureCreateView(LoginRequiredMixin, CreateView):
         и определяет порядок лекции.
         """
         form.instance.course = get_object_or_404(Course, slug=self.kwargs['course_slug'])
-        
-        # Получаем максимальное значение order для лекций в данном курсе
-        max_order = Lecture.objects.filter(course=form.instance.course).aggregate(Max('order'))['order__max']
-        
-        # Устанавливаем значение order. Если max_order равно None, значит это первая лекция.
-        form.instance.order = (max_order or 0) + 1
-        return super().form_valid(form)
+
+        # Порядок вычисляется в том же INSERT, поэтому одновременные запросы не получат одинаковый order
+        self.object = append_lecture(form.instance)
+        return HttpResponseRedirect(self.get_success_url())
 
     def get_success_url(self):
         """
@@ -126,27 +286,76 @@ class LectureCreateView(LoginRequiredMixin, CreateView):
         """
         return reverse_lazy('course_detail', kwargs={'slug': self.object.course.slug})
 
+# Перестановка лекций курса
+class LectureReorderView(LoginRequiredMixin, UserPassesTestMixin, View):
+    """
+    Задаёт новый порядок всех лекций курса за одну транзакцию.
+    Принимает JSON {"lectures": [id, ...]} или поля формы lecture=id в нужном порядке.
+    Доступно автору курса и персоналу.
+    """
+    def test_func(self):
+        self.course = get_object_or_404(Course, slug=self.kwargs['course_slug'])
+        return self.request.user.is_staff or self.course.author_id == self.request.user.id
+
+    def post(self, request, course_slug):
+        if request.content_type == 'application/json':
+            try:
+                lecture_ids = json.loads(request.body).get('lectures')
+            except (ValueError, AttributeError):
+                lecture_ids = None
+        else:
+            lecture_ids = request.POST.getlist('lecture')
+        if not isinstance(lecture_ids, list):
+            return JsonResponse({'error': "Передайте список id лекций"}, status=400)
+        try:
+            changed = reorder_lectures(self.course, lecture_ids)
+        except (TypeError, ValueError) as exc:
+            return JsonResponse({'error': str(exc)}, status=400)
+        return JsonResponse({'lectures': [int(lecture_id) for lecture_id in lecture_ids], 'changed': changed})
+
 # Детали лекции
-class LectureDetailView(View):
+class LectureDetailView(ConditionalGetMixin, View):
     """
     Представление для отображения деталей лекции, включая комментарии.
     Позволяет пользователям добавлять комментарии к лекции.
+
+    Комментарии листаются курсором (?cursor=...) по ключу (created_at, id).
+    Старые ссылки вида ?page=N продолжают работать через обычный Paginator.
+    За самыми старыми комментариями в Comment обе пагинации продолжают листать архив (archive.py).
+    Если лекция, её комментарии и тесты не менялись, отвечает 304 по ETag/Last-Modified.
     """
+    comments_per_page = 10  # Количество комментариев на странице
+
+    def get_modified_queryset(self):
+        return Lecture.objects.filter(pk=self.kwargs['lecture_id'])
+
+    def get_comments_context(self, request, lecture):
+        """
+        Возвращает страницу комментариев и признак курсорного режима.
+        """
+        comments_list = lecture.comments.select_related('author')
+        page_number = request.GET.get('page')
+        if page_number is not None and 'cursor' not in request.GET:
+            # Обратная совместимость со ссылками ?page=N
+            paginator = Paginator(ArchivedCommentList(lecture, comments_list), self.comments_per_page)
+            # Хранимый счётчик вместо COUNT(*) по комментариям
+            paginator.count = lecture.comment_count
+            return {'comments': paginator.get_page(page_number), 'cursor_pagination': False}
+
+        paginator = ArchiveCursorPaginator(lecture, comments_list, self.comments_per_page)
+        return {'comments': paginator.get_page(request.GET.get('cursor')), 'cursor_pagination': True}
+
     def get(self, request, lecture_id):
         """
         Обрабатывает GET-запрос для отображения деталей лекции и комментариев.
         """
         lecture = get_object_or_404(Lecture, id=lecture_id)
-        comments_list = lecture.comments.all().order_by('-created_at')  # Получаем все комментарии и сортируем
-        paginator = Paginator(comments_list, 10)  # Указываем количество комментариев на странице
-        page_number = request.GET.get('page')  # Получаем номер страницы из GET-параметра
-        comments = paginator.get_page(page_number)  # Получаем текущую страницу комментариев
-
         comment_form = CommentForm()
         return render(request, 'courses/lecture_detail.html', {
             'lecture': lecture,
-            'comments': comments,
-            'comment_form': comment_form
+            'comment_form': comment_form,
+            'completed': is_complete(request.user, lecture),
+            **self.get_comments_context(request, lecture),
         })
 
     def post(self, request, lecture_id):
@@ -163,17 +372,24 @@ class LectureDetailView(View):
             return redirect('lecture_detail', lecture_id=lecture.id)
 
         # Если форма не валидна, показываем предыдущие комментарии
-        comments_list = lecture.comments.all().order_by('-created_at')
-        paginator = Paginator(comments_list, 10)
-        page_number = request.GET.get('page')
-        comments = paginator.get_page(page_number)
-
         return render(request, 'courses/lecture_detail.html', {
             'lecture': lecture,
-            'comments': comments,
-            'comment_form': comment_form
+            'comment_form': comment_form,
+            **self.get_comments_context(request, lecture),
         })
 
+# Отметка о прохождении лекции
+class LectureCompleteView(LoginRequiredMixin, View):
+    """
+    Отмечает лекцию пройденной текущим пользователем и возвращает на страницу лекции.
+    """
+    def post(self, request, lecture_id):
+        lecture = get_object_or_404(Lecture.objects.only('id', 'course_id', 'progress_bit'), id=lecture_id)
+        if mark_complete(request.user, lecture):
+            # Иначе после перенаправления браузер получит 304 и покажет страницу без отметки
+            touch(Lecture, lecture.id)
+        return redirect('lecture_detail', lecture_id=lecture.id)
+
 # Создание теста (требует аутентификации)
 class TestCreateView(View):
     """
@@ -215,40 +431,99 @@ class TestDetailView(TemplateView):
         """
         context = super().get_context_data(**kwargs)
         lecture_id = self.kwargs['lecture_id']
+        context['lecture'] = get_object_or_404(Lecture, id=lecture_id)
         context['tests'] = Test.objects.filter(lecture_id=lecture_id)
         return context
 
     def post(self, request, *args, **kwargs):
         """
-        Обрабатывает результаты теста, подсчитывает правильные ответы и отображает результаты.
+        Обрабатывает результаты теста: проверяет ответы по скомпилированному ключу,
+        сохраняет попытку и отображает результаты.
         """
         lecture_id = self.kwargs['lecture_id']
-        tests = Test.objects.filter(lecture_id=lecture_id)
-        score = 0
+        answer_key = get_answer_key(lecture_id)  # Ключ ответов из кэша (одно чтение при промахе)
+        score, answers = grade(answer_key, request.POST)
 
-        # Подсчет правильных ответов
-        for test in tests:
-            selected_answer = request.POST.get(f'question_{test.id}')
-            if selected_answer == test.correct_answer:
-                score += 1
+        attempt = None
+        if answers:
+            attempt = record_attempt(lecture_id, request.user, score, answers)
 
         # Возвращение результатов теста
-        return render(request, 'courses/test_results.html', {'score': score, 'total': tests.count()})
+        return render(request, 'courses/test_results.html', {
+            'score': score,
+            'total': len(answers),
+            'lecture_id': lecture_id,
+            'attempt': attempt,
+        })
 
-# Список тестов
-class TestListView(ListView):
+# История попыток прохождения тестов (требует аутентификации)
+class QuizHistoryView(LoginRequiredMixin, ListView):
     """
-    Представление для отображения списка всех тестов.
+    Представление для отображения истории попыток пользователя по тестам лекции.
     """
-    model = Test
-    template_name = 'courses/test_list.html'
-    context_object_name = 'tests'
+    model = QuizAttempt
+    template_name = 'courses/test_history.html'
+    context_object_name = 'attempts'
+    paginate_by = 20
 
     def get_queryset(self):
         """
-        Возвращает все тесты.
+        Возвращает попытки текущего пользователя, начиная с последней.
         """
-        return Test.objects.all()
+        return QuizAttempt.objects.filter(
+            user=self.request.user, lecture_id=self.kwargs['lecture_id']
+        ).order_by('-created_at', '-id')
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['lecture'] = get_object_or_404(Lecture, id=self.kwargs['lecture_id'])
+        return context
+
+# Список тестов
+class TestListView(View):
+    """
+    Представление для отображения списка тестов лекции со статистикой.
+    Тесты листаются курсором (?cursor=...) по id, лекция загружается один раз.
+    """
+    tests_per_page = 20  # Количество тестов на странице
+
+    def get(self, request, lecture_id):
+        """
+        Обрабатывает GET-запрос для отображения страницы тестов лекции.
+        """
+        lecture = get_object_or_404(Lecture.objects.select_related('course'), id=lecture_id)
+        tests = lecture.tests.select_related('stats').prefetch_related('choice_stats')
+        paginator = CursorPaginator(tests, self.tests_per_page, ordering=('id',))
+        return render(request, 'courses/test_list.html', {
+            'lecture': lecture,
+            'tests': paginator.get_page(request.GET.get('cursor')),
+            'lecture_stats': LectureQuizStats.objects.filter(lecture=lecture).first(),
+            'can_manage': request.user.is_staff or lecture.course.author_id == request.user.id,
+        })
+
+# Выгрузка банка вопросов лекции
+class TestExportView(LoginRequiredMixin, UserPassesTestMixin, View):
+    """
+    Отдаёт вопросы лекции со статистикой потоком в CSV (?format=csv) или JSON (?format=json).
+    Доступно автору курса и персоналу.
+    """
+    formats = {
+        'csv': (transfer.question_csv_lines, 'text/csv; charset=utf-8'),
+        'json': (transfer.question_json_chunks, 'application/json; charset=utf-8'),
+    }
+
+    def test_func(self):
+        self.lecture = get_object_or_404(Lecture.objects.select_related('course'), id=self.kwargs['lecture_id'])
+        return self.request.user.is_staff or self.lecture.course.author_id == self.request.user.id
+
+    def get(self, request, lecture_id):
+        export_format = request.GET.get('format', 'csv')
+        if export_format not in self.formats:
+            return JsonResponse({'error': "Поддерживаются форматы csv и json"}, status=400)
+        generate, content_type = self.formats[export_format]
+        response = StreamingHttpResponse(generate(self.lecture), content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="lecture-{lecture_id}-tests.{export_format}"'
+        return response
 
 # Редактирование теста
 class TestEditView(UpdateView):
@@ -258,12 +533,169 @@ class TestEditView(UpdateView):
     model = Test
     form_class = TestForm
     template_name = 'courses/test_edit.html'
+    pk_url_kwarg = 'test_id'
 
     def get_success_url(self):
         """
-        Перенаправляет на страницу деталей теста после успешного редактирования.
+        Перенаправляет на страницу прохождения тестов лекции после успешного редактирования.
+        """
+        return reverse_lazy('test_detail', kwargs={'lecture_id': self.object.lecture_id})
+
+# Удаление теста
+class TestDeleteView(LoginRequiredMixin, UserPassesTestMixin, DeleteView):
+    """
+    Удаляет тест (только POST) и возвращает к списку тестов лекции.
+    Доступно автору курса и персоналу.
+    """
+    model = Test
+    pk_url_kwarg = 'test_id'
+    http_method_names = ['post']
+
+    def test_func(self):
+        test = get_object_or_404(Test.objects.select_related('lecture__course'), id=self.kwargs['test_id'])
+        return self.request.user.is_staff or test.lecture.course.author_id == self.request.user.id
+
+    def get_success_url(self):
+        return reverse_lazy('test_list', kwargs={'lecture_id': self.object.lecture_id})
+
+
+
+# Асинхронные представления для развёртывания через ASGI.
+# Используют асинхронный ORM и не занимают поток синхронного исполнителя.
+
+async def _resolve_user(request):
+    """
+    Загружает пользователя асинхронно и подставляет его в request.user,
+    чтобы шаблоны не обращались к базе данных из цикла событий.
+    """
+    request.user = await request.auser()
+    return request.user
+
+# Список курсов (асинхронный)
+class AsyncCourseListView(AsyncVersionedPageCacheMixin, View):
+    """
+    Асинхронный вариант CourseListView.
+    """
+    template_name = 'courses/course_list.html'
+    paginate_by = 6
+    cache_name = 'course_list'
+
+    def get_cache_versions(self):
+        return ['courses']
+
+    async def get(self, request):
+        await _resolve_user(request)
+        paginator = Paginator(Course.objects.order_by('id'), self.paginate_by)
+        page_obj = await aget_page(paginator, request.GET.get('page'))
+        return render(request, self.template_name, {
+            'courses': await aattach_percent(request.user, list(page_obj.object_list)),
+            'page_obj': page_obj,
+            'paginator': paginator,
+            'is_paginated': page_obj.has_other_pages(),
+        })
+
+# Детали курса (асинхронный)
+class AsyncCourseDetailView(AsyncConditionalGetMixin, AsyncVersionedPageCacheMixin, View):
+    """
+    Асинхронный вариант CourseDetailView.
+    """
+    template_name = 'courses/course_detail.html'
+    cache_name = 'course_detail'
+
+    def get_modified_queryset(self):
+        return Course.objects.filter(slug=self.kwargs['slug'])
+
+    def get_cache_versions(self):
+        return ['courses', f"course:{self.kwargs['slug']}"]
+
+    async def get(self, request, slug):
+        await _resolve_user(request)
+        # Автор нужен шаблону: ленивая загрузка связи внутри цикла событий невозможна
+        course = await aget_object_or_404(Course.objects.select_related('author'), slug=slug)
+
+        async def render_lectures():
+            lectures = [lecture async for lecture in course.lectures.order_by('order', 'id')]
+            return render_to_string('courses/lecture_list.html', {'lectures': lectures})
+
+        lectures_html = await aget_or_set_fragment('course_lectures', self.get_cache_versions(), render_lectures)
+        return render(request, self.template_name, {'course': course, 'lectures_html': lectures_html})
+
+# Детали лекции (асинхронный)
+class AsyncLectureDetailView(AsyncConditionalGetMixin, LectureDetailView):
+    """
+    Асинхронный вариант LectureDetailView.
+    Django требует, чтобы все обработчики представления были асинхронными,
+    поэтому асинхронным сделан и post.
+    """
+    async def aget_comments_context(self, request, lecture):
+        """
+        Асинхронный вариант get_comments_context().
         """
-        return reverse_lazy('test_detail', kwargs={'pk': self.object.pk})
+        comments_list = lecture.comments.select_related('author')
+        page_number = request.GET.get('page')
+        if page_number is not None and 'cursor' not in request.GET:
+            # Срез списка может дочитывать архив, поэтому страница собирается в потоке
+            paginator = Paginator(ArchivedCommentList(lecture, comments_list), self.comments_per_page)
+            paginator.count = lecture.comment_count
+            return {'comments': await sync_to_async(paginator.get_page)(page_number), 'cursor_pagination': False}
+
+        paginator = ArchiveCursorPaginator(lecture, comments_list, self.comments_per_page)
+        return {'comments': await paginator.aget_page(request.GET.get('cursor')), 'cursor_pagination': True}
+
+    async def get(self, request, lecture_id):
+        await _resolve_user(request)
+        lecture = await aget_object_or_404(Lecture, id=lecture_id)
+        return render(request, 'courses/lecture_detail.html', {
+            'lecture': lecture,
+            'comment_form': CommentForm(),
+            'completed': await ais_complete(request.user, lecture),
+            **await self.aget_comments_context(request, lecture),
+        })
+
+    async def post(self, request, lecture_id):
+        user = await _resolve_user(request)
+        lecture = await aget_object_or_404(Lecture, id=lecture_id)
+        comment_form = CommentForm(request.POST)
+        if comment_form.is_valid():
+            comment = comment_form.save(commit=False)
+            comment.lecture = lecture
+            comment.author = user
+            await comment.asave()
+            return redirect('lecture_detail', lecture_id=lecture.id)
+
+        return render(request, 'courses/lecture_detail.html', {
+            'lecture': lecture,
+            'comment_form': comment_form,
+            **await self.aget_comments_context(request, lecture),
+        })
+
+# Прохождение тестов (асинхронный)
+class AsyncTestDetailView(View):
+    """
+    Асинхронный вариант TestDetailView.
+    """
+    async def get(self, request, lecture_id):
+        await _resolve_user(request)
+        lecture = await aget_object_or_404(Lecture, id=lecture_id)
+        tests = [test async for test in Test.objects.filter(lecture_id=lecture_id)]
+        return render(request, 'courses/test.html', {'lecture': lecture, 'tests': tests})
+
+    async def post(self, request, lecture_id):
+        user = await _resolve_user(request)
+        answer_key = await sync_to_async(get_answer_key)(lecture_id)
+        score, answers = grade(answer_key, request.POST)
+
+        attempt = None
+        if answers:
+            # Транзакция и F-обновления статистики выполняются в синхронном коде
+            attempt = await sync_to_async(record_attempt)(lecture_id, user, score, answers)
+
+        return render(request, 'courses/test_results.html', {
+            'score': score,
+            'total': len(answers),
+            'lecture_id': lecture_id,
+            'attempt': attempt,
+        })
 
 
     
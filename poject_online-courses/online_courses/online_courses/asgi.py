@@ -9,20 +9,22 @@ https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
 
 import os
 from django.core.asgi import get_asgi_application
-from channels.routing import ProtocolTypeRouter
-from django.apps import AppConfig
+from channels.auth import AuthMiddlewareStack
+from channels.routing import ProtocolTypeRouter, URLRouter
+from channels.security.websocket import AllowedHostsOriginValidator
 
-class CoursesAppConfig(AppConfig):
-    default_auto_field = 'django.db.models.BigAutoField'
-    name = 'courses'
-
-    def ready(self):
-        import courses.signals  
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'online_courses.settings')
+# Под ASGI страницы чтения обслуживают асинхронные представления (см. COURSES_ASYNC_VIEWS)
+os.environ.setdefault('COURSES_ASYNC_VIEWS', '1')
 
+# Приложение Django нужно создать до импорта потребителей, использующих модели
+django_asgi_app = get_asgi_application()
 
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'online_courses.settings')
+from courses.routing import websocket_urlpatterns  # noqa: E402
 
 application = ProtocolTypeRouter({
-    "http": get_asgi_application(),
+    "http": django_asgi_app,
+    "websocket": AllowedHostsOriginValidator(
+        AuthMiddlewareStack(URLRouter(websocket_urlpatterns))
+    ),
 })
-
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -42,6 +43,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Первым, чтобы время и SQL учитывались для всей цепочки (см. courses/instrumentation.py)
+    'courses.instrumentation.RequestTimingMiddleware',
+    # Выбор базы для чтения: реплика или основная после изменяющего запроса
+    'courses.routers.ReplicaStickinessMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -55,7 +60,8 @@ ROOT_URLCONF = 'online_courses.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates с замером времени отрисовки для Server-Timing
+        'BACKEND': 'courses.instrumentation.InstrumentedTemplates',
         'DIRS': [],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -70,18 +76,100 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'online_courses.wsgi.application'
+ASGI_APPLICATION = 'online_courses.asgi.application'
+
+# Использовать асинхронные представления для страниц чтения (см. courses/urls.py).
+# Включается в asgi.py: под WSGI асинхронное представление выполнялось бы в отдельном цикле событий на каждый запрос
+COURSES_ASYNC_VIEWS = os.environ.get('COURSES_ASYNC_VIEWS') == '1'
+
+# Channels
+# https://channels.readthedocs.io/en/stable/topics/channel_layers.html
+# Слой в памяти подходит для одного узла и тестов; для нескольких узлов нужен channels_redis.
+
+CHANNEL_LAYERS = {
+    'default': {
+        'BACKEND': 'channels.layers.InMemoryChannelLayer',
+    }
+}
 
 
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
+# Настройка каждого нового соединения SQLite: WAL позволяет читать во время записи,
+# busy_timeout ждёт освобождения блокировки вместо ошибки "database is locked",
+# synchronous=NORMAL в режиме WAL безопасен и быстрее FULL, cache_size - 20 МБ страниц.
+# IMMEDIATE берёт блокировку записи в начале транзакции, исключая взаимоблокировки при её повышении.
+SQLITE_OPTIONS = {
+    'init_command': (
+        'PRAGMA journal_mode=WAL;'
+        'PRAGMA busy_timeout=5000;'
+        'PRAGMA synchronous=NORMAL;'
+        'PRAGMA cache_size=-20000;'
+        'PRAGMA temp_store=MEMORY;'
+    ),
+    'transaction_mode': 'IMMEDIATE',
+}
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': SQLITE_OPTIONS,
+        # Постоянные соединения: не открывать базу заново на каждый запрос
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+    }
+}
+
+# Реплика для чтения (см. courses/routers.py). Для локальной проверки достаточно
+# копии файла базы: COURSES_DB_REPLICA=/path/to/replica.sqlite3
+if os.environ.get('COURSES_DB_REPLICA'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': os.environ['COURSES_DB_REPLICA'],
+        # В тестах реплика указывает на тестовую копию основной базы
+        'TEST': {'MIRROR': 'default'},
     }
+
+DATABASE_ROUTERS = ['courses.routers.ReplicaRouter']
+
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# Подойдёт любой бэкенд: locmem, file-based, memcached, redis.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'online-courses',
+    },
+    # Сессии и пользователи отдельно от кэша страниц, чтобы страницы их не вытесняли.
+    # При нескольких процессах нужен общий бэкенд (memcached, redis), иначе выход
+    # из системы в одном процессе не виден другим.
+    'sessions': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'online-courses-sessions',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
 }
 
+# Сессии читаются из кэша. cached_db дополнительно записывает их в базу, и после
+# очистки кэша они восстанавливаются из неё; COURSES_SESSION_CACHE_ONLY=1 - только кэш.
+SESSION_ENGINE = (
+    'django.contrib.sessions.backends.cache' if os.environ.get('COURSES_SESSION_CACHE_ONLY')
+    else 'django.contrib.sessions.backends.cached_db'
+)
+SESSION_CACHE_ALIAS = 'sessions'
+
+# Пользователь сессии берётся из кэша (см. courses/auth.py). Путь ModelBackend
+# записан в сессиях, созданных до его замены: без него в списке Django считал бы
+# такие сессии недействительными и все пользователи вышли бы из системы.
+AUTHENTICATION_BACKENDS = ['courses.auth.CachedModelBackend', 'django.contrib.auth.backends.ModelBackend']
+COURSES_USER_CACHE_ALIAS = 'sessions'
+
+# Время жизни закэшированных страниц курсов (сброс происходит по версиям)
+COURSES_PAGE_CACHE_TIMEOUT = 60 * 60 * 24
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -129,6 +217,31 @@ MEDIA_URL = '/media/'
 
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Ширины уменьшенных копий изображений курсов (см. courses/images.py)
+COURSES_IMAGE_WIDTHS = (320, 640, 960)
+
+# Раздача медиафайлов (см. courses/media.py).
+# Если за приложением стоит nginx, задайте internal-location, например '/protected-media/',
+# и файлы будет отдавать он по заголовку X-Accel-Redirect.
+COURSES_MEDIA_ACCEL_REDIRECT = None
+COURSES_MEDIA_MAX_AGE = 60 * 60 * 24
+
+# Замеры запросов (см. courses/instrumentation.py): доля запросов с подробной
+# статистикой SQL и шаблонов и порог медленного запроса для записи в лог, мс
+COURSES_TIMING_SAMPLE_RATE = 1.0 if DEBUG else 0.1
+COURSES_TIMING_SLOW_MS = 500
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'courses.timing': {'handlers': ['console'], 'level': 'INFO'},
+    },
+}
+
 STATIC_URL = '/static/'
 
 STATICFILES_DIRS = [